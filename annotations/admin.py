@@ -79,7 +79,7 @@ def submit_relationsets(modeladmin, request, queryset):
 
     # Do not submit a relationset to Quadriga if the constituent interpretations
     #  involve concepts that are not resolved.
-    all_rsets = [rs for rs in queryset if rs.ready()]
+    all_rsets = list(queryset.ready())
 
     project_grouper = lambda rs: getattr(rs.project, 'quadriga_id', -1)
     for project_id, project_group in groupby(sorted(all_rsets, key=project_grouper), key=project_grouper):
@@ -113,7 +113,7 @@ def submit_relationsets_synch(modeladmin, request, queryset):
 
     # Do not submit a relationset to Quadriga if the constituent interpretations
     #  involve concepts that are not resolved.
-    all_rsets = [rs for rs in queryset if rs.ready()]
+    all_rsets = list(queryset.ready())
 
     project_grouper = lambda rs: getattr(rs.project, 'quadriga_id', -1)
     for project_id, project_group in groupby(sorted(all_rsets, key=project_grouper), key=project_grouper):
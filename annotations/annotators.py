@@ -58,9 +58,10 @@ from annotations.tasks import tokenize
 from annotations.utils import basepath
 from annotations.models import TextCollection, VogonUserDefaultProject
 from urllib.parse import urlparse
-import chardet
 from .models import VogonUser
 from django.conf import settings
+from repository import content_cache, encoding
+from util import http
 
 
 class Annotator(object):
@@ -157,17 +158,38 @@ class Annotator(object):
         context.update(self.get_context())
         return render(self.context.get('request'), self.display_template, context)
 
+    def content_cache_key(self):
+        """
+        Key under which the content of the text is cached (see
+        :mod:`repository.content_cache`\), or ``None`` if it should not be
+        cached. Subclasses that download text content should override this.
+        """
+        return None
+
     def get_context(self):
-        resource = self.get_resource()
         request = self.context.get('request')
-        content = self.get_content(resource)
-        detect  = chardet.detect(content)
+        key = self.content_cache_key()
+        cached = content_cache.get(key) if key else None
+        if cached is None:
+            content = self.get_content(self.get_resource())
+            if key and isinstance(content, bytes):
+                cached = content_cache.put(key, content, self.text.content_encoding)
+        # We have to guess the encoding because giles is returning everything
+        #  with a utf-8 header even if it is not utf-8.
+        if cached is not None:
+            self.text.remember_encoding(cached.encoding)
+            content = cached.text.encode('utf-8')
+        else:
+            content_encoding, decoded = encoding.decode(content, self.text.content_encoding)
+            self.text.remember_encoding(content_encoding)
+            if not encoding.is_utf8(content_encoding):
+                content = decoded.encode('utf-8')
         
         return {
             'text': self.text,
             'textid': self.text.id,
             'title': 'Annotate Text',
-            'content': content.decode(detect['encoding']).encode('utf-8'), # We are using chardet to guess the encoding becuase giles is returning everyting with a utf-8 header even if it is not utf-8
+            'content': content,
             'baselocation': basepath(request),
             'userid': 2,
             'title': self.text.title,
@@ -184,6 +206,10 @@ class PlainTextAnnotator(Annotator):
     display_template = 'annotations/annotation_display.html'
     content_types = ('text/plain',)
 
+    def content_cache_key(self):
+        return 'text:%s:%s:%s' % (self.context['user'].id, self.text.id,
+                                  getattr(self.text, 'file_id', None))
+
     def get_content(self, resource):
         target = settings.CITESPHERE_ENDPOINT
         user = VogonUser.objects.get(id=self.context['user'].id)
@@ -191,7 +217,7 @@ class PlainTextAnnotator(Annotator):
         endpoint = self.text.repository.url
         if urlparse(target).netloc == urlparse(endpoint).netloc:
             return manager.get_raw(target)
-        response = requests.get(target)
+        response = http.get(target)
         if response.status_code == requests.codes.OK:
             return response.content
         return
@@ -3,12 +3,12 @@ from django.db.models import Q, Count
 # from django.db.models.expressions import DateTime
 from django.utils.safestring import SafeText
 
-from annotations.models import Appellation, RelationSet, Relation
+from annotations.models import Appellation, RelationSet, Relation, Text
+from annotations.tokens import TokenIndex
 
 from collections import OrderedDict
 from itertools import groupby, combinations, chain
 import pytz
-import re
 
 
 def get_snippet_relation(relationset):
@@ -17,7 +17,7 @@ def get_snippet_relation(relationset):
     """
 
     appellation_type = ContentType.objects.get_for_model(Appellation)
-    tokenizedContent = relationset.occursIn.tokenizedContent
+    token_index = relationset.occursIn.token_index
     annotated_words = []
 
     # We'll use this to label highlighted tokens with their interpretations.
@@ -37,7 +37,7 @@ def get_snippet_relation(relationset):
 
     # Pull out all Appellations that have a specific textual basis.
     # Predicates too, since we're interested in evidence for the relation.
-    addAppellationIdsAndPredicates(appellation_ids, relationset, annotated_words, annotation_map, appellation_type, fields)
+    addAppellationIdsAndPredicates(relationset, appellation_ids, appellation_type, annotated_words, annotation_map, fields)
 
     appellation_fields = [
         'tokenIds',
@@ -77,16 +77,16 @@ def get_snippet_relation(relationset):
         start_index = max(0, min([int(t) for t in tokenSeq])) - 5
         end_index = max([int(t) for t in tokenSeq]) + 5
         for i in range(start_index, end_index):
-            match = re.search(r'<word id="'+str(i)+'">([^<]*)</word>', tokenizedContent, re.M|re.I)
-            if not match:
+            expression = token_index.expression(i)
+            if expression is None:
                 continue
             word = ""
             if str(i) in tokenSeq:
                 # Tooltip shows the interpretation (Concept) for this
                 #  Appellation.
-                word = "<strong data-toggle='tooltip' title='%s' class='text-warning text-snippet'>%s</strong>" % (annotation_map[str(i)], match.group(1))
+                word = "<strong data-toggle='tooltip' title='%s' class='text-warning text-snippet'>%s</strong>" % (annotation_map[str(i)], expression)
             else:
-                word = match.group(1)
+                word = expression
             snippet = '%s %s' % (snippet, word)
         combined_snippet += ' ...%s... ' % snippet.strip()
     return SafeText(combined_snippet)
@@ -112,14 +112,19 @@ def mapTokenInterpretations(annotated_words, appellation_fields, appellation_ids
                 else:
                     annotation_map[t] = appellation['interpretation__label']
 
-def get_snippet(appellation):
+def get_snippet(appellation, token_index=None):
     """
     Extract the text content surrounding (and including) an
     :class:`.Appellation` instance.
 
     Parameters
     ----------
-    appellation : :class:`annotations.models.Appellation`
+    appellation : dict
+        Values for an :class:`annotations.models.Appellation`, including
+        ``tokenIds``.
+    token_index : :class:`annotations.tokens.TokenIndex`
+        Index for the text in which the appellation occurs. If not provided,
+        one is built from ``appellation['occursIn__tokenizedContent']``.
 
     Returns
     -------
@@ -130,23 +135,24 @@ def get_snippet(appellation):
     if not appellation['tokenIds']:
         return SafeText('No snippet is available for this appellation')
 
-    tokenizedContent = appellation['occursIn__tokenizedContent']
+    if token_index is None:
+        token_index = TokenIndex.build(appellation['occursIn__tokenizedContent'])
     annotated_words = [i.strip() for i in appellation['tokenIds'].split(',')]
-    middle_index = int(annotated_words[max(len(annotated_words)/2, 0)])
+    middle_index = int(annotated_words[max(len(annotated_words)//2, 0)])
     start_index = max(middle_index - 10, 0)
     end_index = middle_index + 10
     snippet = ""
     for i in range(start_index, end_index):
-        match = re.search(r'<word id="'+str(i)+'">([^<]*)</word>', tokenizedContent, re.M|re.I)
-        if not match:
+        expression = token_index.expression(i)
+        if expression is None:
             continue
 
         word = ""
 
         if str(i) in annotated_words:
-            word = "<strong class='text-warning text-snippet'>%s</strong>" % match.group(1)
+            word = "<strong class='text-warning text-snippet'>%s</strong>" % expression
         else:
-            word = match.group(1)
+            word = expression
         snippet = '%s %s' % (snippet, word)
     return SafeText('...%s...' % snippet.strip())
 
@@ -175,16 +181,20 @@ def get_appellation_summaries(appellations):
         'interpretation__merged_with__label',
         'interpretation__merged_with__typed__label',
         'occursIn_id',
-        'occursIn__tokenizedContent',
         'tokenIds',
         'createdBy_id',
         'createdBy__username',
         'created',
     ]
 
-    appellations = appellations.values(*fields)
+    appellations = list(appellations.values(*fields))
     appellations_data = []
 
+    # Each text's token index is loaded once, rather than shipping the full
+    #  tokenized content along with every appellation.
+    texts = Text.objects.only('id', 'tokenizedContent', '_token_index')\
+                        .in_bulk({a['occursIn_id'] for a in appellations})
+
     appellation_creators = set()
     groupkey = lambda a: a['interpretation__merged_with_id'] if a['interpretation__merged_with_id'] else a['interpretation_id']
     for concept_id, concept_appellations in groupby(appellations, groupkey):
@@ -196,7 +206,7 @@ def get_appellation_summaries(appellations):
             if i == 0:
                 type_label, concept_label = _get_appellation_labels(appellation)
             indiv_appellations.append({
-                "text_snippet": get_snippet(appellation),
+                "text_snippet": get_snippet(appellation, texts[appellation['occursIn_id']].token_index),
                 "annotator_id": appellation['createdBy_id'],
                 "annotator_username": appellation['createdBy__username'],
                 "created": appellation['created'],
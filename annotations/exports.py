@@ -0,0 +1,245 @@
+"""
+CSV exports of annotations.
+
+Rows are produced by generators that read the database in chunks, so that an
+export can be streamed straight into a response or a file without holding the
+whole result in memory. Large exports are written to storage in a background
+thread and listed as :class:`.CsvDownloadList` entries once they are done.
+"""
+from collections import defaultdict
+import csv
+import io
+from itertools import islice
+import logging
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.files import File
+from django.db import connection
+
+from annotations.models import (Appellation, CsvDownloadList, DateAppellation,
+                                Relation)
+
+logger = logging.getLogger(__name__)
+
+
+EXPORT_CHUNK_SIZE = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+"""Number of rows read from the database at a time."""
+
+EXPORT_BACKGROUND_THRESHOLD = getattr(settings, 'EXPORT_BACKGROUND_THRESHOLD', 20000)
+"""Exports with more rows than this are generated in the background."""
+
+APPELLATION_HEADER = ["String Representation", "Start Position", "End Position", "Concept", "text"]
+
+
+def appellation_queryset(text_ids):
+    """
+    The :class:`.Appellation`\s exported for ``text_ids``\.
+
+    Returns
+    -------
+    :class:`django.db.models.QuerySet`
+    """
+    return Appellation.objects.filter(occursIn_id__in=text_ids)
+
+
+def appellation_rows(text_ids):
+    """
+    Generate CSV rows (including the header) for all of the
+    :class:`.Appellation`\s in ``text_ids``\.
+
+    Concept labels and text titles are joined in the same query, and the
+    results are read in chunks of :data:`.EXPORT_CHUNK_SIZE`\.
+    """
+    yield APPELLATION_HEADER
+    values = appellation_queryset(text_ids)\
+        .order_by('occursIn_id', 'id')\
+        .values_list('stringRep', 'startPos', 'endPos', 'interpretation__label',
+                     'occursIn__title')
+    for row in values.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield list(row)
+
+
+AFFILIATION_HEADER = ['project', 'created', 'text', 'affiliation', 'author']
+
+
+def _string_reps(targets):
+    """
+    Render generic relation targets, with one query per type.
+
+    :class:`.Appellation`\s are rendered as their ``stringRep``\, and
+    :class:`.DateAppellation`\s as their ``stringRep`` or their date. Nested
+    :class:`.Relation`\s (e.g. in templates with relation nodes, or temporal
+    data) are rendered as their source, predicate and object.
+
+    Parameters
+    ----------
+    targets : iterable
+        ``(content_type_id, object_id)`` tuples.
+
+    Returns
+    -------
+    dict
+        Keyed by ``(content_type_id, object_id)``\.
+    """
+    by_type = defaultdict(set)
+    for content_type_id, object_id in targets:
+        if content_type_id is not None and object_id is not None:
+            by_type[content_type_id].add(object_id)
+    reps = {}
+    for content_type_id, object_ids in by_type.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is Appellation:
+            for object_id, rep in Appellation.objects.filter(pk__in=object_ids)\
+                                                     .values_list('id', 'stringRep'):
+                reps[(content_type_id, object_id)] = rep
+        elif model is DateAppellation:
+            for date in DateAppellation.objects.filter(pk__in=object_ids)\
+                                               .only('id', 'year', 'month', 'day',
+                                                     'stringRep'):
+                reps[(content_type_id, date.id)] = date.stringRep or date.dateRepresentation
+        elif model is Relation:
+            relations = list(Relation.objects.filter(pk__in=object_ids)
+                                             .values_list('id', 'source_content_type_id',
+                                                          'source_object_id',
+                                                          'predicate__stringRep',
+                                                          'object_content_type_id',
+                                                          'object_object_id'))
+            nested = _string_reps([target for row in relations
+                                   for target in (row[1:3], row[4:6])])
+            for relation_id, *source, predicate, object_type, object_id in relations:
+                parts = [nested.get(tuple(source)), predicate,
+                         nested.get((object_type, object_id))]
+                reps[(content_type_id, relation_id)] = ' '.join(filter(None, parts))
+    return reps
+
+
+def affiliation_rows(project, relationsets):
+    """
+    Generate CSV rows (including the header) for affiliation
+    :class:`.RelationSet`\s.
+
+    The affiliation is the object of the first :class:`.Relation` in each
+    set, and the author is the source of the second. Each chunk of
+    :data:`.EXPORT_CHUNK_SIZE` sets is resolved with a fixed number of
+    queries.
+
+    Parameters
+    ----------
+    project : :class:`.TextCollection`
+    relationsets : :class:`django.db.models.QuerySet`
+    """
+    yield AFFILIATION_HEADER
+    sets = relationsets.order_by('id')\
+                       .values_list('id', 'created', 'occursIn__title')\
+                       .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    while True:
+        chunk = list(islice(sets, EXPORT_CHUNK_SIZE))
+        if not chunk:
+            break
+
+        constituents = defaultdict(list)
+        relations = Relation.objects.filter(part_of_id__in=[row[0] for row in chunk])\
+            .order_by('part_of_id', 'id')\
+            .values_list('part_of_id', 'source_content_type_id', 'source_object_id',
+                         'object_content_type_id', 'object_object_id')
+        for part_of_id, *targets in relations:
+            if len(constituents[part_of_id]) < 2:
+                constituents[part_of_id].append(targets)
+
+        wanted = {}
+        for relationset_id, _, _ in chunk:
+            first_second = constituents[relationset_id]
+            if len(first_second) == 2:
+                wanted[relationset_id] = (tuple(first_second[0][2:]),
+                                          tuple(first_second[1][:2]))
+        reps = _string_reps([target for pair in wanted.values() for target in pair])
+
+        for relationset_id, created, title in chunk:
+            affiliation, author = wanted.get(relationset_id, (None, None))
+            yield [project.name, created, title, reps.get(affiliation),
+                   reps.get(author)]
+
+
+class _Echo(object):
+    """
+    File-like object that returns what is written to it, so that
+    :func:`csv.writer` can be used to format rows one at a time.
+    """
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    """
+    Format ``rows`` as CSV, one line at a time.
+
+    Parameters
+    ----------
+    rows : iterable
+
+    Returns
+    -------
+    generator
+        Yields ``str``\.
+    """
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def save_csv(rows, user, prefix='export'):
+    """
+    Write ``rows`` to storage, and list the file for ``user``\.
+
+    Parameters
+    ----------
+    rows : iterable
+    user : :class:`.VogonUser`
+    prefix : str
+
+    Returns
+    -------
+    :class:`.CsvDownloadList`
+    """
+    with tempfile.TemporaryFile() as f:
+        text = io.TextIOWrapper(f, encoding='utf-8', newline='')
+        writer = csv.writer(text)
+        for row in rows:
+            writer.writerow(row)
+        text.flush()
+        f.seek(0)
+        download = CsvDownloadList(user=user)
+        # Convert to int first as a shortcut to round to whole number.
+        name = '%s_%i_%i.csv' % (prefix, user.id, int(time.time()))
+        download.file_field.save(name, File(f), save=True)
+        text.detach()
+    return download
+
+
+def save_csv_in_background(rows, user, prefix='export'):
+    """
+    Call :func:`.save_csv` in a separate thread.
+
+    ``rows`` should be a generator, so that nothing is read from the database
+    until the thread starts.
+
+    Returns
+    -------
+    :class:`threading.Thread`
+    """
+    def _run():
+        try:
+            save_csv(rows, user, prefix)
+        except Exception:
+            logger.exception('CSV export for user %s failed', user.id)
+        finally:
+            # Don't leak this thread's database connection.
+            connection.close()
+
+    thread = threading.Thread(target=_run, daemon=True)
+    thread.start()
+    return thread
@@ -2,7 +2,7 @@ import django_filters
 from django_filters.fields import IsoDateTimeField
 from django_filters import rest_framework as filters
 from django.forms import DateTimeField
-from annotations.models import RelationSet, TextCollection
+from annotations.models import RelationSet, Text, TextCollection
 from django.db.models import Q
 
 
@@ -16,7 +16,8 @@ class RelationSetFilter(django_filters.FilterSet):
     def filter_occursIn(self, queryset, name, value): 
         if not value:
             return queryset
-        return queryset.filter(Q(occursIn__uri=value) | Q(occursIn__part_of__uri=value) | Q(occursIn__part_of__part_of__uri=value))
+        # The text with this URI, and its parts at any depth.
+        return queryset.filter(occursIn__in=Text.objects.within(value))
 
     class Meta:
         model = RelationSet
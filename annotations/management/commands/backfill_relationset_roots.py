@@ -0,0 +1,50 @@
+"""
+Store the root :class:`.Relation` of every :class:`.RelationSet` that does not
+have one yet. See :meth:`.RelationSet.update_root`.
+"""
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from annotations.models import RelationSet, Relation
+
+
+class Command(BaseCommand):
+    help = 'Store the root relation for relationsets that are missing it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--all', action='store_true',
+                            help='Recalculate roots that are already set.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = RelationSet.objects.order_by('id')
+        if not options['all']:
+            queryset = queryset.filter(root_relation__isnull=True)
+
+        updated = 0
+        last_id = 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id)
+                                 .only('id', 'root_relation')[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            constituents = defaultdict(list)
+            for relation in Relation.objects.filter(part_of__in=batch).order_by('id'):
+                constituents[relation.part_of_id].append(relation)
+
+            changed = []
+            for relationset in batch:
+                relations = constituents[relationset.id]
+                if not relations:
+                    continue
+                relationset.root_relation_id = RelationSet.find_root_id(relations)
+                changed.append(relationset)
+            RelationSet.objects.bulk_update(changed, ['root_relation'])
+            updated += len(changed)
+            self.stdout.write('Updated %i relationsets' % updated)
+
+        self.stdout.write(self.style.SUCCESS('Done. Updated %i relationsets' % updated))
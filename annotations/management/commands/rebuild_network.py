@@ -0,0 +1,29 @@
+"""
+Recalculate the stored co-occurrence network. See :mod:`annotations.network`.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from annotations.models import NetworkEdge, NetworkNode, TextCollection
+from annotations.network import rebuild_network
+
+
+class Command(BaseCommand):
+    help = 'Recalculate the concept co-occurrence network from relationsets.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int,
+                            help='Only rebuild the network for this project ID.')
+
+    def handle(self, *args, **options):
+        project = None
+        if options['project'] is not None:
+            try:
+                project = TextCollection.objects.get(pk=options['project'])
+            except TextCollection.DoesNotExist:
+                raise CommandError('No such project: %i' % options['project'])
+
+        rebuild_network(project)
+        self.stdout.write(self.style.SUCCESS(
+            'Done. Stored %i nodes and %i edges' % (NetworkNode.objects.count(),
+                                                    NetworkEdge.objects.count())
+        ))
@@ -0,0 +1,19 @@
+"""
+Recalculate the stored user and project counts. See
+:mod:`annotations.statistics`.
+"""
+from django.core.management.base import BaseCommand
+
+from annotations.models import ProjectStatistics, UserStatistics
+from annotations.statistics import rebuild_statistics
+
+
+class Command(BaseCommand):
+    help = 'Recalculate the stored annotation counts for users and projects.'
+
+    def handle(self, *args, **options):
+        rebuild_statistics()
+        self.stdout.write(self.style.SUCCESS(
+            'Done. Stored counts for %i users and %i projects' % (
+                UserStatistics.objects.count(), ProjectStatistics.objects.count())
+        ))
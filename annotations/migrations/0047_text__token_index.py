@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('annotations', '0046_auto_20240131_0028'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='text',
+            name='_token_index',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
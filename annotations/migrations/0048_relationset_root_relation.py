@@ -0,0 +1,19 @@
+# Generated by Django 2.2.16 on 2026-10-18 10:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('annotations', '0047_text__token_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='relationset',
+            name='root_relation',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='annotations.Relation'),
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 2.2.16 on 2026-10-18 11:20
+
+from collections import Counter, defaultdict
+from itertools import combinations
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_network(apps, schema_editor):
+    """
+    Fill the store from the terminal nodes of existing RelationSets (see
+    :func:`annotations.network.rebuild_network`\).
+    """
+    RelationSet = apps.get_model('annotations', 'RelationSet')
+    NetworkNode = apps.get_model('annotations', 'NetworkNode')
+    NetworkEdge = apps.get_model('annotations', 'NetworkEdge')
+    through = RelationSet.terminal_nodes.through
+
+    scopes = {
+        relationset_id: scope
+        for relationset_id, *scope in RelationSet.objects.values_list(
+            'id', 'project_id', 'occursIn_id', 'createdBy_id').iterator()
+    }
+    nodes = defaultdict(set)
+    for relationset_id, concept_id in through.objects.values_list(
+            'relationset_id', 'concept_id').iterator():
+        nodes[relationset_id].add(concept_id)
+
+    node_weights = Counter()
+    edge_weights = Counter()
+    for relationset_id, concepts in nodes.items():
+        scope = tuple(scopes[relationset_id])
+        for source, target in combinations(sorted(concepts), 2):
+            edge_weights[(scope, source, target)] += 1
+        if len(concepts) > 1:
+            for concept_id in concepts:
+                node_weights[(scope, concept_id)] += len(concepts) - 1
+
+    def _scope(scope):
+        return dict(zip(('project_id', 'occursIn_id', 'createdBy_id'), scope))
+
+    NetworkNode.objects.bulk_create([
+        NetworkNode(concept_id=concept_id, weight=weight, **_scope(scope))
+        for (scope, concept_id), weight in node_weights.items()
+    ], batch_size=500)
+    NetworkEdge.objects.bulk_create([
+        NetworkEdge(source_id=source_id, target_id=target_id, weight=weight,
+                    **_scope(scope))
+        for (scope, source_id, target_id), weight in edge_weights.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('concepts', '__first__'),
+        ('annotations', '0048_relationset_root_relation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NetworkNode',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight', models.IntegerField(default=0)),
+                ('concept', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='concepts.Concept')),
+                ('createdBy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('occursIn', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='annotations.Text')),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='annotations.TextCollection')),
+            ],
+            options={
+                'unique_together': {('project', 'occursIn', 'createdBy', 'concept')},
+            },
+        ),
+        migrations.CreateModel(
+            name='NetworkEdge',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight', models.IntegerField(default=0)),
+                ('createdBy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('occursIn', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='annotations.Text')),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='annotations.TextCollection')),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='concepts.Concept')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='concepts.Concept')),
+            ],
+            options={
+                'unique_together': {('project', 'occursIn', 'createdBy', 'source', 'target')},
+            },
+        ),
+        migrations.RunPython(build_network, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('annotations', '0049_network_store'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='text',
+            name='content_encoding',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 2.2.16 on 2026-10-18 13:30
+
+from collections import Counter, defaultdict
+import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+from django.db.models.functions import TruncWeek
+
+
+def fill_statistics(apps, schema_editor):
+    """
+    Count existing annotations, texts and relations (see
+    :func:`annotations.statistics.rebuild_statistics`\).
+    """
+    Appellation = apps.get_model('annotations', 'Appellation')
+    Relation = apps.get_model('annotations', 'Relation')
+    RelationSet = apps.get_model('annotations', 'RelationSet')
+    Text = apps.get_model('annotations', 'Text')
+    TextCollection = apps.get_model('annotations', 'TextCollection')
+    UserStatistics = apps.get_model('annotations', 'UserStatistics')
+    ProjectStatistics = apps.get_model('annotations', 'ProjectStatistics')
+    WeeklyActivity = apps.get_model('annotations', 'WeeklyActivity')
+
+    users = defaultdict(dict)
+    weeks = Counter()
+    for model, field in ((Appellation, 'appellation_count'),
+                         (Relation, 'relation_count')):
+        for user_id, count in model.objects.values('createdBy_id')\
+                                           .annotate(count=Count('id'))\
+                                           .values_list('createdBy_id', 'count'):
+            users[user_id][field] = count
+        by_week = model.objects.annotate(week=TruncWeek('created'))\
+                               .values('createdBy_id', 'week')\
+                               .annotate(count=Count('id'))\
+                               .values_list('createdBy_id', 'week', 'count')
+        for user_id, week, count in by_week:
+            if isinstance(week, datetime.datetime):
+                week = week.date()
+            weeks[(user_id, week - datetime.timedelta(days=week.weekday()))] += count
+    for user_id, count in Text.objects.values('addedBy_id')\
+                                      .annotate(count=Count('id'))\
+                                      .values_list('addedBy_id', 'count'):
+        users[user_id]['text_count'] = count
+
+    projects = defaultdict(lambda: [0, 0])
+    for project_id, count in TextCollection.texts.through.objects\
+            .values('textcollection_id')\
+            .annotate(count=Count('id'))\
+            .values_list('textcollection_id', 'count'):
+        projects[project_id][0] = count
+    for project_id, count in RelationSet.objects.values('occursIn__partOf')\
+                                                .annotate(count=Count('id'))\
+                                                .values_list('occursIn__partOf', 'count'):
+        if project_id is not None:
+            projects[project_id][1] = count
+
+    UserStatistics.objects.bulk_create([
+        UserStatistics(user_id=user_id, **counts)
+        for user_id, counts in users.items()
+        if user_id is not None
+    ], batch_size=500)
+    WeeklyActivity.objects.bulk_create([
+        WeeklyActivity(user_id=user_id, week=week, count=count)
+        for (user_id, week), count in weeks.items()
+        if user_id is not None
+    ], batch_size=500)
+    ProjectStatistics.objects.bulk_create([
+        ProjectStatistics(project_id=project_id,
+                          text_count=projects[project_id][0],
+                          relation_count=projects[project_id][1])
+        for project_id in TextCollection.objects.values_list('id', flat=True)
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('annotations', '0050_text_content_encoding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectStatistics',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistics', serialize=False, to='annotations.TextCollection')),
+                ('text_count', models.IntegerField(default=0)),
+                ('relation_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserStatistics',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistics', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('appellation_count', models.IntegerField(default=0)),
+                ('relation_count', models.IntegerField(default=0)),
+                ('text_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WeeklyActivity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'week')},
+            },
+        ),
+        migrations.RunPython(fill_statistics, migrations.RunPython.noop),
+    ]
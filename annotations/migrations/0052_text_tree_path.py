@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-18 14:10
+
+from django.db import migrations, models
+
+
+def set_tree_paths(apps, schema_editor):
+    """
+    Build the path of every text, one level of the hierarchy at a time.
+    """
+    Text = apps.get_model('annotations', 'Text')
+    paths = {}
+    level = list(Text.objects.filter(part_of__isnull=True).values_list('id', 'part_of_id'))
+    while level:
+        updated = []
+        for text_id, parent_id in level:
+            paths[text_id] = '%s%i/' % (paths.get(parent_id, '/'), text_id)
+            updated.append(Text(id=text_id, tree_path=paths[text_id]))
+        Text.objects.bulk_update(updated, ['tree_path'], batch_size=500)
+        level = list(Text.objects.filter(part_of_id__in=[text_id for text_id, _ in level])
+                                 .values_list('id', 'part_of_id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('annotations', '0051_statistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='text',
+            name='tree_path',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=255),
+        ),
+        migrations.RunPython(set_tree_paths, migrations.RunPython.noop),
+    ]
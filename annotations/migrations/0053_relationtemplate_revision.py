@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('annotations', '0052_text_tree_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='relationtemplate',
+            name='revision',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -43,6 +43,7 @@ Detailed descriptions
 import ast
 import networkx as nx
 from django.db import models
+from django.db.models.functions import Concat, Substr
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.fields import GenericRelation
 from django.contrib.contenttypes.models import ContentType
@@ -54,6 +55,7 @@ from django.contrib.auth.models import (
 from django.utils.translation import ugettext_lazy as _
 
 from concepts.models import Concept, Type
+from annotations.tokens import TokenIndex, content_digest
 from django.utils import timezone
 
 
@@ -341,6 +343,69 @@ class TextCollection(models.Model):
 #
 
 
+class TextQuerySet(models.QuerySet):
+    """
+    Hierarchy lookups for :class:`.Text`\s, using :attr:`.Text.tree_path`\.
+    """
+
+    def descendants(self, text, include_self=True):
+        """
+        All of the parts of ``text``\, at any depth, in a single query.
+
+        Ordered by path, so that each text comes before its parts.
+
+        Parameters
+        ----------
+        text : :class:`.Text`
+        include_self : bool
+
+        Returns
+        -------
+        :class:`.TextQuerySet`
+        """
+        if not text.tree_path:    # Not saved yet.
+            return self.filter(pk=text.pk)
+        queryset = self.filter(tree_path__startswith=text.tree_path)
+        if not include_self:
+            queryset = queryset.exclude(pk=text.pk)
+        return queryset.order_by('tree_path')
+
+    def ancestors(self, text, include_self=False):
+        """
+        The texts that ``text`` is part of, in a single query.
+
+        Ordered from the top-level text down.
+
+        Parameters
+        ----------
+        text : :class:`.Text`
+        include_self : bool
+
+        Returns
+        -------
+        :class:`.TextQuerySet`
+        """
+        ids = text.path_ids
+        if not include_self:
+            ids = [text_id for text_id in ids if text_id != text.pk]
+        return self.filter(pk__in=ids).order_by('tree_path')
+
+    def within(self, uri):
+        """
+        Texts with ``uri``\, and all of their parts.
+
+        Returns
+        -------
+        :class:`.TextQuerySet`
+        """
+        paths = self.model.objects.filter(uri=uri).values_list('tree_path', flat=True)
+        query = models.Q(pk__in=[])
+        for path in paths:
+            if path:
+                query |= models.Q(tree_path__startswith=path)
+        return self.filter(query)
+
+
 class Text(models.Model):
     """
     Represents a document that is available for annotation.
@@ -348,8 +413,18 @@ class Text(models.Model):
     .. todo:: Add a field to store arbitrary metadata about the document.
     """
 
+    objects = TextQuerySet.as_manager()
+
     part_of = models.ForeignKey('Text', related_name='parts', null=True, blank=True, on_delete=models.CASCADE)
 
+    tree_path = models.CharField(max_length=255, blank=True, default='',
+                                 db_index=True)
+    """
+    IDs of the texts that this text is :attr:`.part_of` (from the top-level
+    text down), followed by its own ID, e.g. ``/1/5/12/``\. Maintained by
+    :meth:`.save`\; see :class:`.TextQuerySet`\.
+    """
+
     uri = models.CharField(max_length=255, unique=True,
                            help_text="Uniform Resource Identifier. This should"
                            " be sufficient to retrieve text from a repository.")
@@ -377,6 +452,13 @@ class Text(models.Model):
     Text should already be tagged, with <word> elements delimiting tokens.
     """
 
+    _token_index = models.TextField(blank=True, null=True)
+    """
+    Serialized :class:`annotations.tokens.TokenIndex` for
+    :attr:`.tokenizedContent`. Use :attr:`.token_index` instead of accessing
+    this field directly.
+    """
+
     title = models.CharField(max_length=1000, help_text="""The
                              original title of the document.""")
     """The original title of the document."""
@@ -412,6 +494,13 @@ class Text(models.Model):
     content_type = models.CharField(max_length=255)
     """MIME type"""
 
+    content_encoding = models.CharField(max_length=50, blank=True, null=True)
+    """
+    Character encoding of the content retrieved from the repository, as
+    detected when the text was last loaded (see
+    :func:`repository.encoding.decode`\).
+    """
+
     originalResource = models.URLField(blank=True, null=True)
     """
     The (online) location of the original resource, or its digital
@@ -430,6 +519,51 @@ class Text(models.Model):
     available.
     """
 
+    @property
+    def path_ids(self):
+        """
+        IDs in :attr:`.tree_path`\, from the top-level text down.
+        """
+        return [int(text_id) for text_id in self.tree_path.split('/') if text_id]
+
+    def save(self, *args, **kwargs):
+        super(Text, self).save(*args, **kwargs)
+        self.update_tree_path()
+
+    def update_tree_path(self):
+        """
+        Set :attr:`.tree_path` from :attr:`.part_of`\. If the text has moved,
+        the paths of its parts are updated as well.
+        """
+        parent_path = ''
+        if self.part_of_id:
+            if Text.part_of.is_cached(self):
+                parent_path = self.part_of.tree_path
+            else:
+                parent_path = Text.objects.filter(pk=self.part_of_id)\
+                                          .values_list('tree_path', flat=True).first()
+        path = '%s%i/' % (parent_path or '/', self.pk)
+        if path == self.tree_path:
+            return
+
+        old_path = self.tree_path
+        Text.objects.filter(pk=self.pk).update(tree_path=path)
+        if old_path:
+            Text.objects.filter(tree_path__startswith=old_path)\
+                        .exclude(pk=self.pk)\
+                        .update(tree_path=Concat(models.Value(path),
+                                                 Substr('tree_path', len(old_path) + 1)))
+        self.tree_path = path
+
+    def remember_encoding(self, encoding):
+        """
+        Store the detected :attr:`.content_encoding`\, if it has changed.
+        """
+        if encoding and encoding != self.content_encoding:
+            self.content_encoding = encoding
+            if self.pk:
+                Text.objects.filter(pk=self.pk).update(content_encoding=encoding)
+
     def get_absolute_url(self):
         return reverse('repository_text', args=(self.repository.id, self.top_level_text.repository_source_id))
 
@@ -439,6 +573,8 @@ class Text(models.Model):
         The combined number of :class:`.Appellation`\s and :class:`.Relation`\s
         that have been created using this text.
         """
+        if hasattr(self, '_prefetched_annotation_count'):
+            return self._prefetched_annotation_count
         return self.appellation_set.count() + self.relation_set.count()
 
     @property
@@ -449,24 +585,52 @@ class Text(models.Model):
         """
         return self.relation_set.count()
 
+    @property
+    def token_index(self):
+        """
+        The :class:`annotations.tokens.TokenIndex` for
+        :attr:`.tokenizedContent`.
+
+        The index is built on first use and persisted. If
+        :attr:`.tokenizedContent` has changed since the index was built, it is
+        rebuilt.
+        """
+        index = getattr(self, '_token_index_cache', None)
+        if index is not None and self._token_index_source is self.tokenizedContent:
+            return index
+
+        digest = content_digest(self.tokenizedContent)
+        index = TokenIndex.loads(self._token_index)
+        if index is None or index.digest != digest:
+            index = TokenIndex.build(self.tokenizedContent, digest)
+            self._token_index = index.dumps()
+            if self.pk:
+                Text.objects.filter(pk=self.pk).update(_token_index=self._token_index)
+
+        self._token_index_cache = index
+        self._token_index_source = self.tokenizedContent
+        return index
+
     @property
     def top_level_text(self):
-        def _re(text):
-            if text.part_of:
-                return _re(text.part_of)
-            return text
-        return _re(self)
+        if hasattr(self, '_prefetched_top_level_text'):
+            return self._prefetched_top_level_text
+
+        ids = self.path_ids
+        if not ids:    # Not saved yet.
+            return self.part_of.top_level_text if self.part_of_id else self
+        if ids[0] == self.pk:
+            return self
+        return Text.objects.get(pk=ids[0])
 
     @property
     def children(self):
-        children = []
-
-        def _re(text):
-            children.append(text.id)
-            if text.parts.count() > 0:
-                list(map(_re, text.parts.all()))
-        _re(self)
-        return children
+        """
+        IDs of this text and all of its parts, at any depth.
+        """
+        if hasattr(self, '_prefetched_children'):
+            return self._prefetched_children
+        return list(Text.objects.descendants(self).values_list('id', flat=True))
 
 
     def __unicode__(self):
@@ -775,6 +939,51 @@ class Appellation(Annotation, Interpreted):
     """
 
 
+class RelationSetQuerySet(models.QuerySet):
+    """
+    Provides set-based readiness checks for :class:`.RelationSet`\s.
+    """
+
+    def with_readiness(self):
+        """
+        Annotate each :class:`.RelationSet` with ``is_ready``, computed in the
+        database. See :meth:`.RelationSet.ready`\.
+
+        A :class:`.RelationSet` is ready if none of the :class:`.Appellation`\s
+        in its constituent :class:`.Relation`\s (including predicates) refers to
+        a :class:`.Concept` that is neither resolved nor merged.
+
+        Returns
+        -------
+        :class:`.RelationSetQuerySet`
+        """
+        unready_states = [state for state, _ in Concept.concept_state_choices
+                          if state != Concept.RESOLVED]
+
+        def _unready(path):
+            return models.Q(**{
+                '%s__interpretation__concept_state__in' % path: unready_states,
+                '%s__interpretation__merged_with__isnull' % path: True,
+            })
+
+        blocking = Relation.objects.filter(part_of=models.OuterRef('pk'))\
+                                   .filter(_unready('predicate')
+                                           | _unready('source_appellations')
+                                           | _unready('object_appellations'))
+        return self.annotate(is_ready=~models.Exists(blocking))
+
+    def ready(self):
+        """
+        Limit to :class:`.RelationSet`\s that are ready for submission to
+        Quadriga, in a single query.
+
+        Returns
+        -------
+        :class:`.RelationSetQuerySet`
+        """
+        return self.with_readiness().filter(is_ready=True)
+
+
 class RelationSet(models.Model):
     """
     A :class:`.RelationSet` organizes :class:`.Relation`\s into complete
@@ -825,8 +1034,24 @@ class RelationSet(models.Model):
     representation = models.TextField(null=True, blank=True)
     terminal_nodes = models.ManyToManyField(Concept)
 
+    objects = RelationSetQuerySet.as_manager()
+
+    root_relation = models.ForeignKey('Relation', blank=True, null=True,
+                                      related_name='+', on_delete=models.SET_NULL)
+    """
+    The highest-level :class:`.Relation` in the set. This is maintained by
+    :meth:`.update_root`; use :attr:`.root` to access it.
+    """
+
+    # The results of the following methods and properties can be loaded in
+    #  bulk for many RelationSets at once; see
+    #  annotations.prefetch.prefetch_relationsets().
+
     @property
     def date_appellations_with_predicate(self):
+        if hasattr(self, '_prefetched_date_appellations_with_predicate'):
+            return self._prefetched_date_appellations_with_predicate
+
         dtype = ContentType.objects.get_for_model(DateAppellation)
 
         appellations = []
@@ -842,6 +1067,10 @@ class RelationSet(models.Model):
 
     @property
     def date_appellations(self):
+        if hasattr(self, '_prefetched_date_appellations_with_predicate'):
+            return [appellation for _, appellation
+                    in self._prefetched_date_appellations_with_predicate]
+
         dtype = ContentType.objects.get_for_model(DateAppellation)
 
         appellations = []
@@ -861,11 +1090,63 @@ class RelationSet(models.Model):
         """
         Identifies and retrieves the highest-level or "starting"
         :class:`.Relation` in the :class:`.RelationSet`\.
+
+        The result is stored in :attr:`.root_relation`, so that it only has to
+        be worked out once.
+        """
+        if self.root_relation_id is None:
+            self.update_root()
+        return self.root_relation
+
+    def update_root(self, relations=None):
         """
-        # If this RelationSet is not nested, then there will by only one
-        #  Relation -- that's all we need.
-        if self.constituents.count() == 1:
-            return self.constituents.first()
+        Work out the root :class:`.Relation` and store it in
+        :attr:`.root_relation`\.
+
+        This should be called whenever the constituents of the
+        :class:`.RelationSet` change.
+
+        Parameters
+        ----------
+        relations : iterable
+            The constituent :class:`.Relation`\s, if they are already loaded.
+
+        Returns
+        -------
+        :class:`.Relation` or None
+        """
+        if relations is None:
+            relations = self.constituents.all()
+        relations = list(relations)
+
+        root = None
+        if relations:
+            root_id = RelationSet.find_root_id(relations)
+            root = next(relation for relation in relations if relation.id == root_id)
+        self.root_relation = root
+
+        if self.pk:
+            RelationSet.objects.filter(pk=self.pk).update(root_relation=root)
+        return root
+
+    @staticmethod
+    def find_root_id(relations):
+        """
+        Identify the highest-level :class:`.Relation` among ``relations``.
+
+        Parameters
+        ----------
+        relations : iterable
+            The :class:`.Relation`\s in a :class:`.RelationSet`\.
+
+        Returns
+        -------
+        int
+            The primary key of the root :class:`.Relation`\.
+        """
+        relations = list(relations)
+        if len(relations) == 1:
+            return relations[0].id
 
         relation_type = ContentType.objects.get_for_model(Relation)
 
@@ -873,17 +1154,17 @@ class RelationSet(models.Model):
         #  referenced by any other Relation. If we represent the RelationSet
         #  as a directed graph, this will be the node with an in-degree of 0.
         dg = nx.DiGraph()
-        for relation in self.constituents.all():
+        for relation in relations:
             for part in ['source', 'object']:
-                target_type = getattr(relation, '%s_content_type' % part)
-                if target_type.id == relation_type.id:
+                target_type_id = getattr(relation, '%s_content_type_id' % part)
+                if target_type_id == relation_type.id:
                     target = getattr(relation, '%s_object_id' % part)
                     # Each node represents a Relation by its primary key ID.
                     dg.add_edge(relation.id, target)
 
         # Topological sort is supposed to be faster than calculating in-degree
         #  and searching for the 0-valued node.
-        return Relation.objects.get(pk=list(nx.topological_sort(dg))[0])
+        return list(nx.topological_sort(dg))[0]
 
     @property
     def label(self):
@@ -912,12 +1193,23 @@ class RelationSet(models.Model):
         This aids the process of submitting annotations to Quadriga: all
         :class:`.Concept`\s must be present in Conceptpower prior to submission.
 
+        If the :class:`.RelationSet` was loaded with
+        :meth:`.RelationSetQuerySet.with_readiness`\, no further queries are
+        needed.
+
         Returns
         -------
         bool
         """
+        if hasattr(self, 'is_ready'):
+            return self.is_ready
+
         criteria = lambda s: s[0] == Concept.RESOLVED or s[1]
-        values = self.concepts().values_list('concept_state', 'merged_with')
+        if hasattr(self, '_prefetched_concepts'):
+            values = [(concept.concept_state, concept.merged_with_id)
+                      for concept in self._prefetched_concepts]
+        else:
+            values = self.concepts().values_list('concept_state', 'merged_with')
         return all(map(criteria, values))
     ready.boolean = True    # So that we can display a nifty icon in changelist.
 
@@ -927,8 +1219,13 @@ class RelationSet(models.Model):
 
         Returns
         -------
-        :class:`django.db.models.query.QuerySet`
+        :class:`django.db.models.query.QuerySet` or list
+            A list if the :class:`.RelationSet` was loaded with
+            :func:`annotations.prefetch.prefetch_relationsets`\.
         """
+        if hasattr(self, '_prefetched_appellations'):
+            return self._prefetched_appellations
+
         appellation_type = ContentType.objects.get_for_model(Appellation)
 
         appellation_ids = []
@@ -948,8 +1245,13 @@ class RelationSet(models.Model):
 
         Returns
         -------
-        :class:`django.db.models.query.QuerySet`
+        :class:`django.db.models.query.QuerySet` or list
+            A list if the :class:`.RelationSet` was loaded with
+            :func:`annotations.prefetch.prefetch_relationsets`\.
         """
+        if hasattr(self, '_prefetched_concepts'):
+            return self._prefetched_concepts
+
         qs = self.appellations().values_list('interpretation_id', flat=True)
         interpretation_ids = list(qs)    # <-- DB hit.
         return Concept.objects.filter(pk__in=interpretation_ids)
@@ -1016,9 +1318,26 @@ class RelationTemplate(models.Model):
     _terminal_nodes = models.TextField(blank=True, null=True)
     use_in_mass_assignment = models.BooleanField(default=False)
 
+    revision = models.PositiveIntegerField(default=0)
+    """
+    Incremented whenever the template or its parts change, so that compiled
+    templates (see :func:`annotations.relations.compile_template`\) can be
+    cached.
+    """
+
     def __str__(self):
         return self.name
 
+    def bump_revision(self):
+        """
+        Invalidate compiled copies of this template.
+        """
+        RelationTemplate.objects.filter(pk=self.pk)\
+                                .update(revision=models.F('revision') + 1)
+        self.revision = RelationTemplate.objects.filter(pk=self.pk)\
+                                                .values_list('revision', flat=True)\
+                                                .first() or 0
+
     def _get_terminal_nodes(self):
         return self._terminal_nodes
 
@@ -1168,4 +1487,96 @@ class DocumentPosition(models.Model):
 class CsvDownloadList(models.Model):
     user = models.ForeignKey(VogonUser, on_delete=models.DO_NOTHING)
     file_field = models.FileField(null=True, upload_to='csv_export/')
-    created = models.DateTimeField(default=timezone.now) 
\ No newline at end of file
+    created = models.DateTimeField(default=timezone.now) 
+
+class NetworkNode(models.Model):
+    """
+    A :class:`concepts.models.Concept` in the co-occurrence network of the
+    :class:`.RelationSet`\s that a user created for a :class:`.Text` in a
+    project.
+
+    Maintained incrementally by :mod:`annotations.network`\.
+    """
+
+    project = models.ForeignKey('TextCollection', null=True, blank=True,
+                                related_name='+', on_delete=models.CASCADE)
+    occursIn = models.ForeignKey('Text', related_name='+', on_delete=models.CASCADE)
+    createdBy = models.ForeignKey('VogonUser', related_name='+', on_delete=models.CASCADE)
+    concept = models.ForeignKey(Concept, related_name='+', on_delete=models.CASCADE)
+
+    weight = models.IntegerField(default=0)
+    """
+    The number of co-occurrences (edges) that the concept takes part in,
+    counted once per :class:`.RelationSet`\.
+    """
+
+    class Meta:
+        unique_together = (('project', 'occursIn', 'createdBy', 'concept'),)
+
+
+class NetworkEdge(models.Model):
+    """
+    Two :class:`concepts.models.Concept`\s that are terminal nodes of the
+    same :class:`.RelationSet`\. See :class:`.NetworkNode`\.
+    """
+
+    project = models.ForeignKey('TextCollection', null=True, blank=True,
+                                related_name='+', on_delete=models.CASCADE)
+    occursIn = models.ForeignKey('Text', related_name='+', on_delete=models.CASCADE)
+    createdBy = models.ForeignKey('VogonUser', related_name='+', on_delete=models.CASCADE)
+    source = models.ForeignKey(Concept, related_name='+', on_delete=models.CASCADE)
+    target = models.ForeignKey(Concept, related_name='+', on_delete=models.CASCADE)
+    """``source_id`` is always lower than ``target_id``\."""
+
+    weight = models.IntegerField(default=0)
+    """The number of :class:`.RelationSet`\s in which the concepts co-occur."""
+
+    class Meta:
+        unique_together = (('project', 'occursIn', 'createdBy', 'source', 'target'),)
+
+
+class UserStatistics(models.Model):
+    """
+    Stored annotation counts for a :class:`.VogonUser`\, so that the user list
+    does not need to aggregate over all of their annotations.
+
+    Maintained incrementally by :mod:`annotations.statistics`\.
+    """
+
+    user = models.OneToOneField('VogonUser', primary_key=True,
+                                related_name='statistics', on_delete=models.CASCADE)
+
+    appellation_count = models.IntegerField(default=0)
+    relation_count = models.IntegerField(default=0)
+    text_count = models.IntegerField(default=0)
+    """The number of :class:`.Text`\s that the user added."""
+
+
+class ProjectStatistics(models.Model):
+    """
+    Stored counts for a :class:`.TextCollection`\. See
+    :class:`.UserStatistics`\.
+    """
+
+    project = models.OneToOneField('TextCollection', primary_key=True,
+                                   related_name='statistics', on_delete=models.CASCADE)
+
+    text_count = models.IntegerField(default=0)
+    relation_count = models.IntegerField(default=0)
+    """The number of :class:`.RelationSet`\s in the texts of the project."""
+
+
+class WeeklyActivity(models.Model):
+    """
+    The number of :class:`.Appellation`\s and :class:`.Relation`\s that a user
+    created in a week, for the activity chart on their profile.
+    """
+
+    user = models.ForeignKey('VogonUser', related_name='+', on_delete=models.CASCADE)
+    week = models.DateField()
+    """The Monday that the week starts on."""
+
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = (('user', 'week'),)
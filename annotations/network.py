@@ -1,57 +1,232 @@
-from itertools import groupby, combinations
-from collections import Counter
-from .models import Appellation
-
-def network_data(relationsets, text_id=None, appellation_queryset=None):
-    """
-    Use the :prop:`.RelationSet.terminal_nodes` to build a graph.
-    """
-    if appellation_queryset is None:
-        appellation_queryset = Appellation.objects.all()
-
-    nodes = {}
-    edges = Counter()
-    fields = [
-        'id',
-        'terminal_nodes__id',
-        'terminal_nodes__label',
-        'terminal_nodes__uri',
-        'terminal_nodes__typed__id',
-        'terminal_nodes__typed__label',
-        'terminal_nodes__typed__uri'
-    ]
-    for rset_id, data in groupby(relationsets.values(*fields), key=lambda r: r['id']):
-        for source, target in combinations(data, 2):
-            key = tuple(sorted(
-                [source['terminal_nodes__id'], target['terminal_nodes__id']]
-            ))
-            edges[key] += 1.
-
-            for datum in [source, target]:
-                if datum['terminal_nodes__id'] in nodes:
-                    nodes[datum['terminal_nodes__id']]['data']['weight'] += 1.
-                else:
-                    appellations = appellation_queryset.filter(
-                        interpretation_id=datum['terminal_nodes__id']
-                    ).values_list('id', flat=True)
-                    nodes[datum['terminal_nodes__id']] = {
-                        'data': {
-                            'id': datum['terminal_nodes__id'],
-                            'label': datum['terminal_nodes__label'],
-                            'uri': datum['terminal_nodes__uri'],
-                            'type': datum['terminal_nodes__typed__id'],
-                            'type_label': datum['terminal_nodes__typed__label'],
-                            'type_uri': datum['terminal_nodes__typed__uri'],
-                            'weight': 1.,
-                            'appellations': list(appellations)
-                        }
-                    }
-
-    edges = {
-        k: {
-            'data': {'weight': v, 'source': k[0], 'target': k[1]}
-        } for k, v in edges.items()
-    }
-    return {
-        'elements': list(nodes.values()) + list(edges.values())
-    }
+"""
+Co-occurrence network of the :class:`concepts.models.Concept`\s in
+:class:`.RelationSet`\s, for the graph tab in the text annotation view.
+
+Every :class:`.RelationSet` with ``k`` terminal nodes contributes one edge for
+each pair of its terminal nodes, and ``k - 1`` to the weight of each node. The
+sum of those contributions is stored per project, text and user as
+:class:`.NetworkNode`\s and :class:`.NetworkEdge`\s, and is updated
+incrementally (see :mod:`annotations.signals`\) when terminal nodes are added
+or removed, or a :class:`.RelationSet` is deleted. Reading the graph therefore
+does not depend on the number of :class:`.RelationSet`\s.
+
+If the store gets out of step (e.g. after a bulk update that bypasses
+signals), use the ``rebuild_network`` management command.
+"""
+from collections import Counter, defaultdict
+from itertools import combinations
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from annotations.models import (Appellation, NetworkEdge, NetworkNode,
+                                RelationSet)
+from annotations.workspace import WORKSPACE_CACHE_TIMEOUT, workspace_version
+
+
+SCOPE_FIELDS = ('project_id', 'occursIn_id', 'createdBy_id')
+
+
+def relationset_nodes(relationset_ids):
+    """
+    Load the terminal nodes of :class:`.RelationSet`\s, along with the part of
+    the network that they belong to.
+
+    Parameters
+    ----------
+    relationset_ids : iterable or :class:`django.db.models.QuerySet`
+
+    Returns
+    -------
+    dict
+        ``(scope, nodes)`` keyed by :class:`.RelationSet` ID, where ``scope``
+        is a tuple of :data:`.SCOPE_FIELDS` and ``nodes`` is a set of
+        :class:`concepts.models.Concept` IDs.
+    """
+    scopes = RelationSet.objects.filter(pk__in=relationset_ids)\
+                                .values_list('id', *SCOPE_FIELDS)
+    nodes = defaultdict(set)
+    through = RelationSet.terminal_nodes.through.objects
+    for relationset_id, concept_id in through.filter(relationset_id__in=relationset_ids)\
+                                             .values_list('relationset_id', 'concept_id'):
+        nodes[relationset_id].add(concept_id)
+    return {row[0]: (tuple(row[1:]), nodes[row[0]]) for row in scopes}
+
+
+def _tally(contributions, sign=1):
+    """
+    Node and edge weights for ``(scope, nodes)`` pairs.
+
+    Returns
+    -------
+    tuple
+        Two :class:`collections.Counter`\s, keyed by ``(scope, concept_id)``
+        and ``(scope, source_id, target_id)`` respectively.
+    """
+    node_weights = Counter()
+    edge_weights = Counter()
+    for scope, nodes in contributions:
+        for source, target in combinations(sorted(nodes), 2):
+            edge_weights[(scope, source, target)] += sign
+        for node in nodes:
+            if len(nodes) > 1:
+                node_weights[(scope, node)] += sign * (len(nodes) - 1)
+    return node_weights, edge_weights
+
+
+def _scope_filter(scope):
+    return dict(zip(SCOPE_FIELDS, scope))
+
+
+def update_network(before, after):
+    """
+    Apply a change in the terminal nodes of some :class:`.RelationSet`\s to
+    the stored network.
+
+    Parameters
+    ----------
+    before : dict
+        The result of :func:`.relationset_nodes` before the change.
+    after : dict
+        The result of :func:`.relationset_nodes` after the change. Deleted
+        :class:`.RelationSet`\s are simply missing.
+    """
+    # Counter.update() adds counts without dropping negative ones.
+    node_weights, edge_weights = _tally(before.values(), sign=-1)
+    added_nodes, added_edges = _tally(after.values())
+    node_weights.update(added_nodes)
+    edge_weights.update(added_edges)
+
+    scopes = set()
+    with transaction.atomic():
+        for (scope, concept_id), delta in node_weights.items():
+            if not delta:
+                continue
+            scopes.add(scope)
+            nodes = NetworkNode.objects.filter(concept_id=concept_id,
+                                               **_scope_filter(scope))
+            if not nodes.update(weight=F('weight') + delta) and delta > 0:
+                NetworkNode.objects.create(concept_id=concept_id, weight=delta,
+                                           **_scope_filter(scope))
+
+        for (scope, source_id, target_id), delta in edge_weights.items():
+            if not delta:
+                continue
+            scopes.add(scope)
+            edges = NetworkEdge.objects.filter(source_id=source_id,
+                                               target_id=target_id,
+                                               **_scope_filter(scope))
+            if not edges.update(weight=F('weight') + delta) and delta > 0:
+                NetworkEdge.objects.create(source_id=source_id,
+                                           target_id=target_id, weight=delta,
+                                           **_scope_filter(scope))
+
+        for scope in scopes:
+            NetworkNode.objects.filter(weight__lte=0, **_scope_filter(scope)).delete()
+            NetworkEdge.objects.filter(weight__lte=0, **_scope_filter(scope)).delete()
+
+
+def rebuild_network(project=None):
+    """
+    Recalculate the stored network from scratch.
+
+    Parameters
+    ----------
+    project : :class:`.TextCollection`
+        If provided, only the network for this project is rebuilt.
+    """
+    relationsets = RelationSet.objects.all()
+    nodes = NetworkNode.objects.all()
+    edges = NetworkEdge.objects.all()
+    if project is not None:
+        relationsets = relationsets.filter(project=project)
+        nodes = nodes.filter(project=project)
+        edges = edges.filter(project=project)
+
+    node_weights, edge_weights = _tally(
+        relationset_nodes(relationsets.values_list('id', flat=True)).values()
+    )
+    with transaction.atomic():
+        nodes.delete()
+        edges.delete()
+        NetworkNode.objects.bulk_create([
+            NetworkNode(concept_id=concept_id, weight=weight, **_scope_filter(scope))
+            for (scope, concept_id), weight in node_weights.items()
+        ], batch_size=500)
+        NetworkEdge.objects.bulk_create([
+            NetworkEdge(source_id=source_id, target_id=target_id, weight=weight,
+                        **_scope_filter(scope))
+            for (scope, source_id, target_id), weight in edge_weights.items()
+        ], batch_size=500)
+
+
+def node_appellations(text_id, project_id, user_id, concept_ids):
+    """
+    IDs of the (non-predicate) :class:`.Appellation`\s of each concept in the
+    network, from a single query.
+
+    The result is cached until an annotation on the text changes (see
+    :func:`annotations.workspace.workspace_version`\).
+
+    Returns
+    -------
+    dict
+        Lists of :class:`.Appellation` IDs, keyed by concept ID.
+    """
+    key = 'network-appellations:%s:%s:%s:%s' % (text_id, project_id, user_id,
+                                                workspace_version(text_id))
+    grouped = cache.get(key)
+    if grouped is None:
+        grouped = defaultdict(list)
+        queryset = Appellation.objects.filter(
+            asPredicate=False,
+            occursIn_id=text_id,
+            createdBy_id=user_id,
+            project_id=project_id,
+        ).values_list('interpretation_id', 'id').order_by('id')
+        for concept_id, appellation_id in queryset:
+            grouped[concept_id].append(appellation_id)
+        grouped = dict(grouped)
+        cache.set(key, grouped, WORKSPACE_CACHE_TIMEOUT)
+    return {concept_id: grouped.get(concept_id, []) for concept_id in concept_ids}
+
+
+def network_data(text_id, project_id, user_id):
+    """
+    Read the stored network for the :class:`.RelationSet`\s that a user
+    created for a text in a project.
+
+    Returns
+    -------
+    dict
+        Nodes and edges, in the ``elements`` format expected by the graph tab.
+    """
+    scope = _scope_filter((project_id, text_id, user_id))
+    nodes = list(NetworkNode.objects.filter(**scope).select_related('concept__typed'))
+    appellations = node_appellations(text_id, project_id, user_id,
+                                     [node.concept_id for node in nodes])
+
+    elements = []
+    for node in nodes:
+        concept = node.concept
+        typed = concept.typed
+        elements.append({
+            'data': {
+                'id': concept.id,
+                'label': concept.label,
+                'uri': concept.uri,
+                'type': typed.id if typed else None,
+                'type_label': typed.label if typed else None,
+                'type_uri': typed.uri if typed else None,
+                'weight': float(node.weight),
+                'appellations': appellations[concept.id],
+            }
+        })
+    for source_id, target_id, weight in NetworkEdge.objects.filter(**scope)\
+            .values_list('source_id', 'target_id', 'weight'):
+        elements.append({
+            'data': {'weight': float(weight), 'source': source_id,
+                     'target': target_id}
+        })
+    return {'elements': elements}
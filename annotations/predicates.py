@@ -0,0 +1,104 @@
+"""
+Registry of the built-in predicate concepts.
+
+Appellations for "be" and "have" predicates (``PREDICATES`` in settings), and
+for the predicates of temporal relations (``TEMPORAL_PREDICATES``\), are
+created on every write path that instantiates a :class:`.RelationTemplate`\.
+Rather than looking up (or creating) the :class:`concepts.models.Concept` for
+each of them every time, the IDs are resolved once per process on first use.
+
+Entries are dropped when the corresponding :class:`concepts.models.Concept` is
+saved or deleted (see :mod:`annotations.signals`\), and are resolved again on
+next use.
+"""
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+from concepts.models import Concept
+
+
+_concept_ids = {}
+_lock = threading.Lock()
+
+
+def _resolve(uri, **defaults):
+    with _lock:
+        concept_id = _concept_ids.get(uri)
+    if concept_id is not None:
+        return concept_id
+
+    concept_id = Concept.objects.get_or_create(uri=uri, defaults=defaults)[0].id
+
+    # A concept that was created (or read) in a transaction that is rolled
+    #  back must not be remembered.
+    def _remember():
+        with _lock:
+            _concept_ids[uri] = concept_id
+    transaction.on_commit(_remember)
+    return concept_id
+
+
+def predicate_id(name):
+    """
+    ID of a built-in predicate concept.
+
+    Parameters
+    ----------
+    name : str
+        A key in ``PREDICATES`` (``'be'`` or ``'have'``\).
+
+    Returns
+    -------
+    int
+    """
+    return _resolve(settings.PREDICATES.get(name))
+
+
+def temporal_predicate_id(relation_type):
+    """
+    ID of the predicate concept for a temporal relation.
+
+    Parameters
+    ----------
+    relation_type : str
+        A key in ``TEMPORAL_PREDICATES`` (``'start'``\, ``'end'`` or
+        ``'occur'``\).
+
+    Returns
+    -------
+    int or None
+        ``None`` if no predicate is configured for ``relation_type``\.
+    """
+    uri = settings.TEMPORAL_PREDICATES.get(relation_type)
+    if not uri:
+        return None
+    return _resolve(uri, authority='Conceptpower')
+
+
+def concept_changed(concept):
+    """
+    Drop cached IDs that refer to ``concept``\, either by URI or by ID (e.g.
+    if its URI was changed).
+
+    Parameters
+    ----------
+    concept : :class:`concepts.models.Concept`
+    """
+    with _lock:
+        for uri, concept_id in list(_concept_ids.items()):
+            if uri == concept.uri or concept_id == concept.pk:
+                del _concept_ids[uri]
+
+
+def forget(uri=None):
+    """
+    Drop the cached ID for ``uri``\, or for all predicates if ``uri`` is
+    ``None``\.
+    """
+    with _lock:
+        if uri is None:
+            _concept_ids.clear()
+        else:
+            _concept_ids.pop(uri, None)
@@ -0,0 +1,184 @@
+"""
+Bulk loading for serializing many :class:`.RelationSet`\s at once.
+
+:class:`annotations.serializers.RelationSetSerializer` walks the generic
+relations of every :class:`.RelationSet` through model methods and properties
+(:meth:`.RelationSet.appellations`\, :attr:`.RelationSet.date_appellations`\,
+etc.), each of which queries the database. :func:`.prefetch_relationsets`
+resolves all of them for a batch of :class:`.RelationSet`\s in a fixed number
+of queries, and stores the results on the instances so that those methods
+return them without going back to the database.
+"""
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count, Prefetch, Q, prefetch_related_objects
+
+from annotations.models import (Appellation, DateAppellation, Relation,
+                                Text)
+
+
+# Text fields that are never needed when a text is nested in a serialized
+#  RelationSet, but that can be very large.
+DEFERRED_TEXT_FIELDS = ('tokenizedContent', '_token_index')
+
+
+def _load_texts(text_ids):
+    """
+    Load :class:`.Text`\s with everything that ``TextSerializer`` and
+    :attr:`.RelationSet.occurs_in_text` need.
+
+    Parameters
+    ----------
+    text_ids : set
+
+    Returns
+    -------
+    dict
+        :class:`.Text` instances keyed by ID.
+    """
+    queryset = Text.objects.defer(*DEFERRED_TEXT_FIELDS)
+    texts = queryset.prefetch_related('annotators').in_bulk(text_ids)
+    if not texts:
+        return texts
+
+    appellation_counts = dict(
+        Appellation.objects.filter(occursIn_id__in=texts)
+                           .values_list('occursIn_id')
+                           .annotate(count=Count('id'))
+                           .order_by()
+    )
+    relation_counts = dict(
+        Relation.objects.filter(occursIn_id__in=texts)
+                        .values_list('occursIn_id')
+                        .annotate(count=Count('id'))
+                        .order_by()
+    )
+    for text in texts.values():
+        text._prefetched_annotation_count = appellation_counts.get(text.id, 0) \
+                                            + relation_counts.get(text.id, 0)
+
+    # Descendants and ancestors, from the materialized paths.
+    query = Q(pk__in=[])
+    for text in texts.values():
+        if text.tree_path:
+            query |= Q(tree_path__startswith=text.tree_path)
+    descendants = list(Text.objects.filter(query).order_by('tree_path')
+                                   .values_list('id', 'tree_path'))
+    for text in texts.values():
+        text._prefetched_children = [text.id] if not text.tree_path else [
+            part_id for part_id, path in descendants
+            if path.startswith(text.tree_path)
+        ]
+
+    top_ids = {t.path_ids[0] for t in texts.values() if t.path_ids}
+    tops = dict(texts)
+    tops.update(queryset.in_bulk(top_ids - set(texts)))
+    for text in texts.values():
+        if text.path_ids and text.path_ids[0] in tops:
+            text._prefetched_top_level_text = tops[text.path_ids[0]]
+
+    return texts
+
+
+def prefetch_relationsets(relationsets):
+    """
+    Resolve the :class:`.Appellation`\s, :class:`.DateAppellation`\s and
+    :class:`concepts.models.Concept`\s of ``relationsets`` in bulk.
+
+    The number of queries does not depend on the number of
+    :class:`.RelationSet`\s (only on the depth of the :class:`.Text`
+    hierarchy).
+
+    Parameters
+    ----------
+    relationsets : iterable
+        :class:`.RelationSet` instances (e.g. a page of results).
+
+    Returns
+    -------
+    list
+        The same :class:`.RelationSet` instances, ready for serialization.
+    """
+    relationsets = list(relationsets)
+    if not relationsets:
+        return relationsets
+
+    appellation_type = ContentType.objects.get_for_model(Appellation)
+    dateappellation_type = ContentType.objects.get_for_model(DateAppellation)
+
+    prefetch_related_objects(relationsets, 'createdBy', 'template',
+                             'terminal_nodes')
+
+    constituents = defaultdict(list)
+    relations = Relation.objects.filter(part_of__in=relationsets).order_by('id')
+    for relation in relations:
+        constituents[relation.part_of_id].append(relation)
+
+    # Group the generic targets of every Relation by type, so that each type
+    #  can be loaded with a single query.
+    appellation_ids = set()
+    dateappellation_ids = set()
+    for relation in relations:
+        for part in ['source', 'object']:
+            content_type_id = getattr(relation, '%s_content_type_id' % part)
+            object_id = getattr(relation, '%s_object_id' % part)
+            if content_type_id == appellation_type.id:
+                appellation_ids.add(object_id)
+            elif content_type_id == dateappellation_type.id:
+                dateappellation_ids.add(object_id)
+        appellation_ids.add(relation.predicate_id)
+
+    appellations = Appellation.objects.filter(pk__in=appellation_ids)\
+        .select_related('position', 'createdBy', 'interpretation__typed')\
+        .prefetch_related(Prefetch('interpretation__appellation_set',
+                                   queryset=Appellation.objects.only('id', 'interpretation')))\
+        .in_bulk()
+    dateappellations = DateAppellation.objects.select_related('position')\
+                                              .in_bulk(dateappellation_ids)
+
+    texts = _load_texts({rs.occursIn_id for rs in relationsets}
+                        | {a.occursIn_id for a in appellations.values()})
+    for appellation in appellations.values():
+        appellation.occursIn = texts[appellation.occursIn_id]
+
+    for relationset in relationsets:
+        relationset.occursIn = texts[relationset.occursIn_id]
+
+        set_appellation_ids = set()
+        with_predicate = []
+        for relation in constituents[relationset.id]:
+            for part in ['source', 'object']:
+                content_type_id = getattr(relation, '%s_content_type_id' % part)
+                object_id = getattr(relation, '%s_object_id' % part)
+                if content_type_id == appellation_type.id:
+                    set_appellation_ids.add(object_id)
+                elif content_type_id == dateappellation_type.id:
+                    predicate = appellations[relation.predicate_id]
+                    with_predicate.append((predicate.interpretation,
+                                           dateappellations[object_id]))
+            set_appellation_ids.add(relation.predicate_id)
+
+        set_appellations = [appellations[i] for i in sorted(set_appellation_ids)
+                            if i in appellations]
+        concepts = {a.interpretation_id: a.interpretation for a in set_appellations}
+
+        relationset._prefetched_appellations = set_appellations
+        relationset._prefetched_date_appellations_with_predicate = with_predicate
+        relationset._prefetched_concepts = [concepts[i] for i in sorted(concepts)]
+    return relationsets
+
+
+class PrefetchRelationSetsMixin(object):
+    """
+    For viewsets that serialize :class:`.RelationSet`\s: loads the related
+    annotations of everything that is about to be serialized with
+    :func:`.prefetch_relationsets`\.
+    """
+    def get_serializer(self, *args, **kwargs):
+        if args and 'data' not in kwargs:
+            if kwargs.get('many'):
+                args = (prefetch_relationsets(args[0]),) + args[1:]
+            else:
+                prefetch_relationsets([args[0]])
+        return super(PrefetchRelationSetsMixin, self).get_serializer(*args, **kwargs)
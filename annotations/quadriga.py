@@ -1,15 +1,28 @@
 from django.contrib.contenttypes.models import ContentType
 from django.conf import settings
 
-from annotations.models import Relation, Appellation, DateAppellation, DocumentPosition
-
+from annotations.models import (Relation, RelationSet, Appellation,
+                                DateAppellation, DocumentPosition, Text,
+                                VogonUser)
+from concepts.models import Concept
+
+from collections import defaultdict
+from itertools import islice
+from xml.sax.saxutils import XMLGenerator
 import xml.etree.ElementTree as ET
 import datetime
-import re
+import io
+import tempfile
 import uuid
 import requests
 from requests.auth import HTTPBasicAuth
 
+from util import http
+
+
+STREAM_BATCH_SIZE = 100
+"""Number of :class:`.RelationSet`\s serialized at a time when streaming."""
+
 
 def _created_element(element, annotation):
     ET.SubElement(element, 'id')
@@ -23,58 +36,53 @@ def _created_element(element, annotation):
     return element
 
 
-def _get_token(tokenId, tokenizedContent):
+def _get_token(tokenId, token_index):
     """
     Get the starting character-offset position for the token identified by
-    ``tokenId`` in the ``tokenizedContent``.
+    ``tokenId``.
 
     Parameters
     ----------
     tokenId : str
-    tokenizedContent : str
+    token_index : :class:`annotations.tokens.TokenIndex`
+        See :attr:`.Text.token_index`.
 
     Returns
     -------
     position : int
-        If the token is not found, returns -1.
+        If the token is not found, returns ``None``.
     expression : str
 
     """
-    match = re.search(r'(<word id="'+str(tokenId)+'">[^<]*</word>)',
-                      tokenizedContent,
-                      re.M|re.I)
-    if not match:
+    token = token_index.get(tokenId)
+    if token is None:
         return None, None
+    return token.position, token.expression
 
-    before_token = tokenizedContent[:match.start()]
-    before_token_stripped = re.sub('<[^>]*>', '', before_token)
-    pos = len(before_token_stripped)
 
-    match_token = re.search(r'<word id="'+str(tokenId)+'">([^<]*)</word>',
-                      match.group(0),
-                      re.M|re.I)
-    return pos, match_token.groups()[0]
-
-
-def to_appellationevent(appellation, toString=False):
+def _appellation_event(appellation, interpretation_uri):
     appellation_event = _created_element(ET.Element('appellation_event'), appellation)
     term = _created_element(ET.SubElement(appellation_event, 'term'), appellation)
     interpretation = ET.SubElement(term, 'interpretation')
-    interpretation.text = appellation.interpretation.master.uri
+    interpretation.text = interpretation_uri
 
     printed_representation = _created_element(ET.SubElement(term, 'printed_representation'), appellation)
 
     if appellation.position and appellation.position.position_type == DocumentPosition.TOKEN_ID:
         for tokenId in appellation.position.position_value.split(','):
             term_part = _created_element(ET.SubElement(printed_representation, 'term_part'), appellation)
-            pos, exp = _get_token(tokenId, appellation.occursIn.tokenizedContent)
+            pos, exp = _get_token(tokenId, appellation.occursIn.token_index)
             if pos:
                 position = ET.SubElement(term_part, 'position')
                 position.text = str(pos)
             if exp:
                 expression = ET.SubElement(term_part, 'expression')
                 expression.text = exp
+    return appellation_event
+
 
+def to_appellationevent(appellation, toString=False):
+    appellation_event = _appellation_event(appellation, appellation.interpretation.master.uri)
     if toString:
         return ET.tostring(appellation_event)
     return appellation_event
@@ -84,52 +92,194 @@ def to_dateappellationevent(dateappellation, toString=False):
     appellation_event = _created_element(ET.Element('appellation_event'), dateappellation)
     term = _created_element(ET.SubElement(appellation_event, 'term'), dateappellation)
     interpretation = ET.SubElement(term, 'interpretation', datatype="date")
-    interpretation.text = dateappellation.__unicode__()
+    interpretation.text = str(dateappellation)
     if toString:
         return ET.tostring(appellation_event)
     return appellation_event
 
 
 def to_relationevent(relation, toString=False):
-    appellation_type = ContentType.objects.get_for_model(Appellation)
-    relation_type = ContentType.objects.get_for_model(Relation)
-    dateappellation_type = ContentType.objects.get_for_model(DateAppellation)
-
-    relation_event = _created_element(ET.Element('relation_event'), relation)
-
-    # The relation itself.
-    relation_element = _created_element(ET.SubElement(relation_event, 'relation'), relation)
-
-    subject = ET.SubElement(relation_element, 'subject')
-    if relation.source_content_type.id == relation_type.id:
-        source_relation = Relation.objects.get(pk=relation.source_object_id)
-        subject.append(to_relationevent(source_relation))
-    elif relation.source_content_type.id == appellation_type.id:
-        source_appellation = Appellation.objects.get(pk=relation.source_object_id)
-        subject.append(to_appellationevent(source_appellation))
-    elif relation.source_content_type.id == dateappellation_type.id:
-        source_dateappellation = DateAppellation.objects.get(pk=relation.source_object_id)
-        subject.append(to_dateappellationevent(source_dateappellation))
-
-    predicate = ET.SubElement(relation_element, 'predicate')
-    predicate.append(to_appellationevent(relation.predicate))
-
-    object_ = ET.SubElement(relation_element, 'object')
-    if relation.object_content_type.id == relation_type.id:
-        object_relation = Relation.objects.get(pk=relation.object_object_id)
-        object_.append(to_relationevent(object_relation))
-    elif relation.object_content_type.id == appellation_type.id:
-        object_appellation = Appellation.objects.get(pk=relation.object_object_id)
-        object_.append(to_appellationevent(object_appellation))
-    elif relation.object_content_type.id == dateappellation_type.id:
-        object_dateappellation = DateAppellation.objects.get(pk=relation.object_object_id)
-        object_.append(to_dateappellationevent(object_dateappellation))
-
+    relation_event = QuadrupleSerializer([relation]).relation_event(relation.id)
     if toString:
         return ET.tostring(relation_event)
     return relation_event
 
 
+class QuadrupleSerializer(object):
+    """
+    Builds quad-xml events for a batch of :class:`.Relation`\s.
+
+    Every :class:`.Relation` (including nested relations), :class:`.Appellation`\,
+    :class:`.DateAppellation`\, creator, text and interpretation (with its
+    merge targets) that the events refer to is loaded up front, so the
+    number of queries does not depend on the number of relations.
+
+    Parameters
+    ----------
+    relations : iterable
+        :class:`.Relation` instances.
+    relationsets : iterable
+        The :class:`.RelationSet`\s serialized by :meth:`.relationset_events`\.
+        Defaults to the :class:`.RelationSet`\s that ``relations`` belong to.
+    """
+
+    def __init__(self, relations, relationsets=None):
+        self.appellation_type = ContentType.objects.get_for_model(Appellation)
+        self.relation_type = ContentType.objects.get_for_model(Relation)
+        self.dateappellation_type = ContentType.objects.get_for_model(DateAppellation)
+
+        self.relations = {relation.id: relation for relation in relations}
+        if relationsets is None:
+            relationsets = RelationSet.objects.filter(
+                pk__in={relation.part_of_id for relation in self.relations.values()
+                        if relation.part_of_id}
+            ).order_by('id')
+        self.relationsets = relationsets
+        self._load()
+
+    @classmethod
+    def for_relationsets(cls, relationsets):
+        """
+        Load all of the constituent :class:`.Relation`\s of ``relationsets``.
+
+        Parameters
+        ----------
+        relationsets : iterable
+            :class:`.RelationSet` instances.
+
+        Returns
+        -------
+        :class:`.QuadrupleSerializer`
+        """
+        relationsets = list(relationsets)
+        relations = Relation.objects.filter(part_of__in=[rs.id for rs in relationsets])
+        return cls(relations, relationsets=relationsets)
+
+    def _targets(self, content_type_id):
+        """
+        Object IDs of the given type that are targeted by loaded relations.
+        """
+        ids = set()
+        for relation in self.relations.values():
+            if relation.source_content_type_id == content_type_id:
+                ids.add(relation.source_object_id)
+            if relation.object_content_type_id == content_type_id:
+                ids.add(relation.object_object_id)
+        return ids
+
+    def _load(self):
+        # Nested relations normally belong to the same RelationSet, and so
+        #  are loaded already. Anything else is picked up here.
+        missing = self._targets(self.relation_type.id) - set(self.relations)
+        while missing:
+            loaded = Relation.objects.filter(pk__in=missing)
+            self.relations.update({relation.id: relation for relation in loaded})
+            missing = self._targets(self.relation_type.id) - set(self.relations)
+
+        appellation_ids = self._targets(self.appellation_type.id)
+        appellation_ids |= {relation.predicate_id for relation in self.relations.values()}
+        self.appellations = Appellation.objects.select_related('position')\
+                                               .in_bulk(appellation_ids)
+        self.dateappellations = DateAppellation.objects.in_bulk(
+            self._targets(self.dateappellation_type.id))
+
+        # Interpretations, and the Concepts into which they have been merged.
+        self.concepts = {}
+        concept_ids = {a.interpretation_id for a in self.appellations.values()}
+        while concept_ids:
+            concepts = Concept.objects.filter(pk__in=concept_ids)
+            self.concepts.update({concept.id: concept for concept in concepts})
+            concept_ids = {c.merged_with_id for c in self.concepts.values()
+                           if c.merged_with_id} - set(self.concepts)
+
+        annotations = list(self.relations.values()) \
+                      + list(self.appellations.values()) \
+                      + list(self.dateappellations.values())
+        users = VogonUser.objects.in_bulk({a.createdBy_id for a in annotations})
+        texts = Text.objects.in_bulk({a.occursIn_id for a in annotations})
+        for annotation in annotations:
+            annotation.createdBy = users[annotation.createdBy_id]
+            annotation.occursIn = texts[annotation.occursIn_id]
+
+    def _master_uri(self, concept_id):
+        """
+        URI of the highest-level merge target of a :class:`.Concept`\.
+        """
+        visited = set()
+        concept = self.concepts[concept_id]
+        while concept.merged_with_id:
+            if concept.id in visited:
+                raise RuntimeError("Circular merge chain::: %s" % ', '.join(map(str, visited)))
+            visited.add(concept.id)
+            concept = self.concepts[concept.merged_with_id]
+        return concept.uri
+
+    def appellation_event(self, appellation_id):
+        appellation = self.appellations[appellation_id]
+        return _appellation_event(appellation, self._master_uri(appellation.interpretation_id))
+
+    def _target_event(self, content_type_id, object_id):
+        if content_type_id == self.relation_type.id:
+            return self.relation_event(object_id)
+        elif content_type_id == self.appellation_type.id:
+            return self.appellation_event(object_id)
+        elif content_type_id == self.dateappellation_type.id:
+            return to_dateappellationevent(self.dateappellations[object_id])
+
+    def relation_event(self, relation_id):
+        """
+        Build the ``relation_event`` element for a loaded :class:`.Relation`\.
+
+        Parameters
+        ----------
+        relation_id : int
+
+        Returns
+        -------
+        :class:`xml.etree.ElementTree.Element`
+        """
+        relation = self.relations[relation_id]
+        relation_event = _created_element(ET.Element('relation_event'), relation)
+
+        # The relation itself.
+        relation_element = _created_element(ET.SubElement(relation_event, 'relation'), relation)
+
+        subject = ET.SubElement(relation_element, 'subject')
+        event = self._target_event(relation.source_content_type_id, relation.source_object_id)
+        if event is not None:
+            subject.append(event)
+
+        predicate = ET.SubElement(relation_element, 'predicate')
+        predicate.append(self.appellation_event(relation.predicate_id))
+
+        object_ = ET.SubElement(relation_element, 'object')
+        event = self._target_event(relation.object_content_type_id, relation.object_object_id)
+        if event is not None:
+            object_.append(event)
+
+        return relation_event
+
+    def relationset_events(self):
+        """
+        Build the ``relation_event`` element for the root :class:`.Relation`
+        of each :class:`.RelationSet` in :attr:`.relationsets`\.
+
+        Returns
+        -------
+        generator
+        """
+        constituents = defaultdict(list)
+        for relation in self.relations.values():
+            constituents[relation.part_of_id].append(relation)
+
+        for relationset in self.relationsets:
+            root_id = relationset.root_relation_id
+            if root_id not in self.relations:
+                relations = sorted(constituents[relationset.id], key=lambda r: r.id)
+                root_id = RelationSet.find_root_id(relations)
+            yield self.relation_event(root_id)
+
+
 def _generate_network_label(occursIn, createdBy):
     now = datetime.datetime.now()
     return 'Graph for text %s, submitted by %s on %s from VogonWeb' % (occursIn.title, createdBy.username, now.isoformat())
@@ -139,15 +289,15 @@ def _generate_workspace_label(createdBy):
     return 'VogonWeb workspace for %s' % createdBy.username
 
 
-def to_quadruples(relationsets, text, user, network_label=None,
-                  workspace_id=None, workspace_label=None,
-                  project_id=None, toString=False):
+def quadruple_details(text, user, network_label=None, workspace_id=None,
+                      workspace_label=None, project_id=None):
     """
-    Generate quadruple XML for a collection of :class:`.RelationSet`\s.
+    Resolve the project, workspace and network identifiers for a submission,
+    filling in defaults where necessary.
 
     Parameters
     ----------
-    relationsets : :class:`django.db.models.query.QuerySet`
+    text : :class:`.Text`
     user : :class:`.VogonUser`
     network_label : str
     workspace_id : str
@@ -156,9 +306,10 @@ def to_quadruples(relationsets, text, user, network_label=None,
 
     Returns
     -------
-    str
+    dict
+        With keys ``project_id``, ``workspace_id``, ``workspace_label``, and
+        ``network_label``.
     """
-
     # The root element of the XML is project. That element can have an
     #  attribute ``id`` that contains a project id. This project id does not
     #  have to exist. If it doesn't exist, Quadriga will create a new project.
@@ -170,9 +321,61 @@ def to_quadruples(relationsets, text, user, network_label=None,
     if not project_id:
         project_id = '%s+%s' % (settings.QUADRIGA_PROJECT, settings.QUADRIGA_CLIENTID)
 
+    # Use the workspace element to specify the workspace that a network
+    #  should be stored in. If such a workspace doesn't exist, then Quadriga
+    #  will create a new workspace.
+    if not workspace_id:
+        # For now, we'll create a separate workspace for each user. Later on,
+        #  we may want to provide the user with more control.
+        workspace_id = 'ws-%s+%s' % (user.username, settings.QUADRIGA_CLIENTID)
+
+    # to resolve external ids, we need to know the client that the id belongs to
+    # the easisest would be to have a convention, something like
+    #  : .../externalId+client
+    # then all exisint path could continue to work
+    if not workspace_id.endswith('+%s' % settings.QUADRIGA_CLIENTID):
+        workspace_id += '+%s' % settings.QUADRIGA_CLIENTID
+    if not workspace_label:
+        workspace_label = _generate_workspace_label(user)
+    if not network_label:
+        network_label = _generate_network_label(text, user)
+
+    return {
+        'project_id': project_id,
+        'workspace_id': workspace_id,
+        'workspace_label': workspace_label,
+        'network_label': network_label,
+    }
+
+
+def to_quadruples(relationsets, text, user, network_label=None,
+                  workspace_id=None, workspace_label=None,
+                  project_id=None, toString=False):
+    """
+    Generate quadruple XML for a collection of :class:`.RelationSet`\s.
+
+    The whole document is built in memory. For large networks, use
+    :func:`.iter_quadruples` instead.
+
+    Parameters
+    ----------
+    relationsets : :class:`django.db.models.query.QuerySet`
+    user : :class:`.VogonUser`
+    network_label : str
+    workspace_id : str
+    workspace_label : str
+    project_id : str
+
+    Returns
+    -------
+    str
+    """
+    details_data = quadruple_details(text, user, network_label, workspace_id,
+                                     workspace_label, project_id)
+
     # If project_id is provided, we assume that it is a -native- Quadriga
     #  project id and use it without deliberation.
-    project = ET.Element('project', id=project_id)
+    project = ET.Element('project', id=details_data['project_id'])
 
     # project has two subelements: details and network.
     details = ET.SubElement(project, "details")
@@ -201,21 +404,8 @@ def to_quadruples(relationsets, text, user, network_label=None,
     #  added to. If such a workspace doesn't exist, then Quadriga will create a
     #  new workspace. Use the content of the workspace tag to specify the name
     #  of a new workspace.
-    if not workspace_id:
-        # For now, we'll create a separate workspace for each user. Later on,
-        #  we may want to provide the user with more control.
-        workspace_id = 'ws-%s+%s' % (user.username, settings.QUADRIGA_CLIENTID)
-
-    # to resolve external ids, we need to know the client that the id belongs to
-    # the easisest would be to have a convention, something like
-    #  : .../externalId+client
-    # then all exisint path could continue to work
-    if not workspace_id.endswith('+%s' % settings.QUADRIGA_CLIENTID):
-        workspace_id += '+%s' % settings.QUADRIGA_CLIENTID
-    if not workspace_label:
-        workspace_label = _generate_workspace_label(user)
-    workspace = ET.SubElement(details, "workspace", id=workspace_id)
-    workspace.text = workspace_label
+    workspace = ET.SubElement(details, "workspace", id=details_data['workspace_id'])
+    workspace.text = details_data['workspace_label']
 
     # <sender>: A designator for the client that is sending the request.
     sender = ET.SubElement(details, 'sender')
@@ -226,36 +416,135 @@ def to_quadruples(relationsets, text, user, network_label=None,
     #
     # <network_name>: The content of this element specifies the name of a network
     network_name = ET.SubElement(network, "network_name")
-    if not network_label:
-        network_label = _generate_network_label(text, user)
-    network_name.text = network_label
+    network_name.text = details_data['network_label']
 
     # <element_events>: The network itself.
     element_events = ET.SubElement(network, "element_events")
 
-    for relationset in relationsets:
-        element_events.append(to_relationevent(relationset.root))
+    serializer = QuadrupleSerializer.for_relationsets(relationsets)
+    for relation_event in serializer.relationset_events():
+        element_events.append(relation_event)
 
     params = {
-        'project_id': project_id,
-        'workspace_id': workspace_id,
+        'project_id': details_data['project_id'],
+        'workspace_id': details_data['workspace_id'],
     }
     if toString:
         return ET.tostring(project, encoding='unicode', method='xml'), params
     return project, params
 
 
+def _text_element(xml, name, text, attrs={}):
+    xml.startElement(name, attrs)
+    if text:
+        xml.characters(text)
+    xml.endElement(name)
+
+
+def _batches(items, size):
+    if hasattr(items, 'iterator'):
+        items = items.iterator()
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_quadruples(relationsets, text, user, network_label=None,
+                    workspace_id=None, workspace_label=None,
+                    project_id=None, batch_size=STREAM_BATCH_SIZE):
+    """
+    Generate quadruple XML for a collection of :class:`.RelationSet`\s
+    incrementally.
+
+    Produces the same document as :func:`.to_quadruples`, but
+    ``relationsets`` are loaded and serialized ``batch_size`` at a time, and
+    the XML is yielded as it is written. Memory use does not depend on the
+    size of the network.
+
+    Parameters
+    ----------
+    relationsets : :class:`django.db.models.query.QuerySet`
+    text : :class:`.Text`
+    user : :class:`.VogonUser`
+    network_label : str
+    workspace_id : str
+    workspace_label : str
+    project_id : str
+    batch_size : int
+
+    Returns
+    -------
+    generator
+        Yields chunks of the document (str).
+    """
+    details = quadruple_details(text, user, network_label, workspace_id,
+                                workspace_label, project_id)
+
+    buffer = io.StringIO()
+
+    def _flush():
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    xml = XMLGenerator(buffer, encoding='utf-8')
+    xml.startElement('project', {'id': details['project_id']})
+    xml.startElement('details', {})
+    _text_element(xml, 'user_name', user.full_name)
+    _text_element(xml, 'user_id', user.username)
+    _text_element(xml, 'workspace', details['workspace_label'],
+                  {'id': details['workspace_id']})
+    _text_element(xml, 'sender', 'VogonWeb')
+    xml.endElement('details')
+    xml.startElement('network', {})
+    _text_element(xml, 'network_name', details['network_label'])
+    xml.startElement('element_events', {})
+    yield _flush()
+
+    for batch in _batches(relationsets, batch_size):
+        serializer = QuadrupleSerializer.for_relationsets(batch)
+        for relation_event in serializer.relationset_events():
+            buffer.write(ET.tostring(relation_event, encoding='unicode', method='xml'))
+        yield _flush()
+
+    xml.endElement('element_events')
+    xml.endElement('network')
+    xml.endElement('project')
+    yield _flush()
+
+
 def submit_relationsets(relationsets, text, user,
                         userid=settings.QUADRIGA_USERID,
                         password=settings.QUADRIGA_PASSWORD,
-                        endpoint=settings.QUADRIGA_ENDPOINT, **kwargs):
+                        endpoint=settings.QUADRIGA_ENDPOINT, stream=True,
+                        **kwargs):
     """
     Submit the :class:`.RelationSet`\s in ``relationsets`` to Quadriga.
+
+    If ``stream`` is ``True`` (default), the quad-xml is written to a
+    temporary file with :func:`.iter_quadruples` and uploaded from there,
+    rather than being held in memory.
     """
-    payload, params = to_quadruples(relationsets, text, user, toString=True, **kwargs)
     auth = HTTPBasicAuth(userid, password)
     headers = {'Accept': 'application/xml'}
-    r = requests.post(endpoint, data=payload, auth=auth, headers=headers)
+    if stream:
+        details = quadruple_details(text, user, **kwargs)
+        params = {
+            'project_id': details['project_id'],
+            'workspace_id': details['workspace_id'],
+        }
+        with tempfile.TemporaryFile() as payload:
+            for chunk in iter_quadruples(relationsets, text, user, **details):
+                payload.write(chunk.encode('utf-8'))
+            payload.seek(0)
+            r = http.upload(endpoint, data=payload, auth=auth, headers=headers)
+    else:
+        payload, params = to_quadruples(relationsets, text, user, toString=True, **kwargs)
+        r = http.upload(endpoint, data=payload, auth=auth, headers=headers)
 
     if r.status_code == requests.codes.ok:
         response_data = parse_response(r.text)
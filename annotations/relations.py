@@ -6,12 +6,19 @@ from django.db import transaction
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 
-from annotations.models import Appellation, DateAppellation, Relation, RelationSet, RelationTemplate, RelationTemplatePart 
+from annotations import predicates, statistics
+from annotations.models import (Appellation, DateAppellation, DocumentPosition, Relation,
+                                RelationSet, RelationTemplate, RelationTemplatePart)
+from annotations.network import relationset_nodes, update_network
+from annotations.workspace import bump_workspace_version
 from concepts.models import Concept
 
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
 import inspect
 import networkx as nx
 from string import Formatter
+import threading
 
 
 PRED_MAP = {    # Used in expression and terminal node templates.
@@ -22,6 +29,36 @@ PRED_MAP = {    # Used in expression and terminal node templates.
 
 PRED_SUFFIX = '%s_relationtemplate'
 
+COMPILED_TEMPLATE_CACHE_SIZE = getattr(settings, 'COMPILED_TEMPLATE_CACHE_SIZE', 256)
+"""Maximum number of :class:`.CompiledTemplate`\s kept in each process."""
+
+_compiled_templates = OrderedDict()
+_compiled_lock = threading.Lock()
+
+_editing = threading.local()
+
+
+@contextmanager
+def editing_template():
+    """
+    Parts saved or deleted in this block do not bump the revision of their
+    template one at a time (see :func:`annotations.signals.template_part_changed`\);
+    the caller bumps it once when it is done.
+    """
+    previous = getattr(_editing, 'active', False)
+    _editing.active = True
+    try:
+        yield
+    finally:
+        _editing.active = previous
+
+
+def is_editing_template():
+    """
+    Whether this thread is inside :func:`.editing_template`\.
+    """
+    return getattr(_editing, 'active', False)
+
 
 class InvalidTemplate(RuntimeError):
     pass
@@ -71,64 +108,70 @@ def get_fields(template):
     list
         Each item is a dict specifying the nature of the field.
     """
+    return [dict(field) for field in compile_template(template).fields]
+
 
+def _part_fields(tpart):
+    """
+    The fields (see :func:`.get_fields`\) for a single
+    :class:`.RelationTemplatePart`\.
+    """
     fields = []
-    for tpart in template.template_parts.all():
-        for field in ['source', 'predicate', 'object']:
-            evidenceRequired = getattr(tpart, '%s_prompt_text' % field)
-            nodeType = getattr(tpart, '%s_node_type' % field)
-            # The user needs to provide specific concepts for TYPE fields.
-            if nodeType == RelationTemplatePart.TYPE:
-                part_type = getattr(tpart, '%s_type' % field)
-                part_label = getattr(tpart, '%s_label' % field)
-                part_description = getattr(tpart, '%s_description' % field)
-                concept_id = getattr(part_type, 'id', None)
-                concept_label = getattr(part_type, 'label', None)
-                fields.append({
-                    'type': 'TP',
-                    'part_id': tpart.id,
-                    'part_field': field,
-                    'concept_id': concept_id,
-                    'label': part_label,
-                    'concept_label': concept_label,
-                    'evidence_required': evidenceRequired,
-                    'description': part_description,
-                })
-            elif nodeType == RelationTemplatePart.DATE:
-                part_type = getattr(tpart, '%s_type' % field)
-                part_label = getattr(tpart, '%s_label' % field)
-                part_description = getattr(tpart, '%s_description' % field)
-                concept_id = getattr(part_type, 'id', None)
-                concept_label = getattr(part_type, 'label', None)
-                fields.append({
-                    'type': 'DT',
-                    'part_id': tpart.id,
-                    'part_field': field,
-                    'concept_id': concept_id,
-                    'label': part_label,
-                    'concept_label': concept_label,
-                    'evidence_required': evidenceRequired,
-                    'description': part_description,
-                })
-
-            # Even if there is an explicit concept, we may require textual
-            #  evidence from the user.
-            elif evidenceRequired and nodeType == RelationTemplatePart.CONCEPT:
-                part_concept = getattr(tpart, '%s_concept' % field)
-                concept_id = getattr(part_concept, 'id', None)
-                concept_label = getattr(part_concept, 'label', None)
-                part_label = getattr(tpart, '%s_label' % field)
-                part_description = getattr(tpart, '%s_description' % field)
-                fields.append({
-                    'type': 'CO',
-                    'part_id': tpart.id,
-                    'part_field': field,
-                    'concept_id': concept_id,
-                    'label': part_label,
-                    'concept_label': concept_label,
-                    'evidence_required': evidenceRequired,
-                    'description': part_description,
-                })
+    for field in ['source', 'predicate', 'object']:
+        evidenceRequired = getattr(tpart, '%s_prompt_text' % field)
+        nodeType = getattr(tpart, '%s_node_type' % field)
+        # The user needs to provide specific concepts for TYPE fields.
+        if nodeType == RelationTemplatePart.TYPE:
+            part_type = getattr(tpart, '%s_type' % field)
+            part_label = getattr(tpart, '%s_label' % field)
+            part_description = getattr(tpart, '%s_description' % field)
+            concept_id = getattr(part_type, 'id', None)
+            concept_label = getattr(part_type, 'label', None)
+            fields.append({
+                'type': 'TP',
+                'part_id': tpart.id,
+                'part_field': field,
+                'concept_id': concept_id,
+                'label': part_label,
+                'concept_label': concept_label,
+                'evidence_required': evidenceRequired,
+                'description': part_description,
+            })
+        elif nodeType == RelationTemplatePart.DATE:
+            part_type = getattr(tpart, '%s_type' % field)
+            part_label = getattr(tpart, '%s_label' % field)
+            part_description = getattr(tpart, '%s_description' % field)
+            concept_id = getattr(part_type, 'id', None)
+            concept_label = getattr(part_type, 'label', None)
+            fields.append({
+                'type': 'DT',
+                'part_id': tpart.id,
+                'part_field': field,
+                'concept_id': concept_id,
+                'label': part_label,
+                'concept_label': concept_label,
+                'evidence_required': evidenceRequired,
+                'description': part_description,
+            })
+
+        # Even if there is an explicit concept, we may require textual
+        #  evidence from the user.
+        elif evidenceRequired and nodeType == RelationTemplatePart.CONCEPT:
+            part_concept = getattr(tpart, '%s_concept' % field)
+            concept_id = getattr(part_concept, 'id', None)
+            concept_label = getattr(part_concept, 'label', None)
+            part_label = getattr(tpart, '%s_label' % field)
+            part_description = getattr(tpart, '%s_description' % field)
+            fields.append({
+                'type': 'CO',
+                'part_id': tpart.id,
+                'part_field': field,
+                'concept_id': concept_id,
+                'label': part_label,
+                'concept_label': concept_label,
+                'evidence_required': evidenceRequired,
+                'description': part_description,
+            })
     return fields
 
 
@@ -251,7 +294,7 @@ def create_template(template_data, part_data):
 
     creation_data = list(map(parse_template_part_data, part_data))
 
-    with transaction.atomic():
+    with transaction.atomic(), editing_template():
         if template_data.get('id', None):
             template_data['_terminal_nodes'] = template_data['terminal_nodes']
             template_data.pop('terminal_nodes', None)
@@ -289,6 +332,7 @@ def create_template(template_data, part_data):
         for part_id in part_ids_to_delete:
             RelationTemplatePart.objects.get(pk=part_id).delete()
 
+        template.bump_revision()
     return template
 
 
@@ -327,9 +371,9 @@ def create_appellation(field_data, field, cache={}, project_id=None, creator=Non
         # The interpretation is already provided.
         appellation_data['interpretation_id'] = field.get('concept_id')
     elif node_type == RelationTemplatePart.TOBE:
-        appellation_data['interpretation'] = Concept.objects.get_or_create(uri=settings.PREDICATES.get('be'))[0]
+        appellation_data['interpretation_id'] = predicates.predicate_id('be')
     elif node_type == RelationTemplatePart.HAS:
-        appellation_data['interpretation'] = Concept.objects.get_or_create(uri=settings.PREDICATES.get('have'))[0]    # "http://www.digitalhps.org/concepts/CON83f5110b-5034-4c95-82f8-8f80ff55a1b9"
+        appellation_data['interpretation_id'] = predicates.predicate_id('have')
 
     if field['part_field'] == 'predicate':
         appellation_data['asPredicate'] = True
@@ -351,60 +395,29 @@ def expression_partial(obj):
 
 def generate_expression(template, relations):
     # Generate a human-readable phrase that expresses the relation.
-    expression_keys = [k[1].replace('_', '') for k in Formatter().parse(template.expression)
-                       if k[1] is not None]
-    expression_data = {}
-    for key in expression_keys:
-        try:
-            relation = relations[int(key[0])]
-            attr_name = PRED_MAP.get(key[1])
-            value = expression_partial(getattr(relation, attr_name))
-        except ValueError:
-            value = '[missing]'
-        except KeyError:
-            value = '[missing]'
-        if not attr_name:
-            continue
-
-        expression_data[key] = value
-    return template.expression.replace('_', '').format(**expression_data)
+    return compile_template(template).expression(relations)
 
 
 def get_terminal_nodes(template, relations):
-    nodes = []
-    if not template.terminal_nodes:
-        return nodes
-
-    for key in template.terminal_nodes.split(','):
-        try:
-            obj = getattr(relations[int(key[0])], PRED_MAP.get(key[1]))
-        except KeyError:
-            continue
-        if hasattr(obj, 'interpretation') and obj.interpretation:
-            nodes.append(obj.interpretation)
-    return nodes
+    return compile_template(template).terminal_nodes(relations)
 
 
 def handle_temporal_data(template, data, creator, text, relationset, relations, project_id=None):
-    depgraph = build_dependency_graph_from_template(template)
-    if depgraph.size() == 0:
-        root = template.template_parts.first().internal_id
-    else:
-        root = list(nx.topological_sort(depgraph))[0]
+    root = compile_template(template).root
     top_relation = relations[root]    # To which we attach temporal relations.
 
     for relation_type in ['start', 'end', 'occur']:
         relation_data = data.get(relation_type)
+        if not relation_data:
+            continue
         # The predicate indicates the type of temporal dimension.
-        predicate_uri = settings.TEMPORAL_PREDICATES.get(relation_type)
-        if not predicate_uri or not relation_data:
+        predicate_id = predicates.temporal_predicate_id(relation_type)
+        if not predicate_id:
             continue
-        predicate_concept, _ = Concept.objects.get_or_create(uri=predicate_uri,
-                                                             defaults={'authority': 'Conceptpower'})
         predicate_data = {
             'occursIn': text,
             'createdBy': creator,
-            'interpretation': predicate_concept,
+            'interpretation_id': predicate_id,
             'asPredicate': True,
         }
         if project_id:
@@ -451,10 +464,11 @@ def create_relationset(template, raw_data, creator, text, project_id=None):
     Create a new :class:`annotations.models.RelationSet` instance from a
     :class:`annotations.models.RelationTemplate` and user data.
     """
-    _as_key = lambda datum: (datum['part_id'], datum['part_field'])
-    required = {_as_key(datum): datum for datum in get_fields(template)}
+    _as_key = datum_as_key
+    compiled = compile_template(template)
+    required = compiled.required
     provided = {_as_key(datum): datum for datum in raw_data['fields']}
-    template_parts = template.template_parts.all()
+    template_parts = compiled.parts
 
     missing_fields = set(required.keys()) - set(provided.keys())
     if len(missing_fields) > 0:
@@ -474,12 +488,13 @@ def create_relationset(template, raw_data, creator, text, project_id=None):
             relation = _create_relation(template_part, provided, relationset, cache=relation_cache, appellation_cache=appellation_cache, project_id=project_id, creator=creator, text=text, required=required, _as_key=_as_key)
             relations[template_part.internal_id] = relation
 
-        relationset.expression = generate_expression(template, relations)
-        relationset.terminal_nodes.add(*get_terminal_nodes(template, relations))
+        relationset.expression = compiled.expression(relations)
+        relationset.terminal_nodes.add(*compiled.terminal_nodes(relations))
 
         # Updates the RelationSet in place.
         handle_temporal_data(template, raw_data, creator, text, relationset,
                              relations, project_id=project_id)
+        relationset.update_root()
         relationset.save()
     return relationset
 
@@ -488,10 +503,11 @@ def update_relationset(template, raw_data, creator, text, project_id=None, relat
     Update a :class:`annotations.models.RelationSet` instance from a
     :class:`annotations.models.RelationTemplate` and user data.
     """
-    _as_key = lambda datum: (datum['part_id'], datum['part_field'])
-    required = {_as_key(datum): datum for datum in get_fields(template)}
+    _as_key = datum_as_key
+    compiled = compile_template(template)
+    required = compiled.required
     provided = {_as_key(datum): datum for datum in raw_data['fields']}
-    template_parts = template.template_parts.all()
+    template_parts = compiled.parts
 
     missing_fields = set(required.keys()) - set(provided.keys())
     if len(missing_fields) > 0:
@@ -511,12 +527,13 @@ def update_relationset(template, raw_data, creator, text, project_id=None, relat
             relation = _update_relation(template_part, provided, relationset, cache=relation_cache, appellation_cache=appellation_cache, project_id=project_id, creator=creator, text=text, required=required, _as_key=_as_key)
             relations[template_part.internal_id] = relation
 
-        relationset.expression = generate_expression(template, relations)
-        relationset.terminal_nodes.add(*get_terminal_nodes(template, relations))
+        relationset.expression = compiled.expression(relations)
+        relationset.terminal_nodes.add(*compiled.terminal_nodes(relations))
 
         # Updates the RelationSet in place.
         handle_temporal_data(template, raw_data, creator, text, relationset,
                              relations, project_id=project_id)
+        relationset.update_root()
         relationset.save()
     return relationset
 
@@ -531,7 +548,7 @@ def _create_relation(template_part, provided, relationset, cache={}, appellation
 
     field_handlers = _get_field_handlers(appellation_cache, project_id, creator, text, required, _as_key)
     relation_data = _get_relation_data(relationset, creator, text)
-    _set_relation_data(template_part, provided, relationset, relation_data, field_handlers, inspect.currentframe().f_code.co_name, cache, appellation_cache, project_id, creator, text)
+    _set_relation_data(template_part, provided, relationset, relation_data, field_handlers, inspect.currentframe().f_code.co_name, cache, appellation_cache, project_id, creator, text, required)
     relation = Relation.objects.create(**relation_data)
 
     if cache != None:
@@ -549,7 +566,7 @@ def _update_relation(template_part, provided, relationset, cache={}, appellation
 
     field_handlers = _get_field_handlers(appellation_cache, project_id, creator, text, required, _as_key)
     relation_data = _get_relation_data(relationset, creator, text)
-    _set_relation_data(template_part, provided, relationset, relation_data, field_handlers, inspect.currentframe().f_code.co_name, cache, appellation_cache, project_id, creator, text)
+    _set_relation_data(template_part, provided, relationset, relation_data, field_handlers, inspect.currentframe().f_code.co_name, cache, appellation_cache, project_id, creator, text, required)
 
     relation = relationset.constituents.first()
     relation.source_content_object = relation_data['source_content_object']
@@ -561,7 +578,7 @@ def _update_relation(template_part, provided, relationset, cache={}, appellation
         cache[template_part.id] = relation
     return relation
 
-def _set_relation_data(template_part, provided, relationset, relation_data, field_handlers, method_name, cache={}, appellation_cache={}, project_id=None, creator=None, text=None):
+def _set_relation_data(template_part, provided, relationset, relation_data, field_handlers, method_name, cache={}, appellation_cache={}, project_id=None, creator=None, text=None, required=None):
     for pred in ['source', 'predicate', 'object']:    # Collect field data
         node_type = getattr(template_part, '%s_node_type' % pred)
         method = field_handlers.get(node_type, field_handlers['__other__'])
@@ -571,13 +588,17 @@ def _set_relation_data(template_part, provided, relationset, relation_data, fiel
         if datum:
             relation_data[dkey] = method(datum)
         elif node_type == RelationTemplatePart.RELATION:
-            relation_data[dkey] = getattr(method_name)(
-                getattr(template_part, PRED_SUFFIX % pred), 
-                provided, 
-                relationset, 
-                cache=cache, 
-                appellation_cache=appellation_cache, 
-                project_id=project_id
+            relation_data[dkey] = globals()[method_name](
+                getattr(template_part, PRED_SUFFIX % pred),
+                provided,
+                relationset,
+                cache=cache,
+                appellation_cache=appellation_cache,
+                project_id=project_id,
+                creator=creator,
+                text=text,
+                required=required,
+                _as_key=datum_as_key
             )
         else:
             payload = {
@@ -606,3 +627,366 @@ def _get_relation_data(relationset, creator=None, text=None):
     }
     return relation_data
 
+
+
+class CompiledTemplate(object):
+    """
+    The structure of a :class:`.RelationTemplate`\, worked out once so that it
+    can be used to create many :class:`.RelationSet`\s.
+
+    Use :func:`.compile_template` rather than creating instances directly.
+    Instances are shared between requests, and must not be modified.
+
+    Parameters
+    ----------
+    template : :class:`annotations.models.RelationTemplate`
+    """
+
+    def __init__(self, template):
+        self.template = template
+        self.parts = list(template.template_parts.select_related(
+            'source_type', 'source_concept', 'source_relationtemplate',
+            'predicate_type', 'predicate_concept',
+            'object_type', 'object_concept', 'object_relationtemplate',
+        ))
+        self.fields = [field for part in self.parts for field in _part_fields(part)]
+        """See :func:`.get_fields`\."""
+        self.required = {datum_as_key(field): field for field in self.fields}
+
+        dependencies = nx.DiGraph()
+        for part in self.parts:
+            for pred in ['source', 'object']:
+                if getattr(part, '%s_node_type' % pred) == RelationTemplatePart.RELATION:
+                    dependencies.add_edge(part.internal_id,
+                                          getattr(part, PRED_SUFFIX % pred).internal_id)
+
+        # Temporal relations are attached to the root part (see
+        #  handle_temporal_data).
+        if dependencies.size() == 0:
+            self.root = self.parts[0].internal_id if self.parts else None
+        else:
+            self.root = list(nx.topological_sort(dependencies))[0]
+
+        # Parts are grouped into levels, such that each part only refers to
+        #  parts in earlier levels.
+        dependencies.add_nodes_from(part.internal_id for part in self.parts)
+        depth = {}
+        for internal_id in reversed(list(nx.topological_sort(dependencies))):
+            depth[internal_id] = 1 + max([depth[target] for target
+                                          in dependencies.successors(internal_id)],
+                                         default=-1)
+        self.levels = [
+            [part for part in self.parts if depth[part.internal_id] == level]
+            for level in range(max(depth.values(), default=-1) + 1)
+        ]
+
+        self.expression_format = (template.expression or '').replace('_', '')
+        self.expression_keys = [k[1].replace('_', '') for k in Formatter().parse(template.expression or '')
+                                if k[1] is not None]
+        self.terminal_keys = template.terminal_nodes.split(',') if template.terminal_nodes else []
+
+    def expression(self, relations):
+        """
+        See :func:`.generate_expression`\.
+        """
+        expression_data = {}
+        for key in self.expression_keys:
+            attr_name = None
+            try:
+                relation = relations[int(key[0])]
+                attr_name = PRED_MAP.get(key[1])
+                value = expression_partial(getattr(relation, attr_name))
+            except (ValueError, KeyError):
+                value = '[missing]'
+            if not attr_name:
+                continue
+            expression_data[key] = value
+        return self.expression_format.format(**expression_data)
+
+    def terminal_nodes(self, relations):
+        """
+        See :func:`.get_terminal_nodes`\.
+        """
+        nodes = []
+        for key in self.terminal_keys:
+            try:
+                obj = getattr(relations[int(key[0])], PRED_MAP.get(key[1]))
+            except KeyError:
+                continue
+            if hasattr(obj, 'interpretation') and obj.interpretation:
+                nodes.append(obj.interpretation)
+        return nodes
+
+
+def compile_template(template):
+    """
+    The :class:`.CompiledTemplate` for ``template``\, from the cache if
+    possible.
+
+    Compiled templates are cached in-process, keyed by template ID and
+    :attr:`.RelationTemplate.revision`\, which is incremented whenever the
+    template or its parts change.
+
+    Parameters
+    ----------
+    template : :class:`annotations.models.RelationTemplate`
+
+    Returns
+    -------
+    :class:`.CompiledTemplate`
+    """
+    key = (template.id, template.revision)
+    with _compiled_lock:
+        compiled = _compiled_templates.get(key)
+        if compiled is not None:
+            _compiled_templates.move_to_end(key)
+            return compiled
+
+    compiled = CompiledTemplate(template)
+    with _compiled_lock:
+        _compiled_templates[key] = compiled
+        while len(_compiled_templates) > COMPILED_TEMPLATE_CACHE_SIZE:
+            _compiled_templates.popitem(last=False)
+    return compiled
+
+
+def _new_appellation(field_data, node_type, part_field, concept_id, text, creator,
+                     project_id):
+    """
+    An unsaved :class:`.Appellation` (see :func:`.create_appellation`\), and
+    its unsaved :class:`.DocumentPosition`\, if any.
+    """
+    appellation = Appellation(
+        occursIn=text,
+        createdBy=creator,
+        project_id=project_id,
+        tokenIds=field_data.get('data', {}).get('tokenIds', ''),
+        stringRep=field_data.get('data', {}).get('stringRep', ''),
+        asPredicate=part_field == 'predicate',
+    )
+    if node_type == RelationTemplatePart.CONCEPT:
+        appellation.interpretation_id = concept_id
+    elif node_type == RelationTemplatePart.TOBE:
+        appellation.interpretation_id = predicates.predicate_id('be')
+    elif node_type == RelationTemplatePart.HAS:
+        appellation.interpretation_id = predicates.predicate_id('have')
+
+    position_data = field_data.get('position')
+    position = DocumentPosition(**position_data) if position_data else None
+    return appellation, position
+
+
+def create_relationsets(template, items, creator, project_id=None):
+    """
+    Create many :class:`annotations.models.RelationSet`\s from the same
+    :class:`annotations.models.RelationTemplate` in a single transaction.
+
+    The template is compiled once (see :class:`.CompiledTemplate`\), and
+    :class:`.Appellation`\s, :class:`.DocumentPosition`\s,
+    :class:`.Relation`\s and terminal nodes are inserted with ``bulk_create``\,
+    so the number of queries depends on the depth of the template rather than
+    on the number of :class:`.RelationSet`\s.
+
+    Parameters
+    ----------
+    template : :class:`annotations.models.RelationTemplate`
+    items : list
+        ``(text, raw_data)`` tuples, where ``raw_data`` is the same as for
+        :func:`.create_relationset`\.
+    creator : :class:`annotations.models.VogonUser`
+    project_id : int
+
+    Returns
+    -------
+    list
+        The new :class:`annotations.models.RelationSet`\s, in the same order as
+        ``items``\.
+    """
+    compiled = compile_template(template)
+    if not compiled.parts:
+        raise InvalidData('Template %i has no parts' % template.id)
+
+    # Work out what each node of each relation refers to, without touching
+    #  the database (apart from resolving built-in predicates on first use).
+    new_appellations = []
+    new_positions = []
+    new_dates = []
+    existing_ids = {'appellation': set(), 'date': set()}
+    nodes = []
+    temporal = []
+    for index, (text, raw_data) in enumerate(items):
+        try:
+            provided = {datum_as_key(datum): datum for datum in raw_data['fields']}
+            missing_fields = set(compiled.required) - set(provided)
+            if missing_fields:
+                raise InvalidData('Missing fields for relation %i: %s' % (
+                    index, '; '.join(map(str, missing_fields))))
+
+            item_nodes = {}
+            for part in compiled.parts:
+                for pred in ['source', 'predicate', 'object']:
+                    node_type = getattr(part, '%s_node_type' % pred)
+                    datum = provided.get((part.id, pred))
+                    if datum and node_type in (RelationTemplatePart.TYPE, RelationTemplatePart.DATE):
+                        kind = 'appellation' if node_type == RelationTemplatePart.TYPE else 'date'
+                        node = (kind, int(datum['appellation']['id']))
+                        existing_ids[kind].add(node[1])
+                    elif not datum and node_type == RelationTemplatePart.RELATION:
+                        node = ('relation', getattr(part, PRED_SUFFIX % pred).internal_id)
+                    else:
+                        if datum:
+                            field = compiled.required[(part.id, pred)]
+                            node_type, concept_id = field.get('type'), field.get('concept_id')
+                        else:
+                            datum = {}
+                            concept_id = getattr(getattr(part, '%s_concept' % pred), 'id', None)
+                        appellation, position = _new_appellation(
+                            datum, node_type, pred, concept_id, text, creator,
+                            project_id
+                        )
+                        new_appellations.append(appellation)
+                        if position is not None:
+                            new_positions.append((appellation, position))
+                        node = ('new', appellation)
+                    item_nodes[(part.internal_id, pred)] = node
+            nodes.append(item_nodes)
+
+            item_temporal = []
+            for relation_type in ['start', 'end', 'occur']:
+                relation_data = raw_data.get(relation_type)
+                if not relation_data:
+                    continue
+                predicate_id = predicates.temporal_predicate_id(relation_type)
+                if not predicate_id:
+                    continue
+                predicate = Appellation(
+                    occursIn=text,
+                    createdBy=creator,
+                    interpretation_id=predicate_id,
+                    asPredicate=True,
+                    project_id=project_id or None,
+                )
+                new_appellations.append(predicate)
+                if relation_data.get('id'):
+                    date = ('date', int(relation_data['id']))
+                    existing_ids['date'].add(date[1])
+                else:
+                    date = DateAppellation(occursIn=text, createdBy=creator,
+                                           project_id=project_id or None)
+                    for field in ['year', 'month', 'day']:
+                        if relation_data.get(field):
+                            setattr(date, field, relation_data[field])
+                    new_dates.append(date)
+                    date = ('new', date)
+                item_temporal.append((('new', predicate), date))
+            temporal.append(item_temporal)
+        except (KeyError, TypeError, ValueError) as E:
+            raise InvalidData('Invalid data for relation %i: %r' % (index, E))
+
+    existing = {
+        'appellation': Appellation.objects.select_related('interpretation')
+                                          .in_bulk(existing_ids['appellation']),
+        'date': DateAppellation.objects.in_bulk(existing_ids['date']),
+    }
+    for kind, ids in existing_ids.items():
+        if set(ids) - set(existing[kind]):
+            raise InvalidData('No such %s: %s' % (
+                kind, ', '.join(map(str, set(ids) - set(existing[kind])))))
+
+    # Labels are needed for the expressions.
+    concepts = Concept.objects.in_bulk({a.interpretation_id for a in new_appellations
+                                        if a.interpretation_id})
+    for appellation in new_appellations:
+        if appellation.interpretation_id in concepts:
+            appellation.interpretation = concepts[appellation.interpretation_id]
+
+    def _resolve(node, relations):
+        kind, value = node
+        if kind == 'new':
+            return value
+        elif kind == 'relation':
+            return relations[value]
+        return existing[kind][value]
+
+    with transaction.atomic():
+        relationsets = RelationSet.objects.bulk_create([
+            RelationSet(createdBy=creator, occursIn=text, template=template,
+                        project_id=project_id)
+            for text, _ in items
+        ], batch_size=500)
+
+        DocumentPosition.objects.bulk_create([position for _, position in new_positions],
+                                             batch_size=500)
+        for appellation, position in new_positions:
+            appellation.position = position
+        Appellation.objects.bulk_create(new_appellations, batch_size=500)
+        DateAppellation.objects.bulk_create(new_dates, batch_size=500)
+
+        # Relations can only refer to relations that have already been
+        #  inserted, so the template is instantiated one level at a time.
+        relations = [{} for _ in items]
+        new_relations = []
+        for level in compiled.levels:
+            batch = []
+            for index, ((text, _), relationset) in enumerate(zip(items, relationsets)):
+                for part in level:
+                    relation = Relation(
+                        part_of=relationset,
+                        createdBy=creator,
+                        occursIn=text,
+                        source_content_object=_resolve(nodes[index][(part.internal_id, 'source')], relations[index]),
+                        predicate=_resolve(nodes[index][(part.internal_id, 'predicate')], relations[index]),
+                        object_content_object=_resolve(nodes[index][(part.internal_id, 'object')], relations[index]),
+                    )
+                    relations[index][part.internal_id] = relation
+                    batch.append(relation)
+            new_relations += Relation.objects.bulk_create(batch, batch_size=500)
+
+        temporal_relations = [[] for _ in items]
+        batch = []
+        for index, ((text, _), relationset) in enumerate(zip(items, relationsets)):
+            for predicate, date in temporal[index]:
+                relation = Relation(
+                    source_content_object=relations[index][compiled.root],
+                    part_of=relationset,
+                    predicate=_resolve(predicate, {}),
+                    object_content_object=_resolve(date, {}),
+                    occursIn=text,
+                    createdBy=creator,
+                )
+                temporal_relations[index].append(relation)
+                batch.append(relation)
+        new_relations += Relation.objects.bulk_create(batch, batch_size=500)
+
+        terminal_nodes = []
+        through = RelationSet.terminal_nodes.through
+        for index, relationset in enumerate(relationsets):
+            constituents = list(relations[index].values()) + temporal_relations[index]
+            relationset.expression = compiled.expression(relations[index])
+            relationset.root_relation_id = RelationSet.find_root_id(constituents) \
+                                           if constituents else None
+            terminal_nodes += [
+                through(relationset_id=relationset.id, concept_id=concept_id)
+                for concept_id in {concept.id for concept
+                                   in compiled.terminal_nodes(relations[index])}
+            ]
+        RelationSet.objects.bulk_update(relationsets, ['expression', 'root_relation'],
+                                        batch_size=500)
+        through.objects.bulk_create(terminal_nodes, batch_size=500, ignore_conflicts=True)
+
+        # Bulk inserts bypass the signals that keep these in step.
+        update_network({}, relationset_nodes([relationset.id for relationset in relationsets]))
+        if new_appellations:
+            statistics.annotation_changed(creator.id, 'appellation_count',
+                                          new_appellations[0].created,
+                                          len(new_appellations))
+        if new_relations:
+            statistics.annotation_changed(creator.id, 'relation_count',
+                                          new_relations[0].created, len(new_relations))
+        texts = Counter(text.id for text, _ in items)
+        for text_id, count in texts.items():
+            statistics.relationsets_changed(text_id, count)
+
+    for text_id in texts:
+        bump_workspace_version(text_id)
+    return relationsets
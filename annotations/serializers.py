@@ -312,7 +312,7 @@ class Appellation2Serializer(serializers.Serializer):
     type = serializers.CharField(required=False)
 
 
-class Text2Serializer(serializers.Serializer):
+class TextContentSerializer(serializers.Serializer):
     text = TextAllSerializer()
     textid = serializers.IntegerField(read_only=True)
     title = serializers.CharField(required=False)
@@ -321,6 +321,9 @@ class Text2Serializer(serializers.Serializer):
     userid = serializers.IntegerField(read_only=True)
     repository_id =  serializers.IntegerField(read_only=True)
     project = ProjectSerializer()
+
+
+class TextAnnotationsSerializer(serializers.Serializer):
     appellations = Appellation2Serializer(many=True)
     dateappellations = DateAppellationSerializer(many=True)
     relations = RelationSerializer(many=True)
@@ -328,6 +331,10 @@ class Text2Serializer(serializers.Serializer):
     concept_types = TypeSerializer(many=True)
     pending_relationsets = RelationSetSerializer(many=True)
 
+
+class Text2Serializer(TextContentSerializer, TextAnnotationsSerializer):
+    pass
+
 class GenericNotificationRelatedField(serializers.RelatedField):
     def to_representation(self, value):
         if isinstance(value, VogonUser):
@@ -1,8 +1,15 @@
-from django.db.models.signals import m2m_changed
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
 from django.dispatch import receiver
 from notifications.signals import notify
 
-from annotations.models import TextCollection, VogonUser
+from annotations import predicates, relations, statistics
+from annotations.models import (TextCollection, VogonUser, Appellation,
+                                DateAppellation, Relation, RelationSet,
+                                RelationTemplate, RelationTemplatePart, Text)
+from annotations.network import SCOPE_FIELDS, relationset_nodes, update_network
+from annotations.workspace import bump_workspace_version
+from concepts.models import Concept, Type
 
 
 @receiver(m2m_changed, sender=TextCollection.participants.through)
@@ -24,3 +31,197 @@ def my_handler(sender, action, pk_set, instance, **kwargs):
             recipient=user, 
             verb=f'You have been removed as collaborator from the project "{instance.name}"'
         )
+
+
+@receiver(post_save, sender=Appellation)
+@receiver(post_save, sender=DateAppellation)
+@receiver(post_save, sender=Relation)
+@receiver(post_save, sender=RelationSet)
+@receiver(post_delete, sender=Appellation)
+@receiver(post_delete, sender=DateAppellation)
+@receiver(post_delete, sender=Relation)
+@receiver(post_delete, sender=RelationSet)
+def annotation_changed(sender, instance, **kwargs):
+    """
+    Invalidate the cached annotation workspace for the text.
+    """
+    bump_workspace_version(instance.occursIn_id)
+
+
+@receiver(m2m_changed, sender=RelationSet.terminal_nodes.through)
+def terminal_nodes_changed(sender, action, instance, reverse, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and not reverse:
+        bump_workspace_version(instance.occursIn_id)
+
+
+@receiver(m2m_changed, sender=RelationSet.terminal_nodes.through)
+def update_network_for_terminal_nodes(sender, action, instance, reverse, pk_set, **kwargs):
+    """
+    Keep the stored co-occurrence network (see :mod:`annotations.network`\)
+    in step with the terminal nodes of each :class:`.RelationSet`\.
+    """
+    if action.startswith('pre_'):
+        if not reverse:
+            relationset_ids = [instance.pk]
+        elif pk_set is not None:
+            relationset_ids = pk_set
+        else:    # Clearing from the concept side.
+            relationset_ids = instance.relationset_set.values_list('id', flat=True)
+        instance._network_before = relationset_nodes(relationset_ids)
+    else:
+        before = instance.__dict__.pop('_network_before', {})
+        update_network(before, relationset_nodes(list(before)))
+
+
+@receiver(pre_save, sender=RelationSet)
+def relationset_moving(sender, instance, raw=False, **kwargs):
+    """
+    A :class:`.RelationSet` that is moved to another project, text or user
+    moves to another part of the network.
+    """
+    if raw or instance.pk is None:
+        return
+    stored = RelationSet.objects.filter(pk=instance.pk)\
+                                .values_list(*SCOPE_FIELDS).first()
+    if stored is not None and stored != tuple(getattr(instance, field) for field in SCOPE_FIELDS):
+        instance._network_before = relationset_nodes([instance.pk])
+        instance._scope_before = stored
+
+
+@receiver(post_save, sender=RelationSet)
+def relationset_moved(sender, instance, created=False, raw=False, **kwargs):
+    before = instance.__dict__.pop('_network_before', None)
+    if before is not None:
+        update_network(before, relationset_nodes([instance.pk]))
+
+    if raw:
+        return
+    text_before = dict(zip(SCOPE_FIELDS, instance.__dict__.pop('_scope_before', ())))\
+        .get('occursIn_id')
+    if created:
+        statistics.relationsets_changed(instance.occursIn_id, 1)
+    elif text_before is not None and text_before != instance.occursIn_id:
+        statistics.relationsets_changed(text_before, -1)
+        statistics.relationsets_changed(instance.occursIn_id, 1)
+
+
+@receiver(pre_delete, sender=RelationSet)
+def relationset_deleted(sender, instance, **kwargs):
+    # The terminal_nodes rows are deleted without m2m_changed.
+    update_network(relationset_nodes([instance.pk]), {})
+    statistics.relationsets_changed(instance.occursIn_id, -1)
+
+
+@receiver(post_save, sender=Appellation)
+@receiver(post_save, sender=Relation)
+def annotation_created(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Update the stored counts for the user (see :mod:`annotations.statistics`\).
+    """
+    if created and not raw:
+        field = 'appellation_count' if sender is Appellation else 'relation_count'
+        statistics.annotation_changed(instance.createdBy_id, field,
+                                      instance.created, 1)
+
+
+@receiver(post_delete, sender=Appellation)
+@receiver(post_delete, sender=Relation)
+def annotation_deleted(sender, instance, **kwargs):
+    field = 'appellation_count' if sender is Appellation else 'relation_count'
+    statistics.annotation_changed(instance.createdBy_id, field,
+                                  instance.created, -1)
+
+
+@receiver(post_save, sender=Text)
+def text_created(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        statistics.text_added(instance.addedBy_id, 1)
+
+
+@receiver(pre_delete, sender=Text)
+def text_deleting(sender, instance, **kwargs):
+    # The rows linking the text to its projects are deleted without
+    #  m2m_changed.
+    instance._projects_before = statistics.text_projects([instance.pk])
+
+
+@receiver(post_delete, sender=Text)
+def text_deleted(sender, instance, **kwargs):
+    statistics.text_added(instance.addedBy_id, -1)
+    statistics.refresh_projects(instance.__dict__.pop('_projects_before', ()),
+                                create=False)
+
+
+@receiver(post_save, sender=TextCollection)
+def project_created(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        statistics.refresh_projects([instance.pk])
+
+
+@receiver(m2m_changed, sender=TextCollection.texts.through)
+def project_texts_changed(sender, action, instance, reverse, pk_set, **kwargs):
+    """
+    Recount the texts and relations in projects that texts were added to or
+    removed from.
+    """
+    if action == 'pre_clear' and reverse:
+        instance._projects_before = statistics.text_projects([instance.pk])
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            project_ids = [instance.pk]
+        elif action == 'post_clear':
+            project_ids = instance.__dict__.pop('_projects_before', ())
+        else:
+            project_ids = pk_set
+        statistics.refresh_projects(project_ids)
+
+
+@receiver(post_save, sender=RelationTemplatePart)
+@receiver(post_delete, sender=RelationTemplatePart)
+def template_part_changed(sender, instance, raw=False, **kwargs):
+    """
+    Invalidate compiled copies of the template (see
+    :func:`annotations.relations.compile_template`\), e.g. after a part is
+    changed in the admin.
+    """
+    if not raw and not relations.is_editing_template():
+        RelationTemplate(pk=instance.part_of_id).bump_revision()
+
+
+@receiver(pre_save, sender=RelationTemplate)
+def template_changed(sender, instance, raw=False, **kwargs):
+    """
+    Invalidate compiled copies of the template if its expression or terminal
+    nodes change, e.g. in the admin.
+    """
+    if raw or instance.pk is None:
+        return
+    stored = RelationTemplate.objects.filter(pk=instance.pk)\
+                                     .values('expression', '_terminal_nodes', 'revision')\
+                                     .first()
+    if stored is None:
+        return
+    if (stored['expression'], stored['_terminal_nodes']) \
+            != (instance.expression, instance._terminal_nodes):
+        instance.revision = max(instance.revision, stored['revision']) + 1
+
+
+@receiver(post_save, sender=Concept)
+@receiver(post_delete, sender=Concept)
+def predicate_concept_changed(sender, instance, **kwargs):
+    """
+    Resolve built-in predicates (see :mod:`annotations.predicates`\) again
+    if their concepts change.
+    """
+    predicates.concept_changed(instance)
+
+
+@receiver(post_save, sender=Concept)
+@receiver(post_save, sender=Type)
+@receiver(post_delete, sender=Concept)
+@receiver(post_delete, sender=Type)
+def concept_changed(sender, instance, **kwargs):
+    """
+    Concept labels and states appear in every workspace.
+    """
+    bump_workspace_version()
@@ -0,0 +1,237 @@
+"""
+Stored per-user and per-project counts, for the user and project lists and
+the activity chart on user profiles.
+
+Counting a user's annotations, or the texts and relations in a project, means
+aggregating over several large joins. Instead, the counts are stored as
+:class:`.UserStatistics`\, :class:`.ProjectStatistics` and
+:class:`.WeeklyActivity` rows, and are updated (see :mod:`annotations.signals`\)
+when annotations and texts are created or deleted, or texts are added to or
+removed from projects.
+
+If the stored counts get out of step (e.g. after a bulk update that bypasses
+signals), use the ``rebuild_statistics`` management command.
+"""
+from collections import Counter, defaultdict
+import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncWeek
+
+from annotations.models import (Appellation, ProjectStatistics, Relation,
+                                RelationSet, Text, TextCollection,
+                                UserStatistics, WeeklyActivity)
+
+
+def week_of(value):
+    """
+    The Monday of the week that ``value`` falls in.
+
+    Parameters
+    ----------
+    value : :class:`datetime.datetime` or :class:`datetime.date`
+
+    Returns
+    -------
+    :class:`datetime.date`
+    """
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    return value - datetime.timedelta(days=value.weekday())
+
+
+def _increment(model, lookup, field, delta):
+    """
+    Add ``delta`` to ``field`` of the row matching ``lookup``\, creating the
+    row if it does not exist yet.
+
+    Rows are never created for negative changes; an object that is deleted
+    may be part of a cascade that also deletes the owner of the row.
+    """
+    rows = model.objects.filter(**lookup)
+    if rows.update(**{field: F(field) + delta}) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**dict(lookup, **{field: delta}))
+    except IntegrityError:    # Created concurrently.
+        rows.update(**{field: F(field) + delta})
+
+
+def annotation_changed(user_id, field, created, delta):
+    """
+    Record that an :class:`.Appellation` or :class:`.Relation` was created
+    (``delta=1``\) or deleted (``delta=-1``\).
+
+    Parameters
+    ----------
+    user_id : int
+    field : str
+        ``'appellation_count'`` or ``'relation_count'``\.
+    created : :class:`datetime.datetime`
+    delta : int
+    """
+    _increment(UserStatistics, {'user_id': user_id}, field, delta)
+    if created is not None:
+        _increment(WeeklyActivity, {'user_id': user_id, 'week': week_of(created)},
+                   'count', delta)
+
+
+def text_added(user_id, delta):
+    """
+    Record that a user added (``delta=1``\) or deleted (``delta=-1``\) a
+    :class:`.Text`\.
+    """
+    _increment(UserStatistics, {'user_id': user_id}, 'text_count', delta)
+
+
+def text_projects(text_ids):
+    """
+    IDs of the projects that contain any of ``text_ids``\.
+
+    Returns
+    -------
+    set
+    """
+    through = TextCollection.texts.through.objects
+    return set(through.filter(text_id__in=text_ids)
+                      .values_list('textcollection_id', flat=True))
+
+
+def relationsets_changed(text_id, delta):
+    """
+    Record that ``delta`` :class:`.RelationSet`\s were added to (or removed
+    from) a text, in every project that contains the text.
+    """
+    project_ids = text_projects([text_id])
+    if not project_ids:
+        return
+    updated = ProjectStatistics.objects.filter(project_id__in=project_ids)\
+                                       .update(relation_count=F('relation_count') + delta)
+    if updated < len(project_ids) and delta > 0:
+        # Projects that predate the stored counts.
+        refresh_projects(project_ids)
+
+
+def _project_counts(project_ids=None):
+    """
+    Count the texts and relations in projects, with one grouped query each.
+
+    Returns
+    -------
+    dict
+        ``(text_count, relation_count)`` keyed by project ID.
+    """
+    texts = TextCollection.texts.through.objects.all()
+    relationsets = RelationSet.objects.all()
+    if project_ids is not None:
+        texts = texts.filter(textcollection_id__in=project_ids)
+        relationsets = relationsets.filter(occursIn__partOf__in=project_ids)
+
+    counts = defaultdict(lambda: [0, 0])
+    for project_id, count in texts.values('textcollection_id')\
+                                  .annotate(count=Count('id'))\
+                                  .values_list('textcollection_id', 'count'):
+        counts[project_id][0] = count
+    for project_id, count in relationsets.values('occursIn__partOf')\
+                                         .annotate(count=Count('id'))\
+                                         .values_list('occursIn__partOf', 'count'):
+        if project_id is not None:
+            counts[project_id][1] = count
+    return {project_id: tuple(count) for project_id, count in counts.items()}
+
+
+def refresh_projects(project_ids, create=True):
+    """
+    Recount the texts and relations in projects.
+
+    Parameters
+    ----------
+    project_ids : iterable
+    create : bool
+        If ``False``\, only projects that already have stored counts are
+        updated (e.g. while the project itself may be deleted).
+    """
+    project_ids = set(project_ids)
+    if not project_ids:
+        return
+    counts = _project_counts(project_ids)
+    with transaction.atomic():
+        existing = set(ProjectStatistics.objects.filter(project_id__in=project_ids)
+                                                .values_list('project_id', flat=True))
+        for project_id in existing:
+            text_count, relation_count = counts.get(project_id, (0, 0))
+            ProjectStatistics.objects.filter(project_id=project_id)\
+                                     .update(text_count=text_count,
+                                             relation_count=relation_count)
+        if not create:
+            return
+        missing = TextCollection.objects.filter(pk__in=project_ids - existing)\
+                                        .values_list('id', flat=True)
+        ProjectStatistics.objects.bulk_create([
+            ProjectStatistics(project_id=project_id,
+                              text_count=counts.get(project_id, (0, 0))[0],
+                              relation_count=counts.get(project_id, (0, 0))[1])
+            for project_id in missing
+        ], ignore_conflicts=True)
+
+
+def weekly_activity(user, start, end):
+    """
+    The number of annotations that ``user`` created in each week from
+    ``start`` to ``end``\.
+
+    Returns
+    -------
+    dict
+        Keyed by :class:`datetime.date` (the Monday of each week).
+    """
+    return dict(WeeklyActivity.objects.filter(user=user,
+                                              week__gte=week_of(start),
+                                              week__lte=week_of(end))
+                                      .values_list('week', 'count'))
+
+
+def rebuild_statistics():
+    """
+    Recalculate all of the stored counts from scratch.
+    """
+    users = defaultdict(dict)
+    weeks = Counter()
+    for model, field in ((Appellation, 'appellation_count'),
+                         (Relation, 'relation_count')):
+        for user_id, count in model.objects.values('createdBy_id')\
+                                           .annotate(count=Count('id'))\
+                                           .values_list('createdBy_id', 'count'):
+            users[user_id][field] = count
+        by_week = model.objects.annotate(week=TruncWeek('created'))\
+                               .values('createdBy_id', 'week')\
+                               .annotate(count=Count('id'))\
+                               .values_list('createdBy_id', 'week', 'count')
+        for user_id, week, count in by_week:
+            weeks[(user_id, week_of(week))] += count
+    for user_id, count in Text.objects.values('addedBy_id')\
+                                      .annotate(count=Count('id'))\
+                                      .values_list('addedBy_id', 'count'):
+        users[user_id]['text_count'] = count
+
+    projects = _project_counts()
+    with transaction.atomic():
+        UserStatistics.objects.all().delete()
+        WeeklyActivity.objects.all().delete()
+        ProjectStatistics.objects.all().delete()
+        UserStatistics.objects.bulk_create([
+            UserStatistics(user_id=user_id, **counts)
+            for user_id, counts in users.items()
+        ], batch_size=500)
+        WeeklyActivity.objects.bulk_create([
+            WeeklyActivity(user_id=user_id, week=week, count=count)
+            for (user_id, week), count in weeks.items()
+        ], batch_size=500)
+        ProjectStatistics.objects.bulk_create([
+            ProjectStatistics(project_id=project_id,
+                              text_count=projects.get(project_id, (0, 0))[0],
+                              relation_count=projects.get(project_id, (0, 0))[1])
+            for project_id in TextCollection.objects.values_list('id', flat=True)
+        ], batch_size=500)
@@ -7,6 +7,7 @@ We should probably write some documentation.
 from django.contrib.auth.models import Group
 from django.utils.safestring import SafeText
 from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
 
 import requests, uuid, re
 from datetime import datetime, timedelta
@@ -14,8 +15,10 @@ from django.utils import timezone
 from itertools import groupby, chain
 from collections import defaultdict
 
-from annotations.models import QuadrigaAccession, RelationSet, Text, TextCollection, VogonUser
+from annotations.models import (QuadrigaAccession, RelationSet, Relation,
+                                Appellation, Text, TextCollection, VogonUser)
 from annotations import quadriga
+from annotations.workspace import bump_workspace_version
 
 from django.conf import settings
 import logging
@@ -189,24 +192,67 @@ def submit_relationsets_to_quadriga(rset_ids, text_id, user_id, **kwargs):
         })
         logger.debug('Submitted %i relations as network %s to project %s workspace %s' % (qsr.count(), network_id, project_id, workspace_id))
 
-        for relationset in qsr:
-            relationset.submitted = True
-            relationset.submittedOn = accession.created
-            relationset.submittedWith = accession
-            relationset.save()
-            for relation in relationset.constituents.all():
-                relation.submitted = True
-                relation.submittedOn = accession.created
-                relation.submittedWith = accession
-                relation.save()
-            for appellation in relationset.appellations():
-                appellation.submitted = True
-                appellation.submittedOn = accession.created
-                appellation.submittedWith = accession
-                appellation.save()
+        counts = mark_submitted(rset_ids, accession)
+        logger.debug('Marked %(relationsets)i relationsets, %(relations)i relations and %(appellations)i appellations as submitted' % counts)
     else:
         logger.debug('Quadriga submission failed with %s' % str(response))
 
+
+def mark_submitted(rset_ids, accession):
+    """
+    Record that the :class:`.RelationSet`\s in ``rset_ids``, along with their
+    constituent :class:`.Relation`\s and :class:`.Appellation`\s, were
+    accessioned to Quadriga.
+
+    Issues one ``UPDATE`` per model, in a single transaction. No ``save()``
+    signals are sent.
+
+    Parameters
+    ----------
+    rset_ids : list
+        Primary keys of :class:`.RelationSet`\s.
+    accession : :class:`.QuadrigaAccession`
+
+    Returns
+    -------
+    dict
+        Number of updated rows, keyed by ``relationsets``, ``relations`` and
+        ``appellations``.
+    """
+    state = {
+        'submitted': True,
+        'submittedOn': accession.created,
+        'submittedWith': accession,
+    }
+    appellation_type = ContentType.objects.get_for_model(Appellation)
+
+    with transaction.atomic():
+        relations = Relation.objects.filter(part_of_id__in=rset_ids)
+        appellation_ids = set()
+        for relation in relations.values('source_content_type_id', 'source_object_id',
+                                         'object_content_type_id', 'object_object_id',
+                                         'predicate_id'):
+            for part in ['source', 'object']:
+                if relation['%s_content_type_id' % part] == appellation_type.id:
+                    appellation_ids.add(relation['%s_object_id' % part])
+            appellation_ids.add(relation['predicate_id'])
+
+        counts = {
+            'relationsets': RelationSet.objects.filter(pk__in=rset_ids).update(**state),
+            'relations': relations.update(**state),
+            'appellations': Appellation.objects.filter(pk__in=appellation_ids).update(**state),
+        }
+
+    # Bulk updates don't send signals, so cached workspaces have to be
+    #  invalidated here.
+    text_ids = RelationSet.objects.filter(pk__in=rset_ids)\
+                                  .values_list('occursIn_id', flat=True)\
+                                  .distinct()
+    for text_id in text_ids:
+        bump_workspace_version(text_id)
+    return counts
+
+
 # TODO: This code is not referenced anywhere
 def accession_ready_relationsets():
     logger.debug('Looking for relations to accession to Quadriga...')
@@ -230,7 +276,7 @@ def accession_ready_relationsets():
 
         # Do not submit a relationset to Quadriga if the constituent interpretations
         #  involve concepts that are not resolved.
-        qs = [o for o in qs if o.ready()]
+        qs = qs.ready()
         relationsets = defaultdict(lambda: defaultdict(list))
 
         for relationset in qs:
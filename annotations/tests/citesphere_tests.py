@@ -0,0 +1,166 @@
+import json
+import mock
+from django.urls import reverse
+
+from accounts.models import CitesphereToken
+from annotations.utils import VogonAPITestCase
+from repository.managers.citesphere import CitesphereAuthority
+from repository.models import Repository
+
+from util.test_util import MockResponse
+
+
+GROUP = {
+    "id": 1,
+    "name": "Test group",
+    "description": "Test group description",
+    "type": "Private",
+    "numItems": 2,
+}
+
+
+class CitesphereGroupsViewTestCase(VogonAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.repository = Repository.objects.create(
+            name='Citesphere',
+            description='Citesphere repository',
+            configuration='',
+            repo_type=Repository.CITESPHERE
+        )
+
+    @mock.patch("util.http.get")
+    def test_list_groups(self, mock_get):
+        mock_get.return_value = MockResponse(json.dumps([GROUP]))
+        url = reverse(
+            "vogon_rest_citesphere:repository-citesphere-groups-list",
+            kwargs={'repository_pk': self.repository.id}
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        groups = json.loads(response.content)
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(groups[0]['name'], 'Test group')
+
+    @mock.patch("util.http.get")
+    def test_list_groups_cached(self, mock_get):
+        """
+        A second request is served from the cache, unless ``?refresh=true``\.
+        """
+        mock_get.return_value = MockResponse(json.dumps([GROUP]))
+        url = reverse(
+            "vogon_rest_citesphere:repository-citesphere-groups-list",
+            kwargs={'repository_pk': self.repository.id}
+        )
+        self.client.get(url)
+        self.client.get(url)
+        self.assertEqual(mock_get.call_count, 1)
+
+        response = self.client.get(url, {'refresh': 'true'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_get.call_count, 2)
+
+
+class CitesphereExpandViewTestCase(VogonAPITestCase):
+    """
+    Group ``1`` has collection ``c1``\, which has collection ``c2``\, which
+    has collection ``c3``\.
+    """
+    def setUp(self):
+        super().setUp()
+        self.repository = Repository.objects.create(
+            name='Citesphere',
+            description='Citesphere repository',
+            configuration='',
+            repo_type=Repository.CITESPHERE
+        )
+        self.url = reverse(
+            "vogon_rest_citesphere:repository-citesphere-groups-expand",
+            kwargs={'repository_pk': self.repository.id, 'pk': 1}
+        )
+
+    def mock_get(self, url, headers, params):
+        children = {'/groups/1/collections': 'c1',
+                    '/collections/c1/collections': 'c2',
+                    '/collections/c2/collections': 'c3'}
+        if url.endswith('/items'):
+            return MockResponse(json.dumps({'items': [{'key': url}]}))
+        for suffix, key in children.items():
+            if url.endswith(suffix):
+                return MockResponse(json.dumps({'collections': [
+                    {'key': key, 'numberOfCollections': 0 if key == 'c3' else 1}
+                ]}))
+        return MockResponse(json.dumps({'collections': []}))
+
+    @mock.patch("util.http.get")
+    def test_expand(self, mock_get):
+        mock_get.side_effect = self.mock_get
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        tree = json.loads(response.content)
+        c1 = tree['collections'][0]
+        c2 = c1['children'][0]
+        c3 = c2['children'][0]
+        self.assertEqual([c1['key'], c2['key'], c3['key']], ['c1', 'c2', 'c3'])
+        self.assertEqual(c3['children'], [])
+        self.assertEqual(len(c3['items']), 1)
+
+    @mock.patch("util.http.get")
+    def test_expand_depth(self, mock_get):
+        mock_get.side_effect = self.mock_get
+        response = self.client.get(self.url, {'depth': 1})
+        self.assertEqual(response.status_code, 200)
+        c1 = json.loads(response.content)['collections'][0]
+        c2 = c1['children'][0]
+        self.assertEqual(c2['key'], 'c2')
+        self.assertNotIn('children', c2)
+
+    @mock.patch("repository.managers.citesphere.CITESPHERE_MAX_COLLECTIONS", 2)
+    @mock.patch("util.http.get")
+    def test_expand_max_collections(self, mock_get):
+        mock_get.side_effect = self.mock_get
+        response = self.client.get(self.url)
+        c1 = json.loads(response.content)['collections'][0]
+        c2 = c1['children'][0]
+        self.assertIn('children', c2)
+        self.assertNotIn('children', c2['children'][0])
+
+    def test_expand_bad_depth(self):
+        for depth in ['x', '0', '-1']:
+            response = self.client.get(self.url, {'depth': depth})
+            self.assertEqual(response.status_code, 400)
+
+
+class CitesphereTokenRefreshTestCase(VogonAPITestCase):
+    def setUp(self):
+        super().setUp()
+        CitesphereToken.objects.create(
+            user=self.user, access_token='old', refresh_token='refresh'
+        )
+        self.authority = CitesphereAuthority(self.user)
+
+    @mock.patch("util.http.post")
+    @mock.patch("util.http.get")
+    def test_refresh_once(self, mock_get, mock_post):
+        mock_get.side_effect = [MockResponse('', 401), MockResponse(json.dumps([GROUP]))]
+        mock_post.return_value = MockResponse(json.dumps({'access_token': 'new'}))
+        self.authority.groups()
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(self.authority.headers['Authorization'], 'Bearer new')
+
+    @mock.patch("util.http.post")
+    @mock.patch("util.http.get")
+    def test_token_renewed_by_another_thread(self, mock_get, mock_post):
+        """
+        A request that was sent with a token that has since been renewed is
+        retried with the new token, without renewing it again.
+        """
+        def get(url, headers, params):
+            if mock_get.call_count == 1:
+                self.authority.headers = {'Authorization': 'Bearer new'}
+                return MockResponse('', 401)
+            return MockResponse(json.dumps([GROUP]))
+        mock_get.side_effect = get
+        self.authority.groups()
+        self.assertEqual(mock_post.call_count, 0)
+        self.assertEqual(mock_get.call_args[1]['headers']['Authorization'], 'Bearer new')
@@ -0,0 +1,157 @@
+import csv
+import mock
+import shutil
+import tempfile
+import threading
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITransactionTestCase
+
+from annotations.exports import AFFILIATION_HEADER, affiliation_rows
+from annotations.models import (Appellation, CsvDownloadList, DateAppellation,
+                                Relation, RelationSet, Text, TextCollection,
+                                VogonUser)
+from annotations.utils import VogonAPITestCase
+from concepts.models import Concept
+
+
+class ExportAppellationMixin(object):
+    url = reverse("export_appellations")
+
+    def _appellations(self):
+        project = TextCollection.objects.create(
+            name='Test project',
+            description='Test project description',
+            ownedBy=self.user,
+            createdBy=self.user
+        )
+        self.text = Text.objects.create(
+            uri='test://uri',
+            title='Test text',
+            tokenizedContent='',
+            addedBy=self.user,
+        )
+        concept = Concept.objects.create(uri='http://test/concept', label='Concept')
+        for i in range(3):
+            Appellation.objects.create(
+                occursIn=self.text,
+                stringRep='Test %i' % i,
+                startPos=i,
+                endPos=i + 1,
+                createdBy=self.user,
+                interpretation=concept,
+                project=project
+            )
+
+
+class ExportAppellationTestCase(ExportAppellationMixin, VogonAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self._appellations()
+
+    def test_stream(self):
+        response = self.client.post(self.url + '?stream=true',
+                                    {'texts': [self.text.id]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        rows = list(csv.reader(content.splitlines()))
+        self.assertEqual(rows[0][0], 'String Representation')
+        self.assertEqual(rows[1], ['Test 0', '0', '1', 'Concept', 'Test text'])
+        self.assertEqual(len(rows), 4)
+
+
+class ExportInBackgroundTestCase(ExportAppellationMixin, APITransactionTestCase):
+    """
+    The export thread has its own database connection, so the test data has
+    to be committed.
+    """
+    def setUp(self):
+        self.user = VogonUser.objects.create_user(
+            "test", "test@example.com", "test", "Test User"
+        )
+        self.client.force_authenticate(user=self.user)
+        self._appellations()
+        self.media_root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.media_root)
+
+    @mock.patch("annotations.exports.EXPORT_BACKGROUND_THRESHOLD", 2)
+    def test_large_export_is_saved_in_background(self):
+        threads = []
+        real_thread = threading.Thread
+
+        def _thread(*args, **kwargs):
+            thread = real_thread(*args, **kwargs)
+            threads.append(thread)
+            return thread
+
+        with override_settings(MEDIA_ROOT=self.media_root), \
+             mock.patch("annotations.exports.threading.Thread", side_effect=_thread):
+            response = self.client.post(self.url, {'texts': [self.text.id]},
+                                        format='json')
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(len(threads), 1)
+            threads[0].join()
+
+            download = CsvDownloadList.objects.get(user=self.user)
+            with download.file_field.open('r') as f:
+                rows = list(csv.reader(f.read().splitlines()))
+        self.assertEqual(rows[1], ['Test 0', '0', '1', 'Concept', 'Test text'])
+        self.assertEqual(len(rows), 4)
+
+
+class ExportAffiliationTestCase(VogonAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.project = TextCollection.objects.create(
+            name='Test project',
+            description='Test project description',
+            ownedBy=self.user,
+            createdBy=self.user
+        )
+        self.text = Text.objects.create(
+            uri='test://uri',
+            title='Test text',
+            tokenizedContent='',
+            addedBy=self.user,
+        )
+        concept = Concept.objects.create(uri='http://test/concept', label='Concept')
+        self.appellations = [
+            Appellation.objects.create(
+                occursIn=self.text,
+                stringRep=rep,
+                startPos=0,
+                endPos=1,
+                createdBy=self.user,
+                interpretation=concept,
+                project=self.project,
+                asPredicate=rep == 'is at'
+            )
+            for rep in ['Alice', 'is at', 'University']
+        ]
+
+    def test_nested_and_temporal_targets(self):
+        """
+        Relations whose source or object is another relation or a date.
+        """
+        alice, predicate, university = self.appellations
+        date = DateAppellation.objects.create(occursIn=self.text, createdBy=self.user,
+                                              year=1990, month=5)
+        nested = Relation.objects.create(occursIn=self.text, createdBy=self.user,
+                                         source_content_object=alice,
+                                         predicate=predicate,
+                                         object_content_object=university)
+        relationset = RelationSet.objects.create(occursIn=self.text, createdBy=self.user,
+                                                 project=self.project)
+        Relation.objects.create(occursIn=self.text, createdBy=self.user,
+                                part_of=relationset, source_content_object=alice,
+                                predicate=predicate, object_content_object=nested)
+        Relation.objects.create(occursIn=self.text, createdBy=self.user,
+                                part_of=relationset, source_content_object=date,
+                                predicate=predicate, object_content_object=university)
+
+        rows = list(affiliation_rows(self.project, RelationSet.objects.all()))
+        self.assertEqual(rows[0], AFFILIATION_HEADER)
+        self.assertEqual(rows[1][2:], ['Test text', 'Alice is at University', '1990-05'])
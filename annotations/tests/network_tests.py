@@ -0,0 +1,71 @@
+from django.test import TestCase
+
+from annotations.models import (NetworkEdge, NetworkNode, RelationSet, Text,
+                                TextCollection, VogonUser)
+from annotations.network import network_data, rebuild_network
+from concepts.models import Concept
+
+
+class NetworkStoreTestCase(TestCase):
+    def setUp(self):
+        self.user = VogonUser.objects.create_user(
+            "test", "test@example.com", "test", "Test User"
+        )
+        self.project = TextCollection.objects.create(
+            name='Test project',
+            description='Test project description',
+            ownedBy=self.user,
+            createdBy=self.user
+        )
+        self.text = Text.objects.create(
+            uri='test://uri',
+            title='Test text',
+            tokenizedContent='',
+            addedBy=self.user,
+        )
+        self.concepts = [
+            Concept.objects.create(uri='http://test/concept%i' % i,
+                                   label='Concept %i' % i)
+            for i in range(3)
+        ]
+
+    def _relationset(self, *concepts):
+        relationset = RelationSet.objects.create(
+            project=self.project,
+            createdBy=self.user,
+            occursIn=self.text
+        )
+        relationset.terminal_nodes.add(*concepts)
+        return relationset
+
+    def _stored(self):
+        return (
+            sorted(NetworkNode.objects.values_list('concept_id', 'weight')),
+            sorted(NetworkEdge.objects.values_list('source_id', 'target_id', 'weight')),
+        )
+
+    def test_incremental_updates_match_rebuild(self):
+        a, b, c = self.concepts
+        first = self._relationset(a, b, c)
+        second = self._relationset(a, b)
+        self._relationset(c)
+        second.terminal_nodes.remove(b)
+        second.terminal_nodes.add(c)
+        first.delete()
+
+        incremental = self._stored()
+        self.assertEqual(incremental, ([(a.id, 1), (c.id, 1)], [(a.id, c.id, 1)]))
+        rebuild_network()
+        self.assertEqual(self._stored(), incremental)
+
+    def test_network_data(self):
+        a, b, _ = self.concepts
+        self._relationset(a, b)
+        self._relationset(a, b)
+
+        elements = network_data(self.text.id, self.project.id, self.user.id)['elements']
+        nodes = {e['data']['id']: e['data'] for e in elements if 'id' in e['data']}
+        edges = [e['data'] for e in elements if 'source' in e['data']]
+        self.assertEqual(nodes[a.id]['weight'], 2.)
+        self.assertEqual(nodes[b.id]['appellations'], [])
+        self.assertEqual(edges, [{'weight': 2., 'source': a.id, 'target': b.id}])
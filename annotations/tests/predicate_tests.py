@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from annotations import predicates
+from concepts.models import Concept
+
+
+class PredicateRegistryTestCase(TransactionTestCase):
+    """
+    IDs are only remembered once the transaction that looked them up has
+    committed, so these tests run outside of a test transaction.
+    """
+    def setUp(self):
+        predicates.forget()
+
+    def tearDown(self):
+        predicates.forget()
+
+    def test_second_lookup_does_no_query(self):
+        concept_id = predicates.predicate_id('be')
+        self.assertEqual(Concept.objects.get(pk=concept_id).uri, settings.PREDICATES['be'])
+        with self.assertNumQueries(0):
+            self.assertEqual(predicates.predicate_id('be'), concept_id)
+
+    def test_rolled_back_lookup_is_not_remembered(self):
+        class Rollback(Exception):
+            pass
+
+        with self.assertRaises(Rollback):
+            with transaction.atomic():
+                predicates.predicate_id('be')
+                raise Rollback
+        self.assertFalse(Concept.objects.filter(uri=settings.PREDICATES['be']).exists())
+
+        # Not the ID of the concept that was rolled back.
+        concept_id = predicates.predicate_id('be')
+        self.assertTrue(Concept.objects.filter(pk=concept_id).exists())
+
+    def test_saving_concept_drops_entry(self):
+        concept = Concept.objects.get(pk=predicates.predicate_id('be'))
+        concept.label = 'be'
+        concept.save()
+        self.assertNotIn(settings.PREDICATES['be'], predicates._concept_ids)
+        self.assertEqual(predicates.predicate_id('be'), concept.id)
+
+    def test_changing_concept_uri_drops_entry(self):
+        concept = Concept.objects.get(pk=predicates.predicate_id('be'))
+        concept.uri = 'http://test/changed'
+        concept.save()
+        self.assertNotIn(settings.PREDICATES['be'], predicates._concept_ids)
+
+        concept_id = predicates.predicate_id('be')
+        self.assertNotEqual(concept_id, concept.id)
+        self.assertEqual(Concept.objects.get(pk=concept_id).uri, settings.PREDICATES['be'])
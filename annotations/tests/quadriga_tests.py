@@ -0,0 +1,226 @@
+import mock
+import xml.etree.ElementTree as ET
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from annotations import quadriga
+from annotations.models import (Appellation, DateAppellation, DocumentPosition,
+                                Relation, RelationSet, Text, TextCollection,
+                                VogonUser)
+from concepts.models import Concept
+from util.test_util import MockResponse
+
+
+def _unbatched_relation_event(relation):
+    """
+    ``relation_event`` built one annotation at a time, following each
+    relation to its targets, as it was before events were built in batches.
+    """
+    relation_event = quadriga._created_element(ET.Element('relation_event'), relation)
+    relation_element = quadriga._created_element(ET.SubElement(relation_event, 'relation'), relation)
+
+    def _target(content_type, object_id):
+        target = content_type.get_object_for_this_type(pk=object_id)
+        if isinstance(target, Relation):
+            return _unbatched_relation_event(target)
+        elif isinstance(target, Appellation):
+            return quadriga.to_appellationevent(target)
+        return quadriga.to_dateappellationevent(target)
+
+    ET.SubElement(relation_element, 'subject').append(
+        _target(relation.source_content_type, relation.source_object_id))
+    ET.SubElement(relation_element, 'predicate').append(
+        quadriga.to_appellationevent(relation.predicate))
+    ET.SubElement(relation_element, 'object').append(
+        _target(relation.object_content_type, relation.object_object_id))
+    return relation_event
+
+
+class QuadrigaTestCase(TestCase):
+    """
+    Each :class:`.RelationSet` is "Alice met Bob on a date": a relation whose
+    object is a nested relation, whose object is a :class:`.DateAppellation`\.
+    The subject and object are interpreted as a concept that has been merged
+    into another.
+    """
+    def setUp(self):
+        self.user = VogonUser.objects.create_user(
+            "test", "test@example.com", "test", "Test User"
+        )
+        self.project = TextCollection.objects.create(
+            name='Test project',
+            description='Test project description',
+            ownedBy=self.user,
+            createdBy=self.user
+        )
+        self.text = Text.objects.create(
+            uri='test://uri',
+            title='Test text',
+            tokenizedContent='<word id="1">Alice</word> <word id="2">met</word> <word id="3">Bob</word>',
+            addedBy=self.user,
+        )
+        self.master = Concept.objects.create(uri='http://test/master', label='Person')
+        self.person = Concept.objects.create(uri='http://test/person', label='Alice',
+                                             merged_with=self.master)
+        self.verb = Concept.objects.create(uri='http://test/met', label='met')
+        self.on = Concept.objects.create(uri='http://test/on', label='on')
+
+    def _appellation(self, concept, token=None, asPredicate=False):
+        position = None
+        if token is not None:
+            position = DocumentPosition.objects.create(
+                occursIn=self.text,
+                position_type=DocumentPosition.TOKEN_ID,
+                position_value=token
+            )
+        return Appellation.objects.create(
+            occursIn=self.text,
+            stringRep='Test',
+            createdBy=self.user,
+            interpretation=concept,
+            project=self.project,
+            position=position,
+            asPredicate=asPredicate
+        )
+
+    def _relation(self, relationset, source, predicate, object_):
+        return Relation.objects.create(
+            part_of=relationset,
+            occursIn=self.text,
+            createdBy=self.user,
+            source_content_type=ContentType.objects.get_for_model(source),
+            source_object_id=source.id,
+            predicate=predicate,
+            object_content_type=ContentType.objects.get_for_model(object_),
+            object_object_id=object_.id
+        )
+
+    def _relationsets(self, count):
+        for i in range(count):
+            relationset = RelationSet.objects.create(
+                project=self.project,
+                createdBy=self.user,
+                occursIn=self.text
+            )
+            date = DateAppellation.objects.create(
+                occursIn=self.text,
+                createdBy=self.user,
+                project=self.project,
+                year=1900 + i,
+                month=5
+            )
+            nested = self._relation(relationset, self._appellation(self.person, '3'),
+                                    self._appellation(self.on, asPredicate=True), date)
+            self._relation(relationset, self._appellation(self.person, '1'),
+                           self._appellation(self.verb, '2', asPredicate=True), nested)
+        return RelationSet.objects.filter(occursIn=self.text).order_by('id')
+
+    def _quadruples(self, relationsets):
+        xml, _ = quadriga.to_quadruples(relationsets, self.text, self.user,
+                                        network_label='Network', toString=True)
+        return xml
+
+
+class QuadrupleSerializerTestCase(QuadrigaTestCase):
+    def test_matches_unbatched_events(self):
+        relationsets = self._relationsets(3)
+        events = ET.fromstring(self._quadruples(relationsets))\
+                   .find('network/element_events')
+
+        expected = [_unbatched_relation_event(rs.root) for rs in relationsets]
+        self.assertEqual([ET.tostring(event) for event in events],
+                         [ET.tostring(event) for event in expected])
+
+        relation = events[0].find('relation')
+        self.assertEqual(relation.find('subject/appellation_event/term/interpretation').text,
+                         'http://test/master')
+        self.assertEqual(relation.find('predicate/appellation_event/term/printed_representation/term_part/position').text,
+                         '6')
+        nested = relation.find('object/relation_event/relation')
+        self.assertEqual(nested.find('object/appellation_event/term/interpretation').text,
+                         '1900-05')
+
+    def test_query_count_is_independent_of_size(self):
+        self._relationsets(1)
+        self._quadruples(RelationSet.objects.all())    # Builds the token index.
+
+        def _count(relationsets):
+            with CaptureQueriesContext(connection) as context:
+                self._quadruples(relationsets)
+            return len(context.captured_queries)
+
+        small = _count(RelationSet.objects.filter(occursIn=self.text).order_by('id'))
+        large = _count(self._relationsets(4))
+        self.assertEqual(small, large)
+
+    def test_relationsets_default_to_those_of_relations(self):
+        relationsets = self._relationsets(2)
+        serializer = quadriga.QuadrupleSerializer(
+            Relation.objects.filter(part_of=relationsets[1]))
+        events = list(serializer.relationset_events())
+        self.assertEqual([ET.tostring(event) for event in events],
+                         [ET.tostring(_unbatched_relation_event(relationsets[1].root))])
+
+
+QUADRIGA_RESPONSE = """<qd:response xmlns:qd="http://www.digitalhps.org/Quadriga">
+<qd:passthroughproject><qd:networkid>N1</qd:networkid></qd:passthroughproject>
+</qd:response>"""
+
+
+def _canonical(xml):
+    return ET.tostring(ET.fromstring(xml))
+
+
+class StreamQuadruplesTestCase(QuadrigaTestCase):
+    def test_iter_quadruples_matches_to_quadruples(self):
+        relationsets = self._relationsets(5)
+        chunks = list(quadriga.iter_quadruples(relationsets, self.text, self.user,
+                                               network_label='Network',
+                                               batch_size=2))
+        # Header, three batches and footer.
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(_canonical(''.join(chunks)),
+                         _canonical(self._quadruples(relationsets)))
+
+    @mock.patch("util.http.post")
+    def test_submit_relationsets_stream(self, mock_post):
+        relationsets = self._relationsets(5)
+        payloads = []
+        def post(endpoint, data, **kwargs):
+            # The upload is not given up on while Quadriga processes it.
+            self.assertIsNone(kwargs['timeout'][1])
+            payloads.append(data.read() if hasattr(data, 'read') else data)
+            return MockResponse(QUADRIGA_RESPONSE)
+        mock_post.side_effect = post
+
+        for stream in [True, False]:
+            success, response = quadriga.submit_relationsets(
+                relationsets, self.text, self.user, stream=stream,
+                network_label='Network'
+            )
+            self.assertTrue(success)
+            self.assertEqual(response['networkid'], 'N1')
+            self.assertIn('workspace_id', response)
+
+        streamed, in_memory = payloads
+        self.assertEqual(_canonical(streamed), _canonical(in_memory))
+
+    @mock.patch("annotations.quadriga._generate_network_label")
+    def test_text_xml_stream(self, mock_label):
+        mock_label.return_value = 'Network'
+        self._relationsets(3)
+        url = reverse('text_xml', kwargs={'text_id': self.text.id,
+                                          'user_id': self.user.id})
+
+        response = self.client.get(url, {'stream': 'true'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        streamed = b''.join(response.streaming_content)
+
+        response = self.client.get(url)
+        self.assertFalse(response.streaming)
+        self.assertEqual(_canonical(streamed), _canonical(response.content))
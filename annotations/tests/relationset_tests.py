@@ -0,0 +1,110 @@
+import json
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from annotations.models import (Appellation, DateAppellation, Relation,
+                                RelationSet, Text, TextCollection)
+from annotations.utils import VogonAPITestCase
+from concepts.models import Concept, Type
+
+
+class RelationSetListQueryCountTestCase(VogonAPITestCase):
+    url = reverse("vogon_rest:relationset-list")
+
+    def setUp(self):
+        super().setUp()
+        self.project = TextCollection.objects.create(
+            name='Test project',
+            description='Test project description',
+            ownedBy=self.user,
+            createdBy=self.user
+        )
+        self.concept_type = Type.objects.create(
+            uri='http://test/type',
+            label='Person',
+            authority='Conceptpower'
+        )
+        appellation_type = ContentType.objects.get_for_model(Appellation)
+        dateappellation_type = ContentType.objects.get_for_model(DateAppellation)
+
+        for i in range(8):
+            text = Text.objects.create(
+                uri=f'test://uri{i}',
+                title=f'Test text {i}',
+                tokenizedContent='<word id="0">Test</word>',
+                addedBy=self.user,
+            )
+            text.partOf.set([self.project])
+            concept = Concept.objects.create(
+                uri=f'http://test/concept{i}',
+                label=f'Concept {i}',
+                typed=self.concept_type
+            )
+            source = self._appellation(text, concept)
+            predicate = self._appellation(text, concept, asPredicate=True)
+            date = DateAppellation.objects.create(
+                occursIn=text,
+                createdBy=self.user,
+                project=self.project,
+                year=1900 + i
+            )
+            relationset = RelationSet.objects.create(
+                project=self.project,
+                createdBy=self.user,
+                occursIn=text
+            )
+            Relation.objects.create(
+                part_of=relationset,
+                occursIn=text,
+                createdBy=self.user,
+                source_content_type=appellation_type,
+                source_object_id=source.id,
+                predicate=predicate,
+                object_content_type=dateappellation_type,
+                object_object_id=date.id
+            )
+            relationset.terminal_nodes.add(concept)
+
+    def _appellation(self, text, concept, asPredicate=False):
+        return Appellation.objects.create(
+            occursIn=text,
+            stringRep='Test',
+            createdBy=self.user,
+            interpretation=concept,
+            project=self.project,
+            asPredicate=asPredicate
+        )
+
+    def _list(self, limit):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, {'limit': limit})
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.content)['results']
+        self.assertEqual(len(results), limit)
+        return results, len(context.captured_queries)
+
+    def test_query_count_is_independent_of_page_size(self):
+        _, small = self._list(2)
+        results, large = self._list(8)
+        self.assertEqual(small, large)
+
+        relationset = results[0]
+        self.assertEqual(len(relationset['appellations']), 2)
+        self.assertEqual(len(relationset['concepts']), 1)
+        self.assertEqual(len(relationset['date_appellations']), 1)
+        self.assertEqual(len(relationset['date_appellations_with_predicate']), 1)
+        self.assertFalse(relationset['ready'])
+
+    def test_with_readiness_matches_ready(self):
+        resolved = RelationSet.objects.order_by('id').first()
+        resolved.terminal_nodes.update(concept_state=Concept.RESOLVED)
+
+        annotated = RelationSet.objects.with_readiness().order_by('id')
+        for relationset in annotated:
+            self.assertEqual(relationset.is_ready,
+                             RelationSet.objects.get(pk=relationset.id).ready())
+        self.assertEqual(list(RelationSet.objects.ready().values_list('id', flat=True)),
+                         [resolved.id])
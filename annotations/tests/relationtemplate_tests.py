@@ -2,6 +2,7 @@ import json
 import copy
 from django.urls import reverse
 
+from annotations import relations as relations_service
 from annotations.utils import VogonAPITestCase
 from annotations.models import (
     Text, TextCollection, DocumentPosition, Appellation,
@@ -323,6 +324,158 @@ class RelationTemplateCreateRelationTest(VogonAPITestCase):
         self.assertEqual(relation_2.part_of.id, relationset.id)
 
 
+    def test_create_relations_in_bulk(self):
+        def _item(i):
+            return (self.text, {
+                "fields": [
+                    {
+                        "type": "CO",
+                        "part_id": self.template_part_1.id,
+                        "part_field": "source",
+                        "position": {
+                            "occursIn_id": self.text.id,
+                            "position_type": "CO",
+                            "position_value": "%i,%i" % (i, i + 5)
+                        },
+                        "data": {"tokenIds": None, "stringRep": "repr %i" % i}
+                    },
+                    {
+                        "type": "TP",
+                        "part_id": self.template_part_1.id,
+                        "part_field": "object",
+                        "appellation": {"id": self.appellation_1.id}
+                    },
+                    {
+                        "type": "TP",
+                        "part_id": self.template_part_2.id,
+                        "part_field": "source",
+                        "appellation": {"id": self.appellation_2.id}
+                    }
+                ]
+            })
+
+        relationsets = relations_service.create_relationsets(
+            self.template, [_item(i) for i in range(3)], self.user,
+            project_id=self.project.id
+        )
+
+        self.assertEqual(len(relationsets), 3)
+        for relationset in RelationSet.objects.filter(pk__in=[r.id for r in relationsets]):
+            self.assertEqual(relationset.project_id, self.project.id)
+            self.assertEqual(relationset.expression, 'Concept has a relation Concept')
+            self.assertEqual(list(relationset.terminal_nodes.all()), [self.concept])
+            constituents = list(relationset.constituents.all())
+            self.assertEqual(len(constituents), 2)
+            self.assertEqual(relationset.root_relation_id,
+                             RelationSet.find_root_id(constituents))
+            self.assertEqual(relationset.root_relation.source_content_object,
+                             self.appellation_2)
+
+    def _relation_data(self, appellation_id=None):
+        return {
+            "fields": [
+                {
+                    "type": "CO",
+                    "part_id": self.template_part_1.id,
+                    "part_field": "source",
+                    "position": {
+                        "occursIn_id": self.text.id,
+                        "position_type": "CO",
+                        "position_value": "1,6"
+                    },
+                    "data": {"tokenIds": None, "stringRep": "repr"}
+                },
+                {
+                    "type": "TP",
+                    "part_id": self.template_part_1.id,
+                    "part_field": "object",
+                    "appellation": {
+                        "id": appellation_id or self.appellation_1.id,
+                        "occursIn": {"id": self.text.id}
+                    }
+                },
+                {
+                    "type": "TP",
+                    "part_id": self.template_part_2.id,
+                    "part_field": "source",
+                    "appellation": {"id": self.appellation_2.id}
+                }
+            ]
+        }
+
+    def _create_relations(self, data, template=None):
+        self.user.is_admin = True
+        self.user.save()
+        url = self.view.reverse_action(
+            'createrelations',
+            kwargs={'pk': (template or self.template).id}
+        )
+        return self.client.post(url, {'project': self.project.id, 'relations': data},
+                                format='json')
+
+    def test_create_relations_endpoint(self):
+        response = self._create_relations([self._relation_data(), self._relation_data()])
+        self.assertEqual(response.status_code, 200)
+        relationset_ids = json.loads(response.content)['relationset_ids']
+        self.assertEqual(len(relationset_ids), 2)
+        for relationset in RelationSet.objects.filter(pk__in=relationset_ids):
+            self.assertEqual(relationset.occursIn_id, self.text.id)
+            self.assertEqual(relationset.constituents.count(), 2)
+
+    def test_create_relations_endpoint_invalid(self):
+        no_text = self._relation_data()
+        del no_text['fields'][1]['appellation']['occursIn']
+        response = self._create_relations([self._relation_data(), no_text])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Relation 1', json.loads(response.content)['error'])
+
+        response = self._create_relations([{'occursIn': self.text.id}])
+        self.assertEqual(response.status_code, 400)
+
+        response = self._create_relations([self._relation_data(appellation_id=-1)])
+        self.assertEqual(response.status_code, 400)
+
+        missing_field = self._relation_data()
+        del missing_field['fields'][2]
+        response = self._create_relations([missing_field])
+        self.assertEqual(response.status_code, 400)
+
+        empty = RelationTemplate.objects.create(createdBy=self.user, name='Empty',
+                                                description='No parts')
+        response = self._create_relations([self._relation_data()], template=empty)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(RelationSet.objects.count(), 0)
+
+    def test_compiled_template_is_cached_until_changed(self):
+        self.template.refresh_from_db()
+        compiled = relations_service.compile_template(self.template)
+        self.assertIs(relations_service.compile_template(self.template), compiled)
+        self.assertEqual(compiled.root, 0)
+        self.assertEqual([[part.internal_id for part in level] for level in compiled.levels],
+                         [[1], [0]])
+
+        self.template_part_1.source_label = 'Changed'
+        self.template_part_1.save()
+        self.template.refresh_from_db()
+        recompiled = relations_service.compile_template(self.template)
+        self.assertIsNot(recompiled, compiled)
+        self.assertIn('Changed', [field['label'] for field in recompiled.fields])
+
+    def test_compiled_template_follows_expression_changes(self):
+        """
+        E.g. when the expression or terminal nodes are changed in the admin.
+        """
+        self.template.refresh_from_db()
+        compiled = relations_service.compile_template(self.template)
+        self.template.expression = '{1o} is related to {0s}'
+        self.template.terminal_nodes = '1o'
+        self.template.save()
+        self.template.refresh_from_db()
+        recompiled = relations_service.compile_template(self.template)
+        self.assertIsNot(recompiled, compiled)
+        self.assertEqual(recompiled.expression_format, '{1o} is related to {0s}')
+        self.assertEqual(recompiled.terminal_keys, ['1o'])
+
 class RelationTemplateCreateUpdateTemplateTest(VogonAPITestCase):
     url = reverse("vogon_rest:relationtemplate-list")
 
@@ -457,6 +610,21 @@ class RelationTemplateCreateUpdateTemplateTest(VogonAPITestCase):
         self.assertEqual(result["success"], False)
         self.assertEqual(result["error"], "Relation structure is cyclic or disconnected")
 
+    def test_template_creation_bumps_revision_once(self):
+        payload = {
+            "name": "Test relation",
+            "description": "Test description",
+            "expression": "{0s} has a relation {1o}",
+            "terminal_nodes": "0s,1o",
+            "parts": [
+                self.template_part_1,
+                copy.deepcopy(self.template_part_1)
+            ]
+        }
+        response = self.client.post(self.url, payload)
+        template = RelationTemplate.objects.get(pk=json.loads(response.content)["template_id"])
+        self.assertEqual(template.revision, 1)
+
     def test_template_creation_success(self):
         self.template_part_2 = copy.deepcopy(self.template_part_1)
 
@@ -0,0 +1,66 @@
+from django.test import TestCase
+
+from annotations.models import (Appellation, ProjectStatistics, RelationSet,
+                                Text, TextCollection, UserStatistics,
+                                VogonUser, WeeklyActivity)
+from annotations.statistics import rebuild_statistics
+from concepts.models import Concept
+
+
+class StatisticsTestCase(TestCase):
+    def setUp(self):
+        self.user = VogonUser.objects.create_user(
+            "test", "test@example.com", "test", "Test User"
+        )
+        self.project = TextCollection.objects.create(
+            name='Test project',
+            description='Test project description',
+            ownedBy=self.user,
+            createdBy=self.user
+        )
+        self.concept = Concept.objects.create(uri='http://test/concept',
+                                              label='Concept')
+
+    def _text(self, i):
+        text = Text.objects.create(
+            uri='test://uri%i' % i,
+            title='Test text %i' % i,
+            tokenizedContent='',
+            addedBy=self.user,
+        )
+        text.partOf.set([self.project])
+        return text
+
+    def _appellation(self, text):
+        return Appellation.objects.create(
+            occursIn=text,
+            createdBy=self.user,
+            interpretation=self.concept,
+            project=self.project,
+        )
+
+    def _stored(self):
+        return (
+            list(UserStatistics.objects.values_list(
+                'user_id', 'appellation_count', 'relation_count', 'text_count')),
+            list(ProjectStatistics.objects.values_list(
+                'project_id', 'text_count', 'relation_count')),
+            sorted(WeeklyActivity.objects.values_list('user_id', 'week', 'count')),
+        )
+
+    def test_incremental_updates_match_rebuild(self):
+        texts = [self._text(i) for i in range(3)]
+        for text in texts:
+            self._appellation(text)
+        RelationSet.objects.create(project=self.project, createdBy=self.user,
+                                   occursIn=texts[0])
+        RelationSet.objects.create(project=self.project, createdBy=self.user,
+                                   occursIn=texts[1]).delete()
+        self.project.texts.remove(texts[2])
+        texts[1].delete()
+
+        incremental = self._stored()
+        self.assertEqual(incremental[0], [(self.user.id, 2, 0, 2)])
+        self.assertEqual(incremental[1], [(self.project.id, 1, 1)])
+        rebuild_statistics()
+        self.assertEqual(self._stored(), incremental)
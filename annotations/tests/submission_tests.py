@@ -0,0 +1,83 @@
+from django.test import TestCase
+
+from annotations.models import (Appellation, QuadrigaAccession, Relation,
+                                RelationSet, Text, TextCollection, VogonUser)
+from annotations.tasks import mark_submitted
+from annotations.workspace import workspace_version
+from concepts.models import Concept
+
+
+class MarkSubmittedTestCase(TestCase):
+    def setUp(self):
+        self.user = VogonUser.objects.create_user(
+            "test", "test@example.com", "test", "Test User"
+        )
+        self.project = TextCollection.objects.create(
+            name='Test project',
+            description='Test project description',
+            ownedBy=self.user,
+            createdBy=self.user
+        )
+        self.text = Text.objects.create(
+            uri='test://uri',
+            title='Test text',
+            tokenizedContent='',
+            addedBy=self.user,
+        )
+        self.concept = Concept.objects.create(uri='http://test/concept',
+                                              label='Concept')
+
+    def _appellation(self, **kwargs):
+        return Appellation.objects.create(
+            occursIn=self.text,
+            createdBy=self.user,
+            interpretation=self.concept,
+            project=self.project,
+            **kwargs
+        )
+
+    def _relationset(self):
+        relationset = RelationSet.objects.create(
+            project=self.project,
+            createdBy=self.user,
+            occursIn=self.text
+        )
+        Relation.objects.create(
+            occursIn=self.text,
+            createdBy=self.user,
+            part_of=relationset,
+            source_content_object=self._appellation(),
+            predicate=self._appellation(asPredicate=True),
+            object_content_object=self._appellation(),
+        )
+        return relationset
+
+    def test_mark_submitted(self):
+        submitted, other = self._relationset(), self._relationset()
+        unrelated = self._appellation()
+        accession = QuadrigaAccession.objects.create(createdBy=self.user)
+        version = workspace_version(self.text.id)
+
+        counts = mark_submitted([submitted.id], accession)
+
+        self.assertEqual(counts, {'relationsets': 1, 'relations': 1, 'appellations': 3})
+        submitted.refresh_from_db()
+        self.assertTrue(submitted.submitted)
+        self.assertEqual(submitted.submittedWith, accession)
+        self.assertEqual(submitted.submittedOn, accession.created)
+        relation = submitted.constituents.get()
+        self.assertTrue(relation.submitted)
+        for appellation in [relation.source_content_object, relation.predicate,
+                            relation.object_content_object]:
+            appellation.refresh_from_db()
+            self.assertTrue(appellation.submitted)
+            self.assertEqual(appellation.submittedWith, accession)
+
+        other.refresh_from_db()
+        unrelated.refresh_from_db()
+        self.assertFalse(other.submitted)
+        self.assertFalse(other.constituents.get().submitted)
+        self.assertFalse(unrelated.submitted)
+
+        # Cached workspaces for the text are invalidated.
+        self.assertNotEqual(workspace_version(self.text.id), version)
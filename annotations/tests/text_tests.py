@@ -0,0 +1,41 @@
+from django.test import TestCase
+
+from annotations.models import Text, VogonUser
+
+
+class TextHierarchyTestCase(TestCase):
+    def setUp(self):
+        self.user = VogonUser.objects.create_user(
+            "test", "test@example.com", "test", "Test User"
+        )
+        self.book = self._text('book')
+        self.chapter = self._text('chapter', part_of=self.book)
+        self.page = self._text('page', part_of=self.chapter)
+
+    def _text(self, name, part_of=None):
+        return Text.objects.create(
+            uri='test://%s' % name,
+            title=name,
+            tokenizedContent='',
+            addedBy=self.user,
+            part_of=part_of,
+        )
+
+    def test_descendants_and_ancestors(self):
+        self.assertEqual(self.book.children,
+                         [self.book.id, self.chapter.id, self.page.id])
+        self.assertEqual(list(Text.objects.ancestors(self.page)),
+                         [self.book, self.chapter])
+        self.assertEqual(self.page.top_level_text, self.book)
+        self.assertEqual(set(Text.objects.within('test://chapter')),
+                         {self.chapter, self.page})
+
+    def test_moving_a_text_moves_its_parts(self):
+        other = self._text('other')
+        self.chapter.part_of = other
+        self.chapter.save()
+
+        self.page.refresh_from_db()
+        self.assertEqual(self.page.top_level_text, other)
+        self.assertEqual(self.book.children, [self.book.id])
+        self.assertEqual(other.children, [other.id, self.chapter.id, self.page.id])
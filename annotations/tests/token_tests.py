@@ -0,0 +1,60 @@
+import re
+
+from django.test import TestCase
+
+from annotations.models import Text, VogonUser
+from annotations.tokens import TokenIndex
+
+
+CONTENT = '<p>Some <word id="0">quick</word> <b><word id="1">brown</word></b>' \
+          ' <word id="2"><i>odd</i></word> <word id="3">fox</word></p>'
+
+
+class TokenIndexTestCase(TestCase):
+    def test_matches_regex_scan(self):
+        index = TokenIndex.build(CONTENT)
+        for token_id in range(5):
+            match = re.search(r'<word id="%i">([^<]*)</word>' % token_id, CONTENT)
+            token = index.get(token_id)
+            if not match:
+                self.assertIsNone(token)
+                continue
+            stripped = re.sub('<[^>]*>', '', CONTENT[:match.start()])
+            self.assertEqual(token.position, len(stripped))
+            self.assertEqual(token.expression, match.group(1))
+            self.assertEqual(token.offset, match.start())
+
+    def test_dumps_loads(self):
+        index = TokenIndex.build(CONTENT)
+        restored = TokenIndex.loads(index.dumps())
+        self.assertEqual(restored.digest, index.digest)
+        self.assertEqual(restored.get('3'), index.get('3'))
+        self.assertIsNone(TokenIndex.loads('not json'))
+
+
+class TextTokenIndexTestCase(TestCase):
+    def setUp(self):
+        self.user = VogonUser.objects.create_user(
+            "test", "test@example.com", "test", "Test User"
+        )
+        self.text = Text.objects.create(
+            uri='test://uri',
+            title='Test text',
+            tokenizedContent=CONTENT,
+            addedBy=self.user,
+        )
+
+    def test_index_is_persisted(self):
+        self.assertEqual(self.text.token_index.expression(3), 'fox')
+        text = Text.objects.get(pk=self.text.id)
+        self.assertIsNotNone(text._token_index)
+        self.assertEqual(text.token_index.expression(1), 'brown')
+
+    def test_index_is_rebuilt_when_content_changes(self):
+        self.assertEqual(self.text.token_index.expression(0), 'quick')
+        self.text.tokenizedContent = '<word id="0">slow</word>'
+        self.text.save()
+
+        text = Text.objects.get(pk=self.text.id)
+        self.assertEqual(text.token_index.expression(0), 'slow')
+        self.assertIsNone(text.token_index.get(3))
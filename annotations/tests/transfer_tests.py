@@ -0,0 +1,99 @@
+import mock
+from django.test import TestCase
+from rest_framework.exceptions import APIException
+
+from annotations.models import (Appellation, NetworkNode, ProjectStatistics,
+                                RelationSet, Text, TextCollection, VogonUser)
+from annotations.views.utils import _transfer_text
+from annotations.workspace import workspace_version
+from concepts.models import Concept
+
+
+class TransferTextTestCase(TestCase):
+    def setUp(self):
+        self.user = VogonUser.objects.create_user(
+            "test", "test@example.com", "test", "Test User"
+        )
+        self.current, self.target = [
+            TextCollection.objects.create(
+                name='Project %s' % name,
+                description='Test project description',
+                ownedBy=self.user,
+                createdBy=self.user
+            )
+            for name in ['current', 'target']
+        ]
+        self.text = Text.objects.create(
+            uri='test://uri',
+            title='Test text',
+            tokenizedContent='',
+            addedBy=self.user,
+        )
+        self.part = Text.objects.create(
+            uri='test://uri/part',
+            title='Test text part',
+            tokenizedContent='',
+            addedBy=self.user,
+            part_of=self.text,
+        )
+        self.text.partOf.set([self.current])
+        self.part.partOf.set([self.current])
+
+        concepts = [Concept.objects.create(uri='http://test/concept%i' % i,
+                                           label='Concept %i' % i)
+                    for i in range(2)]
+        self.appellation = Appellation.objects.create(
+            occursIn=self.part,
+            createdBy=self.user,
+            interpretation=concepts[0],
+            project=self.current,
+        )
+        self.relationset = RelationSet.objects.create(
+            project=self.current,
+            createdBy=self.user,
+            occursIn=self.text
+        )
+        self.relationset.terminal_nodes.add(*concepts)
+
+    @mock.patch('annotations.views.utils.TRANSFER_CHUNK_SIZE', 1)
+    def test_transfer(self):
+        versions = [workspace_version(text.id) for text in [self.text, self.part]]
+        progress = []
+        _transfer_text(self.text, self.current, self.target, self.user,
+                       progress=lambda done, total: progress.append((done, total)))
+
+        self.assertEqual(progress, [(1, 2), (2, 2)])
+        self.assertEqual(set(self.target.texts.values_list('id', flat=True)),
+                         {self.text.id, self.part.id})
+        self.assertFalse(self.current.texts.exists())
+
+        self.appellation.refresh_from_db()
+        self.relationset.refresh_from_db()
+        self.assertEqual(self.appellation.project, self.target)
+        self.assertEqual(self.relationset.project, self.target)
+
+        # The stored network moves with the annotations.
+        self.assertEqual(NetworkNode.objects.filter(project=self.target).count(), 2)
+        self.assertFalse(NetworkNode.objects.filter(project=self.current).exists())
+
+        counts = dict(ProjectStatistics.objects.values_list('project_id', 'text_count'))
+        self.assertEqual(counts, {self.current.id: 0, self.target.id: 2})
+        self.assertEqual(ProjectStatistics.objects.get(project=self.target).relation_count, 1)
+
+        self.assertNotEqual([workspace_version(text.id) for text in [self.text, self.part]],
+                            versions)
+
+    def test_not_owner(self):
+        other = VogonUser.objects.create_user(
+            "other", "other@example.com", "other", "Other User"
+        )
+        with self.assertRaises(APIException):
+            _transfer_text(self.text, self.current, self.target, other)
+        self.assertEqual(self.current.texts.count(), 2)
+        self.appellation.refresh_from_db()
+        self.assertEqual(self.appellation.project, self.current)
+
+    def test_already_in_target(self):
+        self.text.partOf.add(self.target)
+        with self.assertRaises(APIException):
+            _transfer_text(self.text, self.current, self.target, self.user)
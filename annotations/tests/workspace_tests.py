@@ -0,0 +1,41 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from annotations.workspace import (_version_key, bump_workspace_version,
+                                   workspace_version)
+
+
+class WorkspaceVersionTestCase(TestCase):
+    def setUp(self):
+        cache.delete_many([_version_key(1), _version_key()])
+
+    def _text_version(self):
+        return int(workspace_version(1).split('.')[0])
+
+    def test_bump(self):
+        version = self._text_version()
+        self.assertEqual(self._text_version(), version)
+        bump_workspace_version(1)
+        self.assertEqual(self._text_version(), version + 1)
+
+    def test_bump_all(self):
+        version = workspace_version(1)
+        bump_workspace_version()
+        self.assertNotEqual(workspace_version(1), version)
+
+    def test_evicted_version_is_not_reused(self):
+        """
+        A version that is evicted from the cache starts again above every
+        version that was used before.
+        """
+        used = [self._text_version()]
+        for _ in range(3):
+            bump_workspace_version(1)
+            used.append(self._text_version())
+        cache.delete(_version_key(1))
+        self.assertGreater(self._text_version(), max(used))
+
+        used.append(self._text_version())
+        cache.delete(_version_key(1))
+        bump_workspace_version(1)
+        self.assertGreater(self._text_version(), max(used))
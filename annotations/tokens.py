@@ -0,0 +1,153 @@
+"""
+Offset index for the ``<word>`` tokens in :attr:`.Text.tokenizedContent`.
+
+Looking up a token by scanning the tokenized markup costs a full pass over the
+document for every token. A :class:`.TokenIndex` is built in a single pass and
+answers the same questions (character offset in the stripped text, surface
+form, offset in the markup) with a dictionary lookup.
+"""
+from collections import namedtuple
+import hashlib
+import json
+import re
+
+
+Token = namedtuple('Token', ['position', 'expression', 'offset'])
+"""
+``position`` is the character offset of the token in the text with all markup
+removed, ``expression`` is its surface form and ``offset`` is the character
+offset of the ``<word>`` element in the tokenized markup.
+"""
+
+# A token element, or any other tag. The order of the alternatives matters:
+#  markup that is not a well-formed token is counted as a tag, exactly as
+#  ``re.sub('<[^>]*>', '', ...)`` would strip it.
+WORD_OR_TAG = re.compile(r'<word id="([^"]*)">([^<]*)</word>|<[^>]*>', re.I)
+
+
+def content_digest(tokenizedContent):
+    """
+    Digest of ``tokenizedContent`` used to detect stale indexes.
+
+    Parameters
+    ----------
+    tokenizedContent : str
+
+    Returns
+    -------
+    str
+    """
+    return hashlib.md5((tokenizedContent or '').encode('utf-8')).hexdigest()
+
+
+class TokenIndex(object):
+    """
+    Maps token IDs to :class:`.Token`\s for one version of a tokenized text.
+
+    Parameters
+    ----------
+    tokens : dict
+        Token ID (str) -> ``(position, expression, offset)``.
+    digest : str
+        :func:`.content_digest` of the content that the index was built from.
+    """
+
+    def __init__(self, tokens, digest):
+        self.tokens = tokens
+        self.digest = digest
+
+    @classmethod
+    def build(cls, tokenizedContent, digest=None):
+        """
+        Index every ``<word>`` element in ``tokenizedContent`` in one pass.
+
+        If a token ID occurs more than once, the first occurrence wins.
+
+        Parameters
+        ----------
+        tokenizedContent : str
+        digest : str
+            If not provided, will be calculated from ``tokenizedContent``.
+
+        Returns
+        -------
+        :class:`.TokenIndex`
+        """
+        tokenizedContent = tokenizedContent or ''
+        tokens = {}
+        stripped = 0    # Number of markup characters before the current match.
+        for match in WORD_OR_TAG.finditer(tokenizedContent):
+            tokenId, expression = match.group(1), match.group(2)
+            if tokenId is None:
+                stripped += match.end() - match.start()
+                continue
+            if tokenId not in tokens:
+                tokens[tokenId] = (match.start() - stripped, expression,
+                                   match.start())
+            stripped += match.end() - match.start() - len(expression)
+        if digest is None:
+            digest = content_digest(tokenizedContent)
+        return cls(tokens, digest)
+
+    @classmethod
+    def loads(cls, raw):
+        """
+        Restore an index serialized with :meth:`.dumps`.
+
+        Parameters
+        ----------
+        raw : str
+
+        Returns
+        -------
+        :class:`.TokenIndex` or None
+            ``None`` if ``raw`` is empty or cannot be parsed.
+        """
+        if not raw:
+            return None
+        try:
+            data = json.loads(raw)
+            return cls({k: tuple(v) for k, v in data['tokens'].items()},
+                       data['digest'])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    def dumps(self):
+        """
+        Serialize the index for storage.
+
+        Returns
+        -------
+        str
+        """
+        return json.dumps({'digest': self.digest, 'tokens': self.tokens},
+                          separators=(',', ':'))
+
+    def get(self, tokenId):
+        """
+        Parameters
+        ----------
+        tokenId : str or int
+
+        Returns
+        -------
+        :class:`.Token` or None
+        """
+        token = self.tokens.get(str(tokenId))
+        if token is None:
+            return None
+        return Token(*token)
+
+    def expression(self, tokenId):
+        """
+        Surface form of the token ``tokenId``, or ``None`` if there is no such
+        token.
+        """
+        token = self.tokens.get(str(tokenId))
+        return token[1] if token is not None else None
+
+    def __contains__(self, tokenId):
+        return str(tokenId) in self.tokens
+
+    def __len__(self):
+        return len(self.tokens)
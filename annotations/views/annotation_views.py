@@ -4,17 +4,19 @@ from rest_framework import viewsets
 from rest_framework.response import Response
 from rest_framework.decorators import action
 
-from annotations.models import Relation, Appellation, VogonUser, Text, RelationSet, TextCollection, Repository, DateAppellation
+from annotations.models import VogonUser, Text, RelationSet, TextCollection, Repository
 from annotations.annotators import annotator_factory
 from annotations.serializers import (RelationSetSerializer,
-    ProjectSerializer, UserSerializer, Text2Serializer)
+    ProjectSerializer, UserSerializer, TextContentSerializer)
 from annotations.filters import RelationSetFilter
 from annotations.tasks import submit_relationsets_to_quadriga
 from annotations.network import network_data
-from concepts.models import Type
+from annotations.prefetch import PrefetchRelationSetsMixin, prefetch_relationsets
+from annotations.workspace import serialize_workspace
+from repository import content_cache
 
 
-class RelationSetViewSet(viewsets.ModelViewSet):
+class RelationSetViewSet(PrefetchRelationSetsMixin, viewsets.ModelViewSet):
     queryset = RelationSet.objects.all().order_by('-created')
     serializer_class = RelationSetSerializer
 
@@ -27,7 +29,7 @@ class RelationSetViewSet(viewsets.ModelViewSet):
             serializer = self.get_serializer(self.page, many=True)
             return self.get_paginated_response(serializer.data, meta=self.request.query_params.get('meta', False))
         
-        relations = serializer(queryset, many=True).data    
+        relations = serializer(prefetch_relationsets(queryset), many=True).data
         return Response(relations)
 
     def get_paginated_response(self, data, meta):
@@ -40,7 +42,7 @@ class RelationSetViewSet(viewsets.ModelViewSet):
                 'users': UserSerializer(users, many=True).data
             }
         return Response({
-            'count':len(self.get_queryset()),
+            'count': self.get_queryset().count(),
             'results': data,
             **extra
         })
@@ -57,8 +59,7 @@ class RelationSetViewSet(viewsets.ModelViewSet):
             pk__in=relationset_ids,
             createdBy=request.user,
             submitted=False,
-        )
-        relationsets = [x for x in relationsets if x.ready()]
+        ).ready()
         
         project_grouper = lambda x: getattr(x.project, 'quadriga_id', -1)
         for project_id, project_group in it.groupby(relationsets, key=project_grouper):
@@ -92,12 +93,17 @@ class AnnotationViewSet(viewsets.ViewSet):
         if text.repository.name == "Citesphere":
             repository = text.repository
             manager = repository.manager(request.user)
-            file_content = manager.content(file_id)
+            file_content = content_cache.get_or_fetch(
+                f'citesphere:{request.user.id}:{file_id}',
+                lambda: manager.content(file_id)
+            )
             try:
                 if file_content[0] == "error":
                     return Response(status=file_content[1])
             except Exception:
                 pass
+            if isinstance(file_content, content_cache.CachedContent):
+                file_content = file_content.text
             content = file_content
             data['content'] = content
             project_id = request.query_params.get('project_id', None)
@@ -120,36 +126,12 @@ class AnnotationViewSet(viewsets.ViewSet):
             }, 403)
         
         data['project'] = project
-        appellations = Appellation.objects.filter(
-            occursIn=text.id,
-            project=project
-        )
-        dateappellations = DateAppellation.objects.filter(
-            occursIn=text.id,
-            project=project
-        )
-        data['dateappellations'] = dateappellations
-        data['appellations'] = appellations
-        data['relations'] = Relation.objects.filter(
-            occursIn=text.id,
-        )
-        data['relationsets'] = RelationSet.objects.filter(
-            occursIn=text.id,
-            project=project,
-        )
-        data['concept_types'] = Type.objects.all()
-        relationsets = RelationSet.objects.filter(
-            occursIn=text.id,
-            project=project,
-            submitted=False,
-        )
-        relationsets = [x for x in relationsets if x.ready()]
-        data['pending_relationsets'] = relationsets
-        serializer = Text2Serializer(data, context={'request': request})
+        serializer = TextContentSerializer(data, context={'request': request})
 
         # We are overriding `content` variable because of an unknown behavior
         # with Django serializer - `content` flips between string and byte-string
         response = serializer.data
+        response.update(serialize_workspace(text, project, {'request': request}))
         response['content'] = content
         return Response(response)
 
@@ -164,23 +146,6 @@ class AnnotationViewSet(viewsets.ViewSet):
         data = annotator.render()
         project = data['project']
 
-        user = request.user
-        relationsets = RelationSet.objects.filter(
-            occursIn_id=pk,
-            createdBy=user,
-            project=project.id
-        )
-        appellations = Appellation.objects.filter(
-            asPredicate=False,
-            occursIn_id=pk,
-            createdBy=user,
-            project=project
-        )
-
-        graph = network_data(
-            relationsets,
-            text_id=pk,
-            appellation_queryset=appellations
-        )
+        graph = network_data(text.id, project.id, request.user.id)
 
         return Response(graph)
@@ -5,9 +5,52 @@ from rest_framework.decorators import action
 from rest_framework.exceptions import APIException
 from annotations.models import Text
 from annotations.serializers import RepositorySerializer, TextSerializer
+from repository.managers.citesphere import CITESPHERE_MAX_DEPTH
 from repository.models import Repository
 from annotations.views.utils import _get_project, _transfer_text, get_giles_file_data, _get_project_details
 
+
+def _citesphere_manager(request, repository):
+    """
+    Citesphere responses are cached per user; ``?refresh=true`` discards the
+    cache before the request is handled.
+    """
+    manager = repository.manager(request.user)
+    if manager and request.query_params.get('refresh', 'false').lower() == 'true':
+        manager.invalidate()
+    return manager
+
+
+def _expanded_tree(request, repository_pk, groups_pk, collection_pk=None):
+    """
+    Response with a group (or a collection in it) and all of its descendant
+    collections; see :meth:`.CitesphereAuthority.expand_collections`\.
+
+    ``?depth=`` limits the number of levels that are loaded, up to
+    ``CITESPHERE_MAX_DEPTH``\.
+    """
+    repository = get_object_or_404(
+        Repository,
+        pk=repository_pk,
+        repo_type=Repository.CITESPHERE
+    )
+    try:
+        depth = int(request.query_params.get('depth', CITESPHERE_MAX_DEPTH))
+    except ValueError:
+        depth = 0
+    if depth < 1:
+        return Response({
+            "message": "depth must be a positive integer"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    depth = min(depth, CITESPHERE_MAX_DEPTH)
+
+    manager = _citesphere_manager(request, repository)
+    tree = manager.expand_collections(groups_pk, collection_pk, max_depth=depth)
+    if isinstance(tree, tuple):
+        return Response({ "message": f"Citesphere {tree[1]} error: Collections" }, tree[1])
+    return Response(tree)
+
+
 class CitesphereRepoViewSet(viewsets.ViewSet):
     queryset = Repository.objects.all()
 
@@ -15,7 +58,7 @@ class CitesphereRepoViewSet(viewsets.ViewSet):
         queryset = Repository.objects.filter(repo_type=Repository.CITESPHERE)
         repository = get_object_or_404(queryset, pk=pk)
 
-        manager = repository.manager(request.user)
+        manager = _citesphere_manager(request, repository)
         groups = manager.groups()
         return Response({
             **RepositorySerializer(repository).data,
@@ -30,7 +73,7 @@ class CitesphereGroupsViewSet(viewsets.ViewSet):
             pk=repository_pk,
             repo_type=Repository.CITESPHERE
         )
-        manager = repository.manager(request.user)
+        manager = _citesphere_manager(request, repository)
         groups = manager.groups()
         return Response(groups)
 
@@ -41,7 +84,7 @@ class CitesphereGroupsViewSet(viewsets.ViewSet):
             repo_type=Repository.CITESPHERE
         )
         error = []
-        manager = repository.manager(request.user)
+        manager = _citesphere_manager(request, repository)
         if manager:
             collections = manager.group_collections(pk)
             items = manager.group_items(pk)
@@ -66,6 +109,14 @@ class CitesphereGroupsViewSet(viewsets.ViewSet):
 
         return Response(result)
 
+    @action(detail=True, methods=['get'])
+    def expand(self, request, repository_pk, pk):
+        """
+        All collections in the group, nested, with the first page of items
+        in each. Use ``?depth=`` to limit the number of levels.
+        """
+        return _expanded_tree(request, repository_pk, pk)
+
 
 class CitesphereCollectionsViewSet(viewsets.ViewSet):
     def list(self, request, repository_pk, groups_pk):
@@ -74,7 +125,7 @@ class CitesphereCollectionsViewSet(viewsets.ViewSet):
             pk=repository_pk,
             repo_type=Repository.CITESPHERE
         )
-        manager = repository.manager(request.user)
+        manager = _citesphere_manager(request, repository)
         collections = manager.group_collections(groups_pk)
         return Response(collections)
 
@@ -85,7 +136,7 @@ class CitesphereCollectionsViewSet(viewsets.ViewSet):
             pk=repository_pk,
             repo_type=Repository.CITESPHERE
         )
-        manager = repository.manager(request.user)
+        manager = _citesphere_manager(request, repository)
         collections = manager.collection_collections(groups_pk, pk)
         for collection in collections["collections"]:
             if collection["numberOfCollections"] > 0:
@@ -93,6 +144,14 @@ class CitesphereCollectionsViewSet(viewsets.ViewSet):
 
         return Response(collections)
 
+    @action(detail=True, methods=['get'])
+    def expand(self, request, repository_pk, groups_pk, pk):
+        """
+        The collection with all of its descendants, nested, and the first
+        page of items in each. Use ``?depth=`` to limit the number of levels.
+        """
+        return _expanded_tree(request, repository_pk, groups_pk, pk)
+
     @action(detail=True, methods=['get'])
     def items(self, request, repository_pk, groups_pk, pk):
         repository = get_object_or_404(
@@ -100,7 +159,7 @@ class CitesphereCollectionsViewSet(viewsets.ViewSet):
             pk=repository_pk,
             repo_type=Repository.CITESPHERE
         )
-        manager = repository.manager(request.user)
+        manager = _citesphere_manager(request, repository)
         page = request.query_params.get('page', 1)
         items = manager.collection_items(groups_pk, pk, page)
         return Response(items)
@@ -113,7 +172,7 @@ class CitesphereItemsViewSet(viewsets.ViewSet):
             pk=repository_pk,
             repo_type=Repository.CITESPHERE
         )
-        manager = repository.manager(request.user)
+        manager = _citesphere_manager(request, repository)
         page = request.query_params.get('page', 1)
         items = manager.group_items(groups_pk, page)
         return Response(items)
@@ -128,7 +187,7 @@ class CitesphereItemsViewSet(viewsets.ViewSet):
             pk=repository_pk,
             repo_type=Repository.CITESPHERE
         )
-        manager = repository.manager(request.user)
+        manager = _citesphere_manager(request, repository)
         item_data = manager.group_item(groups_pk, pk)
         try:
             if item_data[0] == "error":
@@ -172,7 +231,7 @@ class CitesphereItemsViewSet(viewsets.ViewSet):
     @action(detail=True, methods=['get'], url_name='retrieve_text')
     def retrieve_text(self, request, repository_pk, groups_pk, pk):
         repository = get_object_or_404(Repository, pk=repository_pk, repo_type=Repository.CITESPHERE)
-        manager = repository.manager(request.user)
+        manager = _citesphere_manager(request, repository)
         item_data = manager.group_item(groups_pk, pk)
         file_url = request.query_params.get('file_url', None)
         try:
@@ -218,7 +277,7 @@ class CitesphereItemsViewSet(viewsets.ViewSet):
             pk=repository_pk,
             repo_type=Repository.CITESPHERE
         )
-        manager = repository.manager(request.user)
+        manager = _citesphere_manager(request, repository)
         file_content = manager.content(groups_pk, pk, file_id)
         try:
             if file_content[0] == "error":
@@ -1,46 +1,39 @@
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseRedirect, HttpResponse
+from django.http import HttpResponseRedirect, HttpResponse, StreamingHttpResponse
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import action, api_view
-import csv
 from django.shortcuts import render
 from django.db.models import Q
-from annotations.models import Text, Appellation, CsvDownloadList
+from annotations import exports
+from annotations.models import CsvDownloadList
 from annotations.serializers import CsvDownloadListSerializer
-from concepts.models import Concept
-import time
-from django.core.files import File
-import os
 
 @api_view(('POST',))
 def export_appellation(request):
+    """
+    Export the appellations in the selected texts as CSV.
+
+    With ``?stream=true`` the CSV is streamed in the response. Otherwise it is
+    saved for the user (see :func:`.available_csvs`\); large exports are
+    generated in the background, and the response is ``202 Accepted``\.
+    """
     # get text from selected checkboxes
-    texts = request.data.get('texts')
-    newpath = r'vogon/downloads' 
-    if not os.path.exists(newpath):
-        os.makedirs(newpath)
-    # create temp file in order to save file to db
-    temp = 'vogon/downloads/' + str(request.user.id) + '_' + str(int(time.time())) + '.csv' #convert to int first as a shortcut to rounf to whole number
-    with open(temp,'w+') as csvFile:
-        writer = csv.writer(csvFile)
-        writer.writerow(["String Representation", "Start Position", "End Position", "Concept", "text"])
+    texts = request.data.get('texts') or []
+
+    if request.query_params.get('stream', 'false').lower() == 'true':
+        response = StreamingHttpResponse(
+            exports.iter_csv(exports.appellation_rows(texts)),
+            content_type='text/csv'
+        )
+        response['Content-Disposition'] = 'attachment; filename="export.csv"'
+        return response
+
+    if exports.appellation_queryset(texts).count() > exports.EXPORT_BACKGROUND_THRESHOLD:
+        exports.save_csv_in_background(exports.appellation_rows(texts), request.user)
+        return Response(status=status.HTTP_202_ACCEPTED)
 
-        for text in texts:
-            text_title = Text.objects.get(pk=text).title
-            appellations = Appellation.objects.filter(occursIn_id=text)
-            for appellation in appellations:
-                concept = Concept.objects.get(pk=appellation.interpretation_id)
-                try:
-                    writer.writerow([appellation.stringRep, appellation.startPos, appellation.endPos, concept.label, text_title])
-                except UnicodeEncodeError:
-                    # So far this only happend with the label field. Blanketly attaching .encode to all fields causes problems
-                    writer.writerow([appellation.stringRep, appellation.startPos, appellation.endPos, concept.label.encode('utf-8'), text_title])
-        # save file using file_field
-        csv_path_list = CsvDownloadList(user=request.user, file_field=File(csvFile))
-        csv_path_list.save()
-    # remove temp file
-    os.remove(temp)
+    exports.save_csv(exports.appellation_rows(texts), request.user)
     # redirect available_csvs
     return Response(status=status.HTTP_200_OK)
 
@@ -1,11 +1,11 @@
 """
 Provides project (:class:`.TextCollection`) -related views.
 """
-import csv
 import datetime
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Count
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
 from django_filters.rest_framework import DjangoFilterBackend
 from django.conf import settings
 from rest_framework import viewsets, status
@@ -13,6 +13,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
 
+from annotations import exports
 from annotations.models import TextCollection, RelationSet, Text, Appellation, VogonUserDefaultProject, RelationTemplate
 from accounts.models import VogonUser
 from annotations.serializers import TextCollectionSerializer, ProjectTextSerializer, ProjectSerializer
@@ -183,28 +184,24 @@ class ProjectViewSet(viewsets.ModelViewSet):
             createdBy=request.user,
         )
 
-        response = HttpResponse(content_type='text/csv')
+        rows = exports.affiliation_rows(project, relationsets)
+
+        # Very large projects can be exported offline; the file is listed in
+        #  the user's downloads once it is ready.
+        if request.query_params.get('background', 'false').lower() == 'true':
+            exports.save_csv_in_background(rows, request.user, prefix='affiliations')
+            return Response(status=status.HTTP_202_ACCEPTED)
+
+        response = StreamingHttpResponse(exports.iter_csv(rows), content_type='text/csv')
         response['Content-Disposition'] = 'attachment; filename="affiliations.csv"'
-        
-        fieldnames = ['project', 'created', 'text', 'affiliation', 'author']
-        writer = csv.writer(response)
-        writer.writerow(fieldnames)
-
-        for relationset in relationsets:
-            relations = relationset.constituents.all().order_by('id')[:2]
-            writer.writerow([
-                project.name, relationset.created, relationset.occursIn.title,
-                relations[0].object_content_object.stringRep,
-                relations[1].source_content_object.stringRep
-            ])
-        
         return response
 
     def get_queryset(self):
         queryset = super(ProjectViewSet, self).get_queryset()
+        # Stored counts; see annotations.statistics.
         queryset = queryset.annotate(
-            num_texts=Count('texts'),
-            num_relations=Count('texts__relationsets')
+            num_texts=Coalesce('statistics__text_count', Value(0)),
+            num_relations=Coalesce('statistics__relation_count', Value(0))
         )
         return queryset
 
@@ -3,7 +3,7 @@ These views are mainly for debugging purposes; they provide quad-xml from
 various scenarios.
 """
 
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 
 from annotations import quadriga
 from annotations.models import (RelationSet, Appellation, Relation, VogonUser,
@@ -71,6 +71,9 @@ def text_xml(request, text_id, user_id):
     """
     Return complete quad-xml for the annotations in a :class:`.Text`\.
 
+    If the ``stream`` query parameter is set, the document is streamed as it
+    is generated.
+
     Parameters
     ----------
     request : `django.http.requests.HttpRequest`
@@ -84,5 +87,8 @@ def text_xml(request, text_id, user_id):
     text = Text.objects.get(pk=text_id)
     user = VogonUser.objects.get(pk=user_id)
     relationsets = RelationSet.objects.filter(occursIn_id=text_id, createdBy_id=user_id)
+    if request.GET.get('stream', 'false').lower() in ('true', '1'):
+        chunks = quadriga.iter_quadruples(relationsets, text, user)
+        return StreamingHttpResponse(chunks, content_type='application/xml')
     text_xml, _ = quadriga.to_quadruples(relationsets, text, user, toString=True)
     return HttpResponse(text_xml, content_type='application/xml')
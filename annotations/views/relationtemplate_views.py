@@ -10,7 +10,7 @@ from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
-from annotations.models import RelationSet, RelationTemplate, RelationTemplatePart
+from annotations.models import RelationSet, RelationTemplate, RelationTemplatePart, Text
 from annotations import relations
 from annotations.serializers import TemplatePartSerializer, TypeSerializer, TemplateSerializer
 from concepts.models import Concept, Type
@@ -21,6 +21,32 @@ from .utils import get_relationset_params
 logger = logging.getLogger(__name__)
 logger.setLevel('ERROR')
 
+def _relation_text_id(datum):
+    """
+    The ID of the text that a relation in a :meth:`.create_relations` request
+    occurs in: either ``occursIn``\, or the text of the first field that
+    refers to an existing appellation.
+
+    Returns
+    -------
+    int or None
+    """
+    if not isinstance(datum, dict) or not isinstance(datum.get('fields'), list):
+        return None
+    text_id = datum.get('occursIn')
+    if not text_id:
+        for field in datum['fields']:
+            appellation = field.get('appellation') if isinstance(field, dict) else None
+            if isinstance(appellation, dict) and isinstance(appellation.get('occursIn'), dict):
+                text_id = appellation['occursIn'].get('id')
+                if text_id:
+                    break
+    try:
+        return int(text_id)
+    except (TypeError, ValueError):
+        return None
+
+
 class RelationTemplateViewSet(viewsets.ModelViewSet):
     queryset = RelationTemplate.objects.all()
     serializer_class = TemplatePartSerializer
@@ -47,6 +73,62 @@ class RelationTemplateViewSet(viewsets.ModelViewSet):
         )
         return JsonResponse({ 'relationset_id': relationset.id })
     
+    @action(detail=True, methods=['post'], url_name='createrelations')
+    def create_relations(self, request, pk=None):
+        """
+        Create many relations from this template in a single transaction.
+
+        Expects ``relations``\, a list with the same data as for
+        :meth:`.create_relation` (each with an optional ``occursIn`` text ID),
+        and an optional ``project`` for all of them. ``occursIn`` is required
+        unless a field refers to an existing appellation. Invalid data is a
+        ``400``\, with the index of the relation in the error.
+        """
+        template = get_object_or_404(RelationTemplate, pk=pk)
+        data = request.data.get('relations', [])
+        project_id = request.data.get('project', None)
+        if project_id is None:
+            project = request.user.get_default_project()
+            project_id = project.id if project else None
+
+        if not isinstance(data, list):
+            return Response({
+                'success': False,
+                'error': 'relations must be a list'
+            }, status=400)
+        text_ids = []
+        for index, datum in enumerate(data):
+            text_id = _relation_text_id(datum)
+            if text_id is None:
+                return Response({
+                    'success': False,
+                    'error': 'Relation %i has no fields, or no text (occursIn)' % index
+                }, status=400)
+            text_ids.append(text_id)
+        texts = Text.objects.in_bulk(set(text_ids))
+        missing = set(text_ids) - set(texts)
+        if missing:
+            return Response({
+                'success': False,
+                'error': 'No such text: %s' % ', '.join(map(str, sorted(missing)))
+            }, status=404)
+
+        try:
+            relationsets = relations.create_relationsets(
+                template,
+                [(texts[text_id], datum) for text_id, datum in zip(text_ids, data)],
+                request.user,
+                project_id=project_id
+            )
+        except relations.InvalidData as E:
+            return Response({
+                'success': False,
+                'error': str(E)
+            }, status=400)
+        return JsonResponse({
+            'relationset_ids': [relationset.id for relationset in relationsets]
+        })
+
     @action(detail=True, methods=['put'], url_name='update_relation')
     def update_relation(self, request, pk=None):
         relationset_id = request.data['relation_id']
@@ -21,6 +21,7 @@ from annotations.serializers import (UserSerializer, RepositorySerializer, DateA
                                      RelationSerializer)
 from annotations.models import (VogonUser, Repository, DateAppellation, DocumentPosition, 
                                 Appellation, Text, TextCollection, RelationSet, TemporalBounds, Relation)
+from annotations.prefetch import PrefetchRelationSetsMixin
 from concepts.models import Concept, Type
 from concepts.lifecycle import ConceptLifecycle
 import uuid
@@ -343,7 +344,7 @@ class PredicateViewSet(AnnotationFilterMixin, viewsets.ModelViewSet):
     permission_classes = (IsAuthenticatedOrReadOnly, )
 
 
-class RelationSetViewSet(viewsets.ModelViewSet):
+class RelationSetViewSet(PrefetchRelationSetsMixin, viewsets.ModelViewSet):
     queryset = RelationSet.objects.all()
     serializer_class = RelationSetSerializer
     permission_classes = (IsAuthenticatedOrReadOnly, )
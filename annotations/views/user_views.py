@@ -5,8 +5,8 @@ import arrow, json
 from itertools import groupby
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.core import serializers
-from django.db.models import Q, Count
-from django.db.models.functions import Trunc
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.forms import AuthenticationForm
 from rest_framework.decorators import permission_classes, authentication_classes, action
@@ -17,14 +17,14 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.decorators import action, api_view
 from accounts.views import VogonUser
 
+from annotations import statistics
 from annotations.models import (VogonUser, VogonUserManager, Text, Appellation, RelationSet,
-								Relation)
+								UserStatistics)
 from annotations.serializers import (
 	ProjectSerializer, TextSerializer, RelationSetSerializer,
 	UserSerializer, TextCollectionSerializer
 )
 from accounts.serializers import UserSerializer as VogonUserSerializer
-from annotations.views.citesphere_views import CitesphereGroupsViewSet
 
 
 
@@ -55,14 +55,15 @@ class UserViewSet(viewsets.ModelViewSet):
 	def retrieve(self, request, pk=None):
 		user = get_object_or_404(VogonUser, pk=pk)
 		user_data = UserSerializer(user).data
-		appellation_count = user.appellation_set.count()
-		relation_count = user.relation_set.count()
+		stored = UserStatistics.objects.filter(user=user).first()
+		appellation_count = stored.appellation_count if stored else 0
+		relation_count = stored.relation_count if stored else 0
 		text_count = Text.objects.filter(appellation__createdBy=user) \
 			.distinct().count()
 
 		project_qs = user.collections.all().annotate(
-			num_texts=Count('texts'),
-			num_relations=Count('texts__relationsets')
+			num_texts=Coalesce('statistics__text_count', Value(0)),
+			num_relations=Coalesce('statistics__relation_count', Value(0))
 		)
 		projects = TextCollectionSerializer(project_qs, many=True).data
 
@@ -130,9 +131,6 @@ class UserViewSet(viewsets.ModelViewSet):
 			.order_by('-added')[:5]
 		added_texts = TextSerializer(_added_texts, many=True).data
 
-		for text in added_texts:
-			groups = CitesphereGroupsViewSet.as_view({'get': 'list'})(request._request, repository_pk=text['repository_id']).data
-
 		appellation_qs = Appellation.objects.filter(createdBy__pk=request.user.id) \
 										.filter(asPredicate=False) \
 										.distinct().count()
@@ -186,10 +184,11 @@ class UserViewSet(viewsets.ModelViewSet):
 				Q(full_name__icontains=search) |
 				Q(username__icontains=search)
 			)
+		# Stored counts; see annotations.statistics.
 		queryset = queryset.annotate(
-			annotation_count=Count('appellation', distinct=True),
-			relation_count=Count('relation', distinct=True),
-			text_count=Count('addedTexts', distinct=True)
+			annotation_count=Coalesce('statistics__appellation_count', Value(0)),
+			relation_count=Coalesce('statistics__relation_count', Value(0)),
+			text_count=Coalesce('statistics__text_count', Value(0))
 		)
 		return queryset
 
@@ -203,34 +202,13 @@ class UserViewSet(viewsets.ModelViewSet):
 		)
 		start = end.shift(weeks=-8)
 
-		relations_by_user = Relation.objects.filter(
-				createdBy = user,
-				created__gt = start.datetime
-			).extra({'date' : 'date(created)'}).values('date') \
-			.annotate(count = Count('created')) \
-			.annotate(week_date = Trunc('created', 'week'))
-		appelations_by_user = Appellation.objects.filter(
-				createdBy = user,
-				created__gt = start.datetime
-			).extra({'date' : 'date(created)'}).values('date') \
-			.annotate(count = Count('created')) \
-			.annotate(week_date = Trunc('created', 'week'))
-		annotation_by_user = list(relations_by_user)
-		annotation_by_user.extend(list(appelations_by_user))
-
-		grouped = groupby(annotation_by_user, lambda x:  x['week_date'])
-
-		weekly_annotations = {}
-		for week, group in grouped:
-			annotations = list(group)
-			count = sum([x['count'] for x in annotations])
-			weekly_annotations[week] = count
+		weekly_annotations = statistics.weekly_activity(user, start.date(), end.date())
 
 		result = []
 		for week in arrow.Arrow.range('week', start, end):
 			result.append({
 				'week': week.datetime,
-				'count': weekly_annotations.get(week.datetime, 0)
+				'count': weekly_annotations.get(week.date(), 0)
 			})
 		return result
 
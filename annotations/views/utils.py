@@ -4,10 +4,22 @@ from rest_framework import status, viewsets
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from annotations import annotators
-from annotations.models import Text, TextCollection, RelationSet, Appellation, RelationTemplate, VogonUserDefaultProject
+from annotations import statistics
+from annotations.models import (Text, TextCollection, RelationSet, Appellation, DateAppellation,
+                                RelationTemplate, VogonUserDefaultProject, NetworkEdge, NetworkNode)
+from annotations.network import relationset_nodes, update_network
 from annotations.serializers import ProjectSerializer
+from annotations.workspace import bump_workspace_version
 from rest_framework.exceptions import APIException
+from django.conf import settings
 from django.db import transaction
+import logging
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(settings.LOGLEVEL)
+
+TRANSFER_CHUNK_SIZE = getattr(settings, 'TRANSFER_CHUNK_SIZE', 500)
 
 def get_project_details(request):
     project_id = request.query_params.get('project_id', None)
@@ -47,7 +59,24 @@ def _get_project(request, field):
             "code": 404
         })
 
-def _transfer_text(text, current_project, target_project, user):
+def _transfer_text(text, current_project, target_project, user, progress=None):
+    """
+    Move ``text`` and all of its parts, along with the annotations on them,
+    from ``current_project`` to ``target_project``\.
+
+    Texts are moved in chunks of ``TRANSFER_CHUNK_SIZE``\, with a fixed
+    number of queries per chunk.
+
+    Parameters
+    ----------
+    text : :class:`.Text`
+    current_project : :class:`.TextCollection`
+    target_project : :class:`.TextCollection`
+    user : :class:`.VogonUser`
+    progress : callable
+        If provided, called with the number of texts moved so far and the
+        total after each chunk.
+    """
     # Check eligibility
     is_owner = user.pk == current_project.ownedBy.pk
     is_target_contributor = target_project.participants.filter(pk=user.pk).exists()
@@ -70,27 +99,74 @@ def _transfer_text(text, current_project, target_project, user):
             "code": 403
         })
 
-        # Retrieve all related objects for `current_project`
-    appellations = Appellation.objects.filter(
-        occursIn__in=text.children,
-        project=current_project
-    )
-    relationsets = RelationSet.objects.filter(
-        occursIn__in=text.children,
-        project=current_project
-    )
+    text_ids = list(Text.objects.descendants(text).values_list('id', flat=True))
+    through = TextCollection.texts.through.objects
+    touched = set()
 
     with transaction.atomic():
-        appellations.update(project=target_project)
-        relationsets.update(project=target_project)
-        for child in text.children:
-            child_text = Text.objects.get(pk=child)
-            current_project.texts.remove(child_text)
-            target_project.texts.add(child_text)
-            
-        current_project.save(force_update=True)
-        target_project.save(force_update=True)
-    
+        for start in range(0, len(text_ids), TRANSFER_CHUNK_SIZE):
+            chunk = text_ids[start:start + TRANSFER_CHUNK_SIZE]
+            touched |= _transfer_annotations(chunk, current_project, target_project)
+
+            through.filter(textcollection_id=current_project.pk, text_id__in=chunk).delete()
+            through.bulk_create([
+                TextCollection.texts.through(textcollection_id=target_project.pk,
+                                             text_id=text_id)
+                for text_id in chunk
+            ], ignore_conflicts=True)
+
+            done = min(start + TRANSFER_CHUNK_SIZE, len(text_ids))
+            logger.debug('Transferred %i of %i texts from project %i to %i',
+                         done, len(text_ids), current_project.pk, target_project.pk)
+            if progress is not None:
+                progress(done, len(text_ids))
+
+        # Bulk updates bypass the signals that keep these in step.
+        statistics.refresh_projects([current_project.pk, target_project.pk])
+    for text_id in touched:
+        bump_workspace_version(text_id)
+
+
+def _transfer_annotations(text_ids, current_project, target_project):
+    """
+    Move the annotations on ``text_ids`` in ``current_project`` to
+    ``target_project``\, along with their part of the stored network.
+
+    Returns
+    -------
+    set
+        IDs of the texts that had annotations.
+    """
+    appellations = Appellation.objects.filter(occursIn_id__in=text_ids,
+                                              project=current_project)
+    date_appellations = DateAppellation.objects.filter(occursIn_id__in=text_ids,
+                                                       project=current_project)
+    relationsets = RelationSet.objects.filter(occursIn_id__in=text_ids,
+                                              project=current_project)
+    touched = set()
+    for queryset in (appellations, date_appellations, relationsets):
+        touched |= set(queryset.order_by().values_list('occursIn_id', flat=True).distinct())
+
+    # Network rows can simply be moved, unless the target project already has
+    #  some for these texts.
+    nodes = NetworkNode.objects.filter(occursIn_id__in=text_ids)
+    merge = nodes.filter(project=target_project).exists()
+    if merge:
+        relationset_ids = list(relationsets.values_list('id', flat=True))
+        before = relationset_nodes(relationset_ids)
+
+    appellations.update(project=target_project)
+    date_appellations.update(project=target_project)
+    relationsets.update(project=target_project)
+
+    if merge:
+        update_network(before, relationset_nodes(relationset_ids))
+    else:
+        nodes.filter(project=current_project).update(project=target_project)
+        NetworkEdge.objects.filter(occursIn_id__in=text_ids, project=current_project)\
+                           .update(project=target_project)
+    return touched
+
 def _get_project_details(request):
     project = get_project_details(request)
     if not project:
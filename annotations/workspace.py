@@ -0,0 +1,148 @@
+"""
+Loads the annotations shown in the text annotation workspace (see
+:meth:`annotations.views.annotation_views.AnnotationViewSet.retrieve`\).
+
+The serialized annotations for a text and project are cached. The cache key
+includes a version number for the text that is incremented whenever an
+annotation on that text changes (see :mod:`annotations.signals`\), and a
+global version that is incremented when a :class:`concepts.models.Concept`
+changes. Stale entries are never read, and simply expire.
+
+Version numbers live in the cache too, and can be evicted before the entries
+that they protect. A missing version is therefore started again from the
+current time in nanoseconds rather than from zero, so that it is never lower
+than a version that was used before.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from annotations.models import (Appellation, DateAppellation, Relation,
+                                RelationSet, Text)
+from annotations.prefetch import prefetch_relationsets
+from concepts.models import Type
+
+
+WORKSPACE_CACHE_TIMEOUT = getattr(settings, 'WORKSPACE_CACHE_TIMEOUT', 60 * 60)
+
+
+def _version_key(text_id=None):
+    if text_id is None:
+        return 'workspace-version:concepts'
+    return 'workspace-version:text:%s' % text_id
+
+
+def bump_workspace_version(text_id=None):
+    """
+    Invalidate cached workspaces for a :class:`.Text`\, or for all texts if
+    ``text_id`` is ``None``.
+
+    Parameters
+    ----------
+    text_id : int
+    """
+    key = _version_key(text_id)
+    try:
+        cache.incr(key)
+    except ValueError:    # Not set yet (or evicted).
+        cache.set(key, time.time_ns(), None)
+
+
+def _current_version(key, versions):
+    version = versions.get(key)
+    if version is None:    # Not set yet (or evicted).
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def workspace_version(text_id):
+    """
+    The current version of the cached workspace for a :class:`.Text`\.
+
+    Returns
+    -------
+    str
+    """
+    keys = [_version_key(text_id), _version_key()]
+    versions = cache.get_many(keys)
+    return '%i.%i' % tuple(_current_version(key, versions) for key in keys)
+
+
+def load_workspace(text, project):
+    """
+    Load all of the annotations for ``text`` in ``project``.
+
+    Parameters
+    ----------
+    text : :class:`.Text`
+    project : :class:`.TextCollection`
+
+    Returns
+    -------
+    dict
+        With keys ``appellations``, ``dateappellations``, ``relations``,
+        ``relationsets``, ``concept_types`` and ``pending_relationsets``\, as
+        expected by :class:`.TextAnnotationsSerializer`\.
+    """
+    # Every appellation in the workspace occurs in the same text, so they can
+    #  share one fully-loaded instance.
+    shared_text = Text.objects.select_related('part_of', 'addedBy', 'source', 'repository')\
+                              .prefetch_related('annotators')\
+                              .get(pk=text.id)
+
+    appellations = list(
+        Appellation.objects.filter(occursIn=text.id, project=project)
+                           .select_related('position', 'createdBy', 'interpretation__typed')
+                           .prefetch_related('relationsFrom', 'relationsTo')
+    )
+    for appellation in appellations:
+        appellation.occursIn = shared_text
+
+    relationsets = prefetch_relationsets(
+        RelationSet.objects.filter(occursIn=text.id, project=project)
+    )
+
+    return {
+        'appellations': appellations,
+        'dateappellations': DateAppellation.objects.filter(occursIn=text.id, project=project)
+                                                   .select_related('position'),
+        'relations': Relation.objects.filter(occursIn=text.id),
+        'relationsets': relationsets,
+        'concept_types': Type.objects.all(),
+        # Readiness was resolved for all relationsets at once, above.
+        'pending_relationsets': [rs for rs in relationsets
+                                 if not rs.submitted and rs.ready()],
+    }
+
+
+def serialize_workspace(text, project, context):
+    """
+    Serialized annotations for ``text`` in ``project``, from the cache if
+    possible.
+
+    Parameters
+    ----------
+    text : :class:`.Text`
+    project : :class:`.TextCollection`
+    context : dict
+        Serializer context (must include ``request``).
+
+    Returns
+    -------
+    dict
+    """
+    # annotations.serializers imports annotations.tasks, which imports this
+    #  module.
+    from annotations.serializers import TextAnnotationsSerializer
+
+    key = 'workspace:%s:%s:%s' % (text.id, project.id, workspace_version(text.id))
+    data = cache.get(key)
+    if data is None:
+        serializer = TextAnnotationsSerializer(load_workspace(text, project),
+                                               context=context)
+        data = dict(serializer.data)
+        cache.set(key, data, WORKSPACE_CACHE_TIMEOUT)
+    return data
@@ -1,8 +1,8 @@
-import requests
 import json
 from requests.auth import HTTPBasicAuth
 from lxml import etree
 from django.conf import settings
+from util import http
 
 class ConceptPower:
     def __init__(self):
@@ -18,7 +18,7 @@ class ConceptPower:
             'pos': params.get('pos', 'noun'),
             'number_of_records_per_page': params.get('limit', 100)
         }
-        response = requests.get(url=url, params=params)
+        response = http.get(url=url, params=params)
         root = etree.fromstring(response.content)
         results = []
         for child in root.findall(f'{{{self.namespace}}}conceptEntry'):
@@ -32,7 +32,7 @@ class ConceptPower:
         params = {
             'id': identifier
         }
-        response = requests.get(url=url, params=params)
+        response = http.get(url=url, params=params)
         root = etree.fromstring(response.content)
         
         type_entries = root.findall(f'{{{self.namespace}}}type_entry')
@@ -56,7 +56,7 @@ class ConceptPower:
         params = {
             'id': identifier
         }
-        response = requests.get(url=url, params=params)
+        response = http.get(url=url, params=params)
         root = etree.fromstring(response.content)
 
         concept_entries = root.findall(f'{{{self.namespace}}}conceptEntry')
@@ -113,7 +113,7 @@ class ConceptPower:
             "similar": similar_uris
         }
 
-        response = requests.post(url=url, data=json.dumps(data), auth=auth)
+        response = http.post(url=url, data=json.dumps(data), auth=auth)
 
         if response.status_code != 200:
             raise RuntimeError(response.status_code, response.text)
@@ -15,7 +15,7 @@ class ConceptPowerSearchTestCase(TestCase):
             'limit': 5
         }
 
-    @mock.patch("requests.get")
+    @mock.patch("util.http.get")
     def test_empty_concepts(self, mock_get):
         mock_get.return_value = MockResponse.from_file(
             'concepts/tests/conceptpower/response_search_empty.xml'
@@ -23,7 +23,7 @@ class ConceptPowerSearchTestCase(TestCase):
         response = self.conceptpower.search(self.params)
         self.assertEqual(response, [])
 
-    @mock.patch("requests.get")
+    @mock.patch("util.http.get")
     def test_single_concept(self, mock_get):
         mock_get.return_value = MockResponse.from_file(
             'concepts/tests/conceptpower/response_search_single.xml'
@@ -34,7 +34,7 @@ class ConceptPowerSearchTestCase(TestCase):
         ).json()
         self.assertEqual(response, expected)
 
-    @mock.patch("requests.get")
+    @mock.patch("util.http.get")
     def test_multiple_concepts(self, mock_get):
         mock_get.return_value = MockResponse.from_file(
             'concepts/tests/conceptpower/response_search_multiple.xml'
@@ -45,7 +45,7 @@ class ConceptPowerSearchTestCase(TestCase):
         ).json()
         self.assertEqual(response, expected)
 
-    @mock.patch("requests.get")
+    @mock.patch("util.http.get")
     def test_all_field_concepts(self, mock_get):
         mock_get.return_value = MockResponse.from_file(
             'concepts/tests/conceptpower/response_search_all_field.xml'
@@ -62,7 +62,7 @@ class ConceptPowerTypeTestCase(TestCase):
         self.conceptpower = ConceptPower()
         self.identifier = 'TYPE_986a7cc9-c0c1-4720-b344-853f08c136ab'
     
-    @mock.patch("requests.get")
+    @mock.patch("util.http.get")
     def test_empty_type(self, mock_get):
         mock_get.return_value = MockResponse.from_file(
             'concepts/tests/conceptpower/response_type_empty.xml'
@@ -70,7 +70,7 @@ class ConceptPowerTypeTestCase(TestCase):
         response = self.conceptpower.type(self.identifier)
         self.assertEqual(response, {})
     
-    @mock.patch("requests.get")
+    @mock.patch("util.http.get")
     def test_type_all_fields(self, mock_get):
         mock_get.return_value = MockResponse.from_file(
             'concepts/tests/conceptpower/response_type_all_fields.xml'
@@ -81,7 +81,7 @@ class ConceptPowerTypeTestCase(TestCase):
         ).json()
         self.assertEqual(response, expected)
 
-    @mock.patch("requests.get")
+    @mock.patch("util.http.get")
     def test_type_with_no_identity(self, mock_get):
         mock_get.return_value = MockResponse.from_file(
             'concepts/tests/conceptpower/response_type_no_identity.xml'
@@ -98,7 +98,7 @@ class ConceptPowerGetTestCase(TestCase):
         self.conceptpower = ConceptPower()
         self.identifier = 'http://www.digitalhps.org/concepts/WID-07007945-N-01-play'
 
-    @mock.patch("requests.get")
+    @mock.patch("util.http.get")
     def test_get_empty(self, mock_get):
         mock_get.return_value = MockResponse.from_file(
             'concepts/tests/conceptpower/response_search_empty.xml'
@@ -106,7 +106,7 @@ class ConceptPowerGetTestCase(TestCase):
         response = self.conceptpower.get(self.identifier)
         self.assertIsNone(response)
 
-    @mock.patch("requests.get")
+    @mock.patch("util.http.get")
     def test_get_concept(self, mock_get):
         mock_get.return_value = MockResponse.from_file(
             'concepts/tests/conceptpower/response_search_single.xml'
@@ -122,7 +122,7 @@ class ConceptPowerCreateTestCase(TestCase):
     def setUp(self):
         self.conceptpower = ConceptPower()
     
-    @mock.patch("requests.post")
+    @mock.patch("util.http.post")
     def test_create_concept_default(self, mock_post):
         def side_effect(**args):
             data = json.loads(args['data'])
@@ -150,7 +150,7 @@ class ConceptPowerCreateTestCase(TestCase):
         )
         self.assertEqual(response, {})
 
-    @mock.patch("requests.post")
+    @mock.patch("util.http.post")
     def test_create_concept_all_fields(self, mock_post):
         def side_effect(**args):
             data = json.loads(args['data'])
@@ -181,7 +181,7 @@ class ConceptPowerCreateTestCase(TestCase):
         )
         self.assertEqual(response, {})
 
-    @mock.patch("requests.post")
+    @mock.patch("util.http.post")
     def test_create_concept_error(self, mock_post):
         mock_post.return_value = MockResponse(
             'Error while creating concept',
@@ -113,7 +113,7 @@ class TestConceptLifeCycle(TestCase):
         manager = ConceptLifecycle(instance)
         self.assertEqual(manager.default_state, Concept.PENDING)
 
-    @mock.patch("requests.get")
+    @mock.patch("util.http.get")
     def test_get_similar_suggestions(self, mock_get):
         """
         The :class:`.ConceptLifecycle` should handle retrieving suggestions.
@@ -174,7 +174,7 @@ class TestConceptLifeCycle(TestCase):
         self.assertEqual(suggestions[0].label, 'Bradshaw 1965')
         self.assertEqual(suggestions[0].uri, URI_CONCEPT)
 
-    @mock.patch("requests.get")
+    @mock.patch("util.http.get")
     def test_get_matching_suggestions(self, mock_get):
         """
         The :class:`.ConceptLifecycle` should handle retrieving matching
@@ -244,7 +244,7 @@ class TestConceptLifeCycle(TestCase):
         with self.assertRaises(ConceptLifecycleException):
             manager.merge_with('http://www.digitalhps.org/concepts/WID-02416519-N-02-goat')
 
-    @mock.patch("requests.get")
+    @mock.patch("util.http.get")
     def test_merge_with_conceptpower(self, mock_get):
         """
         A non-native :class:`.Concept` can be merged with an existing native
@@ -285,7 +285,7 @@ class TestConceptLifeCycle(TestCase):
         self.assertEqual(instance.concept_state, Concept.MERGED)
         self.assertEqual(instance.merged_with.uri, URI_CONCEPT)
 
-    @mock.patch("requests.post")
+    @mock.patch("util.http.post")
     def test_add(self, mock_post):
         """
         When a created :class:`.Concept` is "added" to Conceptpower, a new
@@ -319,8 +319,8 @@ class TestConceptLifeCycle(TestCase):
         self.assertEqual(concept.merged_with.uri, "http://www.digitalhps.org/concepts/CONkLHTIeUQqM7m")
         self.assertEqual(concept.merged_with.concept_state, Concept.RESOLVED)
 
-    @mock.patch("requests.get")
-    @mock.patch("requests.post")
+    @mock.patch("util.http.get")
+    @mock.patch("util.http.post")
     def test_add_wrapper(self, mock_post, mock_get):
         """
         For non-created :class:`.Concept`\s, the only difference is that the
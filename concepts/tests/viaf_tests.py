@@ -10,7 +10,7 @@ class ViafSearchTestCase(TestCase):
     def setUp(self):
         self.viaf = Viaf()
 
-    @mock.patch("requests.get")
+    @mock.patch("util.http.get")
     def test_empty_concepts(self, mock_get):
         def side_effect(url, params):
             self.assertEqual(params['query'], "nonexistenttopic")
@@ -23,7 +23,7 @@ class ViafSearchTestCase(TestCase):
         concepts = self.viaf.search({ 'q': 'nonexistenttopic' })
         self.assertEqual(concepts, [])
 
-    @mock.patch("requests.get")
+    @mock.patch("util.http.get")
     def test_multiple_concepts(self, mock_get):
         mock_get.return_value = MockResponse.from_file(
             'concepts/tests/viaf/response_search_multiple.json'
@@ -40,7 +40,7 @@ class ViafGetTestCase(TestCase):
     def setUp(self):
         self.viaf = Viaf()
 
-    @mock.patch("requests.get")
+    @mock.patch("util.http.get")
     def test_concept_with_no_identity(self, mock_get):
         mock_get.return_value = MockResponse.from_file(
             'concepts/tests/viaf/response_get_no_identity.xml'
@@ -56,7 +56,7 @@ class ViafGetTestCase(TestCase):
         }
         self.assertEqual(concept, expected_concept)
 
-    @mock.patch("requests.get")
+    @mock.patch("util.http.get")
     def test_concept_with_identities(self, mock_get):
         mock_get.return_value = MockResponse.from_file(
             'concepts/tests/viaf/response_get_with_identities.xml'
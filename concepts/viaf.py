@@ -1,6 +1,6 @@
-import requests
 import json
 from lxml import etree
+from util import http
 
 class Viaf:
     def __init__(self):
@@ -10,7 +10,7 @@ class Viaf:
     def search(self, params):
         url = f'{self.endpoint}/viaf/AutoSuggest'
         params = { 'query': params['q'] }
-        response = requests.get(url=url, params=params)
+        response = http.get(url=url, params=params)
         concepts = json.loads(response.content)['result']
         results = []
 
@@ -35,7 +35,7 @@ class Viaf:
     def get(self, identifier):
         url = f'{self.endpoint}/viaf/{identifier}/viaf.xml'
         params = {'local_id': identifier}
-        response = requests.get(url=url, params=params)
+        response = http.get(url=url, params=params)
         root = etree.fromstring(response.content)
 
         concept_type = root.find(f'{{{self.namespace}}}nameType').text
@@ -0,0 +1,198 @@
+"""
+Two-tier cache for authority search results and lookups.
+
+Concept search is triggered as the user types, so the same handful of queries
+arrive many times in quick succession. A :class:`.TieredCache` answers those
+from a small in-process LRU, and only falls back to the shared cache backend
+(``CACHES`` in ``vogon/settings.py``\) when the local entry is missing or has
+expired. Values that are read from the shared backend are kept locally as
+well.
+
+Values are shared between callers in the same process, and must not be
+modified.
+"""
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class TieredCache(object):
+    """
+    An in-process LRU with a bounded size and TTL, in front of a Django cache.
+
+    Parameters
+    ----------
+    prefix : str
+        Namespace for keys in the shared backend.
+    max_size : int
+        Maximum number of entries in the local tier.
+    local_timeout : int
+        Seconds that an entry is kept in the local tier. This should be short,
+        since the local tiers of other processes are not invalidated.
+    timeout : int
+        Seconds that an entry is kept in the shared backend.
+    alias : str
+        Key in ``CACHES`` of the shared backend.
+    """
+
+    def __init__(self, prefix, max_size=1024, local_timeout=60,
+                 timeout=24 * 60 * 60, alias='default'):
+        self.prefix = prefix
+        self.max_size = max_size
+        self.local_timeout = local_timeout
+        self.timeout = timeout
+        self.alias = alias
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def _shared_key(self, key):
+        # Normalized keys can be long, or contain characters that some
+        #  backends (e.g. memcached) do not accept.
+        return '%s:%s' % (self.prefix, hashlib.md5(key.encode('utf-8')).hexdigest())
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            self.local_hits += 1
+            return value
+
+    def _set_local(self, key, value):
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.local_timeout, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_size:
+                self._local.popitem(last=False)
+
+    def get(self, key, default=None):
+        """
+        Parameters
+        ----------
+        key : str
+            See :func:`.normalize_key`\.
+        default : object
+            Returned if ``key`` is in neither tier.
+
+        Returns
+        -------
+        object
+        """
+        value = self._get_local(key)
+        if value is not None:
+            return value
+
+        value = self.shared.get(self._shared_key(key))
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            return default
+        with self._lock:
+            self.shared_hits += 1
+        self._set_local(key, value)
+        return value
+
+    def set(self, key, value):
+        """
+        Store ``value`` in both tiers. ``None`` cannot be cached.
+        """
+        self._set_local(key, value)
+        self.shared.set(self._shared_key(key), value, self.timeout)
+
+    def delete(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+        self.shared.delete(self._shared_key(key))
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def stats(self):
+        """
+        Hit and miss counters for this process.
+
+        Returns
+        -------
+        dict
+        """
+        with self._lock:
+            size = len(self._local)
+            local_hits, shared_hits, misses = self.local_hits, self.shared_hits, self.misses
+        lookups = local_hits + shared_hits + misses
+        return {
+            'local_hits': local_hits,
+            'shared_hits': shared_hits,
+            'misses': misses,
+            'hit_rate': (local_hits + shared_hits) / lookups if lookups else 0.,
+            'local_size': size,
+        }
+
+
+def _fold(value):
+    """
+    Case- and whitespace-fold a key component.
+    """
+    if value is None:
+        return ''
+    return ' '.join(str(value).split()).casefold()
+
+
+def normalize_key(q, pos=None, limit=None):
+    """
+    Cache key for a concept search.
+
+    Queries that differ only in case or whitespace share a key.
+
+    Parameters
+    ----------
+    q : str
+    pos : str
+    limit : int or str
+
+    Returns
+    -------
+    str
+    """
+    try:
+        limit = int(limit) if limit not in (None, '') else ''
+    except (TypeError, ValueError):
+        limit = _fold(limit)
+    return '%s###%s###%s' % (_fold(pos), limit, _fold(q))
+
+
+_options = getattr(settings, 'CONCEPT_SEARCH_CACHE', {})
+
+search_cache = TieredCache(
+    'goat-search',
+    max_size=_options.get('MAX_SIZE', 1024),
+    local_timeout=_options.get('LOCAL_TIMEOUT', 60),
+    timeout=_options.get('TIMEOUT', 24 * 60 * 60),
+    alias=_options.get('ALIAS', 'default'),
+)
+"""Serialized concept search results, keyed by :func:`.normalize_key`\."""
+
+lookup_cache = TieredCache(
+    'goat-lookup',
+    max_size=_options.get('MAX_SIZE', 1024),
+    local_timeout=_options.get('LOOKUP_LOCAL_TIMEOUT', 10 * 60),
+    timeout=_options.get('TIMEOUT', 24 * 60 * 60),
+    alias=_options.get('ALIAS', 'default'),
+)
+"""Individual records (e.g. concept types) fetched from an authority."""
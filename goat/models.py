@@ -28,6 +28,31 @@ class Authority(BasicAccessionMixin):
     description = models.TextField(**opt)
     builtin_identity_system = models.ForeignKey('IdentitySystem', on_delete=models.CASCADE, **opt)
 
+    @classmethod
+    def for_identifier(cls, identifier, authorities=None):
+        """
+        Find the :class:`.Authority` whose namespace occurs in ``identifier``\.
+
+        Parameters
+        ----------
+        identifier : str
+        authorities : iterable
+            Candidate :class:`.Authority` instances. Pass these in to avoid
+            a query for every identifier.
+
+        Returns
+        -------
+        :class:`.Authority` or None
+        """
+        if authorities is None:
+            authorities = cls.objects.all()
+        for authority in authorities:
+            if not authority.namespace:
+                continue
+            if authority.namespace in identifier:
+                return authority
+        return None
+
     @property
     def manager(self):
         if self.builtin_identity_system.name == 'builtin:Conceptpower':
@@ -90,12 +115,7 @@ class Concept(BasicAccessionMixin):
 
     def save(self, *args, **kwargs):
         if not self.authority:
-            for authority in Authority.objects.all():
-                if not authority.namespace:
-                    continue
-                if authority.namespace in self.identifier:
-                    self.authority = authority
-                    break
+            self.authority = Authority.for_identifier(self.identifier)
         super(Concept, self).save(*args, **kwargs)
 
 
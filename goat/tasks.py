@@ -1,25 +1,99 @@
 from __future__ import absolute_import
 
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 import os
-import urllib
+import time
 from django.conf import settings
 from annotations.models import VogonUser
 
+from goat.cache import lookup_cache
 from goat.models import Authority, Concept, Identity
 
+import logging
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(settings.LOGLEVEL)
 
-def orchestrate_search(user_id, authority_ids, params):
+
+CONCEPT_SEARCH_CONCURRENT = getattr(settings, 'CONCEPT_SEARCH_CONCURRENT', True)
+
+CONCEPT_SEARCH_TIMEOUT = getattr(settings, 'CONCEPT_SEARCH_TIMEOUT', 10)
+"""Seconds to wait for an authority before giving up on its results."""
+
+CONCEPT_SEARCH_AUTHORITY_TIMEOUTS = getattr(settings, 'CONCEPT_SEARCH_AUTHORITY_TIMEOUTS', {})
+"""Overrides :data:`.CONCEPT_SEARCH_TIMEOUT` by :class:`.Authority` name."""
+
+
+class SearchResults(list):
+    """
+    Lists of :class:`goat.models.Concept` instances, one per
+    :class:`.Authority`\.
+
+    ``complete`` is ``False`` if any of the authorities did not respond in
+    time, or failed.
     """
-    Farm out search tasks (in a chord) to each of the :class:`.Authority`
-    instances in ``authorities``.
+    complete = True
+
+
+def orchestrate_search(user_id, authority_ids, params, concurrent=None):
+    """
+    Farm out searches to each of the :class:`.Authority` instances in
+    ``authority_ids``\.
+
+    In concurrent mode (the default, see ``CONCEPT_SEARCH_CONCURRENT``\) all
+    authorities are queried at once, so the wait is bounded by the slowest
+    authority or its timeout rather than by the sum of their response times.
+    Only the requests to the authorities run in worker threads; the results
+    are stored in the calling thread.
+
+    Parameters
+    ----------
+    user_id : int
+    authority_ids : list
+    params : dict
+    concurrent : bool
+
+    Returns
+    -------
+    :class:`.SearchResults`
+        In the order of ``authority_ids``\.
     """
-    # We keep track of the parameters so that we don't end up running the same
-    #  search several times in a row.
-    params_serialized = urllib.parse.urlencode(params)
     user = VogonUser.objects.get(pk=user_id)
-    authorities = Authority.objects.filter(pk__in=authority_ids)
+    authorities = Authority.objects.filter(pk__in=authority_ids)\
+                                   .select_related('builtin_identity_system')\
+                                   .in_bulk()
+    authorities = [authorities[pk] for pk in authority_ids if pk in authorities]
+    if concurrent is None:
+        concurrent = CONCEPT_SEARCH_CONCURRENT
 
-    result = [search(user.id, auth.id, params) for auth in authorities]
+    result = SearchResults()
+    if not concurrent or len(authorities) < 2:
+        result.extend(search(user.id, auth.id, params) for auth in authorities)
+        return result
+
+    # Resolve the managers here; Authority.manager touches the database.
+    searches = [auth.search for auth in authorities]
+    start = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=len(authorities))
+    futures = [executor.submit(method, params) for method in searches]
+    # Don't wait for stragglers; their results are discarded.
+    executor.shutdown(wait=False)
+
+    for authority, future in zip(authorities, futures):
+        timeout = CONCEPT_SEARCH_AUTHORITY_TIMEOUTS.get(authority.name,
+                                                        CONCEPT_SEARCH_TIMEOUT)
+        try:
+            results = future.result(timeout=max(0, start + timeout - time.monotonic()))
+        except TimeoutError:
+            logger.warning('Search of %s timed out after %s seconds',
+                           authority.name, timeout)
+            result.complete = False
+            results = []
+        except Exception:
+            logger.exception('Search of %s failed', authority.name)
+            result.complete = False
+            results = []
+        result.append(ingest(user, authority, results))
     return result
 
 
@@ -45,59 +119,135 @@ def search(user_id, authority_id, params):
 
     user = VogonUser.objects.get(pk=user_id)
     authority = Authority.objects.get(pk=authority_id)
-    concepts = []
-    results = authority.search(params)
-    
+    return ingest(user, authority, authority.search(params))
+
+
+def ingest(user, authority, results):
+    """
+    Store the search results from an :class:`.Authority`\.
+
+    Parameters
+    ----------
+    user : :class:`annotations.models.VogonUser`
+    authority : :class:`goat.models.Authority`
+    results : list
+        Raw results from the authority manager's ``search`` method.
+
+    Returns
+    -------
+    list
+        :class:`goat.models.Concept` instances, in the order of ``results``\.
+    """
+    results = [result for result in results if result.get('identifier')]
+    if not results:
+        return []
+
+    authorities = list(Authority.objects.all())
+    concept_types = _get_concept_types(
+        {result['concept_type'] for result in results if result['concept_type']},
+        authority, user, authorities
+    )
+
+    new_concepts = {}
+    for result in results:
+        concept_type = concept_types.get(result['concept_type'])
+        new_concepts.setdefault(result['identifier'], Concept(
+            identifier=result['identifier'],
+            added_by=user,
+            name=result['name'],
+            local_identifier=result['local_identifier'],
+            description=result['description'],
+            concept_type=concept_type,
+            authority=authority
+        ))
+    for result in results:
+        for ident in result.get('identities', None) or []:
+            # Equivalent to Concept.save() resolving the authority.
+            new_concepts.setdefault(ident, Concept(
+                identifier=ident,
+                added_by=user,
+                authority=Authority.for_identifier(ident, authorities)
+            ))
+    # Concepts that already exist are left alone, as get_or_create() would.
+    Concept.objects.bulk_create(new_concepts.values(), ignore_conflicts=True)
+    concepts = Concept.objects.in_bulk(list(new_concepts), field_name='identifier')
+
+    _add_identities(results, concepts, authority, user)
+    return [concepts[result['identifier']] for result in results]
+
+
+def _add_identities(results, concepts, authority, user):
+    """
+    Record that each search result is identical to the concepts listed in its
+    ``identities``\, unless an :class:`.Identity` in the authority's
+    identity system already says so.
+    """
+    system = authority.builtin_identity_system
+    wanted = []
     for result in results:
         identities = result.get('identities', None)
-        if result['concept_type']:
-            concept_type = _get_concept_type(result, authority, user)
-        else:
-            concept_type = None
+        if not identities:
+            continue
+        members = {concepts[result['identifier']].id} \
+                  | {concepts[ident].id for ident in identities}
+        wanted.append((result['name'], members))
+    if not wanted:
+        return
+
+    Through = Identity.concepts.through
+    existing = {}
+    for identity_id, concept_id in Through.objects.filter(
+                identity__part_of=system,
+                concept_id__in=set.union(*[members for _, members in wanted])
+            ).values_list('identity_id', 'concept_id'):
+        existing.setdefault(identity_id, set()).add(concept_id)
+    # The same identity can come back for repeated searches.
+    known = list(existing.values())
+
+    links = []
+    for name, members in wanted:
+        if any(members <= other for other in known):
+            continue
+        identity = Identity.objects.create(name=name, part_of=system,
+                                           added_by=user)
+        links += [Through(identity_id=identity.id, concept_id=concept_id)
+                  for concept_id in members]
+        known.append(members)
+    Through.objects.bulk_create(links)
+
+
+def _get_concept_types(identifiers, authority, user, authorities):
+    """
+    Load or create the type :class:`.Concept`\s for a page of results.
+
+    Types that are not yet stored are fetched from the authority (see
+    :data:`goat.cache.lookup_cache`\).
+
+    Returns
+    -------
+    dict
+        :class:`.Concept` instances keyed by identifier.
+    """
+    if not identifiers:
+        return {}
+    concept_types = Concept.objects.in_bulk(list(identifiers), field_name='identifier')
+    missing = [ident for ident in identifiers if ident not in concept_types]
+    if not missing:
+        return concept_types
+
+    new_types = []
+    for identifier in missing:
+        cache_key = 'type:%s:%s' % (authority.id, identifier)
+        concept_type_result = lookup_cache.get(cache_key)
+        if concept_type_result is None:
+            try:
+                concept_type_result = authority.manager.type(identifier=identifier)
+            except Exception as E:
+                concept_type_result = None
+                raise E
+            if concept_type_result:
+                lookup_cache.set(cache_key, concept_type_result)
 
-        concept, _ = Concept.objects.get_or_create(
-            identifier=result['identifier'],
-            defaults={
-                'added_by': user,
-                'name': result['name'],
-                'local_identifier': result['local_identifier'],
-                'description': result['description'],
-                'concept_type': concept_type,
-                'authority': authority
-            }
-        )
-
-        if identities:
-            _defaults = {
-                'added_by': user
-            }
-            alt_concepts = [
-                Concept.objects.get_or_create(
-                    identifier=ident,
-                    defaults=_defaults)[0]
-                for ident in identities
-            ]
-            identity = Identity.objects.create(
-                name = result['name'],
-                part_of = authority.builtin_identity_system,
-                added_by = user
-            )
-            identity.concepts.add(concept, *alt_concepts)
-
-        concepts.append(concept)
-    return concepts
-
-
-def _get_concept_type(result, authority, user):
-    try:
-        concept_type = Concept.objects.get(identifier=result['concept_type'])
-    except Concept.DoesNotExist:
-        try:
-            concept_type_result = authority.manager.type(identifier=result['concept_type'])
-        except Exception as E:
-            concept_type_result = None
-            raise E
-        
         defaults = {
             'added_by': user,
             'authority': authority
@@ -105,16 +255,18 @@ def _get_concept_type(result, authority, user):
         if concept_type_result:
             defaults.update({
                 'name': concept_type_result['name'],
-                'local_identifier': result['concept_type'],
+                'local_identifier': identifier,
                 'description': concept_type_result['description'],
 
             })
         else:
             defaults.update({
-                'name': result['concept_type'],
-                'local_identifier': result['concept_type'],
+                'name': identifier,
+                'local_identifier': identifier,
             })
         if defaults.get('name') is None:
-            defaults['name'] = result['concept_type']
-        concept_type = Concept.objects.create(identifier=result['concept_type'], **defaults)
-    return concept_type
+            defaults['name'] = identifier
+        new_types.append(Concept(identifier=identifier, **defaults))
+    Concept.objects.bulk_create(new_types, ignore_conflicts=True)
+    concept_types.update(Concept.objects.in_bulk(missing, field_name='identifier'))
+    return concept_types
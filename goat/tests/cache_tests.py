@@ -0,0 +1,81 @@
+import threading
+import mock
+from django.test import SimpleTestCase, override_settings
+
+from goat.cache import TieredCache, normalize_key
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+               'LOCATION': 'tiered-cache-tests'},
+})
+class TieredCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        self.cache = TieredCache('test', max_size=2, local_timeout=60, alias='shared')
+        self.cache.shared.clear()
+
+    def test_local_hit(self):
+        self.cache.set('a', 1)
+        with mock.patch.object(self.cache.shared, 'get') as mock_get:
+            self.assertEqual(self.cache.get('a'), 1)
+            mock_get.assert_not_called()
+        self.assertEqual(self.cache.stats()['local_hits'], 1)
+
+    def test_shared_hit(self):
+        """
+        E.g. a value that was cached by another process.
+        """
+        self.cache.set('a', 1)
+        self.cache.clear_local()
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.get('a'), 1)
+        stats = self.cache.stats()
+        self.assertEqual((stats['shared_hits'], stats['local_hits']), (1, 1))
+
+    def test_miss(self):
+        self.assertEqual(self.cache.get('a', 'default'), 'default')
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_local_timeout(self):
+        self.cache.set('a', 1)
+        with mock.patch('goat.cache.time.monotonic', return_value=10 ** 9):
+            self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.stats()['shared_hits'], 1)
+
+    def test_local_size(self):
+        for key in ['a', 'b', 'c']:
+            self.cache.set(key, key)
+        self.assertEqual(self.cache.stats()['local_size'], 2)
+        self.assertEqual(self.cache.get('a'), 'a')    # Evicted locally.
+        self.assertEqual(self.cache.stats()['shared_hits'], 1)
+
+    def test_delete(self):
+        self.cache.set('a', 1)
+        self.cache.delete('a')
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_concurrent_counters(self):
+        self.cache.set('a', 1)
+
+        def _get():
+            for _ in range(500):
+                self.cache.get('a')
+                self.cache.get('missing')
+
+        threads = [threading.Thread(target=_get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = self.cache.stats()
+        self.assertEqual(stats['local_hits'] + stats['shared_hits'], 4000)
+        self.assertEqual(stats['misses'], 4000)
+
+
+class NormalizeKeyTestCase(SimpleTestCase):
+    def test_fold(self):
+        self.assertEqual(normalize_key('  Darwin  Charles ', 'Noun', '10'),
+                         normalize_key('darwin charles', 'noun', 10))
+        self.assertNotEqual(normalize_key('darwin', limit=10),
+                            normalize_key('darwin', limit=20))
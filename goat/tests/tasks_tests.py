@@ -0,0 +1,142 @@
+import threading
+import time
+import mock
+from django.test import TestCase
+
+from annotations.models import VogonUser
+from goat import tasks
+from goat.cache import lookup_cache
+from goat.models import Authority, Concept, Identity, IdentitySystem
+
+
+def _result(identifier, concept_type=None, identities=None):
+    return {
+        'identifier': identifier,
+        'name': 'Name of %s' % identifier,
+        'local_identifier': identifier.rsplit('/', 1)[-1],
+        'description': '',
+        'concept_type': concept_type,
+        'identities': identities,
+    }
+
+
+class GoatTasksTestCase(TestCase):
+    def setUp(self):
+        self.user = VogonUser.objects.create_user(
+            "test", "test@example.com", "test", "Test User"
+        )
+        self.authorities = []
+        for name, namespace in [('Conceptpower', 'http://conceptpower/'),
+                                ('VIAF', 'http://viaf/')]:
+            system = IdentitySystem.objects.create(name='builtin:%s' % name,
+                                                   added_by=self.user)
+            self.authorities.append(Authority.objects.create(
+                name=name,
+                namespace=namespace,
+                builtin_identity_system=system,
+                added_by=self.user
+            ))
+        self.conceptpower, self.viaf = self.authorities
+        lookup_cache.clear_local()
+
+
+class OrchestrateSearchTestCase(GoatTasksTestCase):
+    def _search(self, conceptpower, viaf):
+        with mock.patch('concepts.conceptpower.ConceptPower.search', side_effect=conceptpower), \
+             mock.patch('concepts.viaf.Viaf.search', side_effect=viaf):
+            return tasks.orchestrate_search(self.user.id,
+                                            [self.conceptpower.id, self.viaf.id],
+                                            {'q': 'darwin'})
+
+    def test_concurrent(self):
+        # Each search only returns once both have started.
+        barrier = threading.Barrier(2, timeout=5)
+
+        def conceptpower(params):
+            barrier.wait()
+            return [_result('http://conceptpower/1')]
+
+        def viaf(params):
+            barrier.wait()
+            return [_result('http://viaf/1'), _result('http://viaf/2')]
+
+        result = self._search(conceptpower, viaf)
+        self.assertTrue(result.complete)
+        self.assertEqual([[c.identifier for c in concepts] for concepts in result],
+                         [['http://conceptpower/1'], ['http://viaf/1', 'http://viaf/2']])
+
+    @mock.patch('goat.tasks.CONCEPT_SEARCH_TIMEOUT', 0.2)
+    def test_timeout(self):
+        def viaf(params):
+            time.sleep(1)
+            return [_result('http://viaf/1')]
+
+        start = time.monotonic()
+        result = self._search(lambda params: [_result('http://conceptpower/1')], viaf)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertFalse(result.complete)
+        self.assertEqual(len(result[0]), 1)
+        self.assertEqual(result[1], [])
+
+    def test_failure(self):
+        def viaf(params):
+            raise ValueError('Unavailable')
+
+        result = self._search(lambda params: [_result('http://conceptpower/1')], viaf)
+        self.assertFalse(result.complete)
+        self.assertEqual(len(result[0]), 1)
+        self.assertEqual(result[1], [])
+
+    def test_sequential(self):
+        with mock.patch('concepts.conceptpower.ConceptPower.search',
+                        return_value=[_result('http://conceptpower/1')]), \
+             mock.patch('concepts.viaf.Viaf.search', return_value=[]):
+            result = tasks.orchestrate_search(self.user.id,
+                                              [self.viaf.id, self.conceptpower.id],
+                                              {'q': 'darwin'}, concurrent=False)
+        self.assertEqual([len(concepts) for concepts in result], [0, 1])
+
+
+class IngestTestCase(GoatTasksTestCase):
+    def test_ingest(self):
+        results = [_result('http://conceptpower/2'), _result('http://conceptpower/1'),
+                   _result('http://conceptpower/2'), _result('')]
+        concepts = tasks.ingest(self.user, self.conceptpower, results)
+        self.assertEqual([c.identifier for c in concepts],
+                         ['http://conceptpower/2', 'http://conceptpower/1',
+                          'http://conceptpower/2'])
+        self.assertEqual(concepts[0].id, concepts[2].id)
+        self.assertEqual(concepts[0].authority, self.conceptpower)
+        self.assertEqual(Concept.objects.count(), 2)
+
+        # Existing concepts are reused, and left alone.
+        Concept.objects.filter(identifier='http://conceptpower/1').update(name='Changed')
+        again = tasks.ingest(self.user, self.conceptpower, results[:2])
+        self.assertEqual([c.id for c in again], [c.id for c in concepts[:2]])
+        self.assertEqual(again[1].name, 'Changed')
+        self.assertEqual(Concept.objects.count(), 2)
+
+    def test_concept_types(self):
+        results = [_result('http://conceptpower/1', 'http://conceptpower/type'),
+                   _result('http://conceptpower/2', 'http://conceptpower/type')]
+        with mock.patch('concepts.conceptpower.ConceptPower.type',
+                        return_value={'name': 'Type', 'description': 'A type'}) as mock_type:
+            concepts = tasks.ingest(self.user, self.conceptpower, results)
+            tasks.ingest(self.user, self.conceptpower, results)
+        self.assertEqual(mock_type.call_count, 1)
+        concept_type = concepts[0].concept_type
+        self.assertEqual((concept_type.identifier, concept_type.name),
+                         ('http://conceptpower/type', 'Type'))
+        self.assertEqual(concepts[1].concept_type, concept_type)
+
+    def test_identities(self):
+        results = [_result('http://conceptpower/1', identities=['http://viaf/1'])]
+        concepts = tasks.ingest(self.user, self.conceptpower, results)
+        tasks.ingest(self.user, self.conceptpower, results)
+
+        viaf_concept = Concept.objects.get(identifier='http://viaf/1')
+        self.assertEqual(viaf_concept.authority, self.viaf)
+        identity = Identity.objects.get()
+        self.assertEqual(identity.part_of, self.conceptpower.builtin_identity_system)
+        self.assertEqual(set(identity.concepts.values_list('id', flat=True)),
+                         {concepts[0].id, viaf_concept.id})
@@ -1,16 +1,14 @@
 from functools import reduce
 from itertools import groupby
 from django.shortcuts import get_object_or_404
-from django.core.cache import cache
 
 from goat import tasks
+from goat.cache import normalize_key, search_cache
 from goat.serializers import ConceptSerializer
 from goat.models import Authority, Concept
 
-def get_concept_cache_key(query, pos):
-    if not pos:
-        return query
-    return f"{pos}###{query}"
+def get_concept_cache_key(query, pos, limit=None):
+    return normalize_key(query, pos, limit)
 
 def search(*args, **kwargs):
     """
@@ -26,21 +24,27 @@ def search(*args, **kwargs):
     # The client can coerce a new search even if we have results for an
     #  identical query.
     force = params.pop('force', None) == 'force'
-    cache_key = get_concept_cache_key(q, kwargs.get("pos"))
+    cache_key = get_concept_cache_key(q, params.get("pos"), params.get("limit"))
 
-    if not force and cache.get(cache_key):
-        return cache.get(cache_key)
+    if not force:
+        result = search_cache.get(cache_key)
+        if result:
+            return result
 
     # We let the asynchronous task create the SearchResultSet, since it will
     #  spawn tasks that need to update the SearchResultSet upon completion.
     result = tasks.orchestrate_search(kwargs['user_id'], list(Authority.objects.all().values_list('id', flat=True)),
                                             params)
 
+    complete = getattr(result, 'complete', True)
+
     # We have to build this manually, since the SearchResultSet probably does
     #  not yet exist.
-    result = reduce(lambda x,y: x+y, result) # Flatten
+    result = reduce(lambda x,y: x+y, result, []) # Flatten
     result = ConceptSerializer(result, many=True).data
-    cache.set(cache_key, result, 24 * 60 * 60) # Set 24hrs expiry
+    # Results are incomplete if an authority timed out; try again next time.
+    if complete:
+        search_cache.set(cache_key, result)
     return result
 
 def retrieve(identifier):
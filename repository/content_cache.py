@@ -0,0 +1,281 @@
+"""
+On-disk cache for file content retrieved from repositories (Giles,
+Citesphere).
+
+Content is stored once per distinct body, under its SHA-256 digest, along with
+the detected encoding and the decoded text. A small index file maps each cache
+key (e.g. a user and a file ID, or a URL) to a digest, so that the same file
+requested under different keys is only stored once. Since keys include the
+user, cached content is not shared with users who could not retrieve it from
+the repository themselves.
+
+A file can be replaced in the repository under the same ID, so index entries
+are only used for ``CONTENT_CACHE_MAX_AGE`` seconds after the content was
+fetched. After that the content is fetched again.
+
+When the total size of the stored content exceeds ``CONTENT_CACHE_MAX_SIZE``
+bytes, the least recently used entries (and the index entries that point to
+them) are evicted. The size is tracked incrementally as content is written,
+and only measured on disk when eviction may be due.
+
+Configured with the (optional) settings ``CONTENT_CACHE_DIR``\,
+``CONTENT_CACHE_MAX_SIZE``\, ``CONTENT_CACHE_MAX_AGE`` and
+``CONTENT_CACHE_SCAN_INTERVAL``\.
+"""
+from collections import namedtuple
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+from repository.encoding import decode
+
+logger = logging.getLogger(__name__)
+
+
+CachedContent = namedtuple('CachedContent', ['digest', 'encoding', 'text'])
+"""``text`` is the decoded content (``str``\)."""
+
+
+EVICTION_TARGET = 0.9
+"""Fraction of the maximum size that eviction reduces the cache to."""
+
+_lock = threading.Lock()
+_size = None    # Running estimate of the size of the stored content.
+_scanned = 0.   # When the size was last measured.
+
+
+def _cache_dir():
+    return getattr(settings, 'CONTENT_CACHE_DIR',
+                   os.path.join(tempfile.gettempdir(), 'vogon-content'))
+
+
+def _max_size():
+    return getattr(settings, 'CONTENT_CACHE_MAX_SIZE', 512 * 1024 * 1024)
+
+
+def _max_age():
+    return getattr(settings, 'CONTENT_CACHE_MAX_AGE', 24 * 60 * 60)
+
+
+def _scan_interval():
+    return getattr(settings, 'CONTENT_CACHE_SCAN_INTERVAL', 5 * 60)
+
+
+def _index_path(key):
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+    return os.path.join(_cache_dir(), 'index', digest[:2], digest)
+
+
+def _blob_path(digest, suffix=''):
+    return os.path.join(_cache_dir(), 'blobs', digest[:2], digest + suffix)
+
+
+def _write(path, data):
+    """
+    Write ``data`` to ``path`` atomically, so that concurrent readers never
+    see a partial file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def get(key):
+    """
+    Look up cached content.
+
+    Content that was fetched more than ``CONTENT_CACHE_MAX_AGE`` seconds ago
+    is not returned.
+
+    Parameters
+    ----------
+    key : str
+
+    Returns
+    -------
+    :class:`.CachedContent` or None
+    """
+    index_path = _index_path(key)
+    try:
+        with open(index_path) as f:
+            entry = json.load(f)
+        if time.time() - entry.get('stored', 0) > _max_age():
+            return None
+        text_path = _blob_path(entry['digest'], '.txt')
+        with open(text_path, 'rb') as f:
+            text = f.read().decode('utf-8')
+    except (IOError, OSError, ValueError, KeyError):
+        return None
+
+    # Modification times drive LRU eviction.
+    for path in (index_path, text_path, _blob_path(entry['digest'])):
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+    return CachedContent(entry['digest'], entry['encoding'], text)
+
+
+def put(key, raw, encoding=None):
+    """
+    Store ``raw`` content under ``key``\.
+
+    Parameters
+    ----------
+    key : str
+    raw : bytes
+    encoding : str
+        Likely encoding of ``raw``\, if known (see
+        :func:`repository.encoding.decode`\).
+
+    Returns
+    -------
+    :class:`.CachedContent`
+    """
+    digest = hashlib.sha256(raw).hexdigest()
+    encoding, text = decode(raw, encoding)
+    try:
+        written = 0
+        if not os.path.exists(_blob_path(digest, '.txt')):
+            encoded = text.encode('utf-8')
+            _write(_blob_path(digest), raw)
+            _write(_blob_path(digest, '.txt'), encoded)
+            written += len(raw) + len(encoded)
+        _write(_index_path(key), json.dumps({'digest': digest,
+                                             'encoding': encoding,
+                                             'stored': time.time()}).encode('utf-8'))
+        _added(written)
+    except (IOError, OSError):
+        # The cache is an optimization; never fail a request because of it.
+        logger.exception('Could not write to the content cache')
+    return CachedContent(digest, encoding, text)
+
+
+def get_or_fetch(key, fetch, encoding=None):
+    """
+    Return cached content for ``key``, or call ``fetch`` and cache the result.
+
+    Parameters
+    ----------
+    key : str
+    fetch : callable
+        Returns the raw content (``bytes``\). Anything else (e.g. an error
+        returned by a repository manager) is returned as-is, and not cached.
+    encoding : str
+        See :func:`.put`\.
+
+    Returns
+    -------
+    :class:`.CachedContent` or object
+    """
+    cached = get(key)
+    if cached is not None:
+        return cached
+    raw = fetch()
+    if not isinstance(raw, bytes):
+        return raw
+    return put(key, raw, encoding)
+
+
+def _added(size):
+    """
+    Account for ``size`` bytes written to the cache, and evict content if the
+    cache may have grown past its maximum size.
+
+    The total size is only measured (by :func:`.evict`\) when the running
+    estimate for this process exceeds the maximum, or at least every
+    ``CONTENT_CACHE_SCAN_INTERVAL`` seconds to pick up writes from other
+    processes; not on every write.
+    """
+    global _size
+    with _lock:
+        if _size is not None:
+            _size += size
+        due = _size is None or _size > _max_size() \
+              or time.time() - _scanned > _scan_interval()
+    if due:
+        evict()
+
+
+def evict(max_size=None):
+    """
+    Remove the least recently used content, along with the index entries
+    that point to it, once the total size of the cache is more than
+    ``max_size`` bytes.
+
+    Content is removed until the cache is at most
+    :data:`.EVICTION_TARGET` of ``max_size``\, so that the next eviction is
+    not due straight away.
+    """
+    global _size, _scanned
+    if max_size is None:
+        max_size = _max_size()
+    root = os.path.join(_cache_dir(), 'blobs')
+    # The raw and decoded content of a digest are evicted together.
+    entries = {}
+    total = 0
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            digest = filename.split('.')[0]
+            mtime, size, paths = entries.get(digest, (0, 0, []))
+            entries[digest] = (max(mtime, stat.st_mtime), size + stat.st_size,
+                               paths + [path])
+            total += stat.st_size
+
+    evicted = set()
+    if total > max_size:
+        target = max_size * EVICTION_TARGET
+        for digest, (_, size, paths) in sorted(entries.items(), key=lambda e: e[1][0]):
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            evicted.add(digest)
+            total -= size
+            if total <= target:
+                break
+    if evicted:
+        _evict_index(evicted)
+
+    with _lock:
+        _size = total
+        _scanned = time.time()
+
+
+def _evict_index(digests):
+    """
+    Remove index entries that point to ``digests``\, or to content that is
+    no longer stored (e.g. evicted by another process).
+    """
+    for directory, _, filenames in os.walk(os.path.join(_cache_dir(), 'index')):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            try:
+                with open(path) as f:
+                    digest = json.load(f)['digest']
+            except (IOError, OSError, ValueError, KeyError):
+                continue
+            if digest in digests or not os.path.exists(_blob_path(digest, '.txt')):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
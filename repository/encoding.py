@@ -0,0 +1,89 @@
+"""
+Encoding detection for text content retrieved from repositories.
+
+Giles serves everything with a UTF-8 header, even when it is not UTF-8, so the
+encoding has to be guessed. Running ``chardet.detect`` over a whole document
+is slow for large texts, so we first try the encodings that are most likely
+(UTF-8, then a previously detected encoding) with a strict decode, and only
+fall back to :class:`chardet.universaldetector.UniversalDetector` over a
+bounded prefix of the content.
+"""
+import codecs
+
+from chardet.universaldetector import UniversalDetector
+
+
+DETECTION_PREFIX_SIZE = 64 * 1024
+"""Maximum number of bytes fed to the fallback detector."""
+
+DETECTION_CHUNK_SIZE = 4 * 1024
+
+
+def detect_encoding(raw):
+    """
+    Guess the encoding of ``raw`` from (at most) its first
+    :data:`.DETECTION_PREFIX_SIZE` bytes.
+
+    Parameters
+    ----------
+    raw : bytes
+
+    Returns
+    -------
+    str
+    """
+    detector = UniversalDetector()
+    prefix = memoryview(raw)[:DETECTION_PREFIX_SIZE]
+    for start in range(0, len(prefix), DETECTION_CHUNK_SIZE):
+        detector.feed(bytes(prefix[start:start + DETECTION_CHUNK_SIZE]))
+        if detector.done:
+            break
+    detector.close()
+    return detector.result.get('encoding') or 'utf-8'
+
+
+def decode(raw, hint=None):
+    """
+    Decode ``raw`` text content.
+
+    Content with a UTF-8 byte order mark is decoded as ``utf-8-sig``\.
+    Otherwise, tries a strict decode with UTF-8, then with ``hint`` (e.g. the
+    encoding that was detected the last time the same text was loaded), and
+    only then falls back to :func:`.detect_encoding`\.
+
+    UTF-8 is tried first because single-byte encodings such as ISO-8859-1
+    decode any input without error; trying such a hint first would garble
+    UTF-8 content for good once it had been detected for a text.
+
+    Parameters
+    ----------
+    raw : bytes
+    hint : str
+
+    Returns
+    -------
+    tuple
+        ``(encoding, text)``
+    """
+    candidates = ['utf-8', hint]
+    if raw.startswith(codecs.BOM_UTF8):
+        candidates.insert(0, 'utf-8-sig')
+    for encoding in candidates:
+        if not encoding:
+            continue
+        try:
+            return encoding, raw.decode(encoding)
+        except (UnicodeDecodeError, LookupError):
+            continue
+    encoding = detect_encoding(raw)
+    try:
+        return encoding, raw.decode(encoding, errors='replace')
+    except LookupError:
+        return 'utf-8', raw.decode('utf-8', errors='replace')
+
+
+def is_utf8(encoding):
+    """
+    Whether ``encoding`` is a name for UTF-8 (or a subset of it).
+    """
+    return (encoding or '').lower().replace('_', '-') in ('utf-8', 'utf8', 'ascii')
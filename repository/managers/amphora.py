@@ -1,7 +1,7 @@
-import requests
 import json
 
 from accounts.models import GithubToken
+from util import http
 
 class AmphoraRepository:
     def __init__(self, user, endpoint):
@@ -19,7 +19,7 @@ class AmphoraRepository:
             return {}
 
     def resources(self, limit=None, offset=None):
-        response = requests.get(
+        response = http.get(
             url=f'{self.endpoint}/resource/',
             headers=self.headers,
             params={'limit': limit, 'offset': offset}
@@ -27,7 +27,7 @@ class AmphoraRepository:
         return json.loads(response.content)
         
     def resource(self, resource_id):
-        response = requests.get(
+        response = http.get(
             url=f'{self.endpoint}/resource/{resource_id}/',
             headers=self.headers
         )
@@ -46,7 +46,7 @@ class AmphoraRepository:
         return result
 
     def collections(self, limit=None, offset=None, q=None, user=None):
-        response = requests.get(
+        response = http.get(
             url=f'{self.endpoint}/collection/',
             headers=self.headers,
             params={'limit': limit, 'offset': offset, 'q': q, 'user': user},
@@ -54,7 +54,7 @@ class AmphoraRepository:
         return json.loads(response.content)
 
     def collection(self, collection_id, limit=None, offset=None):
-        response = requests.get(
+        response = http.get(
             url=f'{self.endpoint}/collection/{collection_id}/',
             headers=self.headers,
             params={'limit': limit, 'offset': offset}
@@ -71,7 +71,7 @@ class AmphoraRepository:
         return content
 
     def search(self, query, limit=None, offset=None):
-        response = requests.get(
+        response = http.get(
             url=f'{self.endpoint}/resource/',
             headers=self.headers,
             params={'limit': limit, 'offset': offset, 'search': query}
@@ -79,7 +79,7 @@ class AmphoraRepository:
         return json.loads(response.content)
 
     def content(self, content_id):
-        response = requests.get(
+        response = http.get(
             url=f'{self.endpoint}/content/{content_id}/',
             headers=self.headers,
         )
@@ -101,7 +101,7 @@ class AmphoraRepository:
         return result
 
     def get_raw(self, target, **params):
-        return requests.get(
+        return http.get(
             url=target,
             headers=self.headers,
             params=params
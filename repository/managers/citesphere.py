@@ -1,14 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import requests
 import json
+import threading
+import time
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
 from rest_framework import status
 
 from accounts.models import CitesphereToken
+from util import http
+
+CITESPHERE_CACHE_TTL = getattr(settings, 'CITESPHERE_CACHE_TTL', 5 * 60)
+"""Seconds that a cached response is used without asking Citesphere."""
+
+CITESPHERE_CACHE_TIMEOUT = getattr(settings, 'CITESPHERE_CACHE_TIMEOUT', 24 * 60 * 60)
+"""
+Seconds that a cached response is kept. Once it is older than
+:data:`.CITESPHERE_CACHE_TTL` it is revalidated with ``If-None-Match`` /
+``If-Modified-Since`` where Citesphere provided an ``ETag`` or
+``Last-Modified`` header.
+"""
+
+CITESPHERE_MAX_WORKERS = getattr(settings, 'CITESPHERE_MAX_WORKERS', 8)
+"""Maximum number of concurrent requests when expanding a collection tree."""
+
+CITESPHERE_MAX_COLLECTIONS = getattr(settings, 'CITESPHERE_MAX_COLLECTIONS', 500)
+"""Maximum number of collections loaded when expanding a collection tree."""
+
+CITESPHERE_MAX_DEPTH = getattr(settings, 'CITESPHERE_MAX_DEPTH', 10)
+"""Maximum number of levels loaded when expanding a collection tree."""
+
 
 class CitesphereAuthority:
     def __init__(self, user):
         self.user = user
         self.headers = self._get_auth_header()
+        self._token_lock = threading.Lock()
 
     def test_endpoint(self):
         return self._get_response(f'{settings.CITESPHERE_ENDPOINT}/api/v1/test')
@@ -17,24 +46,23 @@ class CitesphereAuthority:
         return self._get_response(f'{settings.CITESPHERE_ENDPOINT}/api/v1/user')
 
     def groups(self):
-        groups = self._get_response(f'{settings.CITESPHERE_ENDPOINT}/api/v1/groups')
+        groups = self._get_response(f'{settings.CITESPHERE_ENDPOINT}/api/v1/groups', cached=True)
         return list(map(self._parse_group_info, groups))
 
     def group_info(self, group_id):
-        group = self._get_response(f'{settings.CITESPHERE_ENDPOINT}/api/v1/groups/{group_id}')
+        group = self._get_response(f'{settings.CITESPHERE_ENDPOINT}/api/v1/groups/{group_id}', cached=True)
         return self._parse_group_info(group)
 
     def group_items(self, group_id, page=1):
-        params = { "page": page }
-        response = self._get_response(
+        return self._get_page(
             f'{settings.CITESPHERE_ENDPOINT}/api/v1/groups/{group_id}/items',
-            params=params
+            page
         )
-        return response
         
     def group_item(self, group_id, item_id):
         response = self._get_response(
-            f'{settings.CITESPHERE_ENDPOINT}/api/v1/groups/{group_id}/items/{item_id}'
+            f'{settings.CITESPHERE_ENDPOINT}/api/v1/groups/{group_id}/items/{item_id}',
+            cached=True
         )
         return response
         
@@ -42,19 +70,148 @@ class CitesphereAuthority:
         return self._get_response(f'{settings.GILES_FILE_ENDPOINT}/{file_id}/content')
 
     def group_collections(self, group_id, limit=None, offset=None):
-        return self._get_response(f'{settings.CITESPHERE_ENDPOINT}/api/v1/groups/{group_id}/collections')
+        return self._get_response(f'{settings.CITESPHERE_ENDPOINT}/api/v1/groups/{group_id}/collections', cached=True)
 
     def collection_items(self, group_id, col_id, page=1):
-        params = { "page": page }
-        return self._get_response(
+        return self._get_page(
             f'{settings.CITESPHERE_ENDPOINT}/api/v1/groups/{group_id}/collections/{col_id}/items',
-            params=params
+            page
         )
 
     def collection_collections(self, group_id, col_id):
         return self._get_response(
-            f'{settings.CITESPHERE_ENDPOINT}/api/v1/groups/{group_id}/collections/{col_id}/collections'
+            f'{settings.CITESPHERE_ENDPOINT}/api/v1/groups/{group_id}/collections/{col_id}/collections',
+            cached=True
         )
+
+    def expand_collections(self, group_id, col_id=None, max_depth=None):
+        """
+        Load a collection (or a whole group) with all of its descendant
+        collections, and the first page of items in each.
+
+        Each level of the tree is loaded concurrently, with at most
+        `CITESPHERE_MAX_WORKERS` requests at a time.
+
+        Returns a dict with the keys `collections` (each collection has its
+        own `children` and `items`, like the collection views) and `items`, or
+        an `("error", status)` tuple if the top level could not be loaded.
+        """
+        if col_id is None:
+            collections = self.group_collections(group_id)
+            items = self._first_page(f'{settings.CITESPHERE_ENDPOINT}/api/v1/groups/{group_id}/items')
+        else:
+            collections, items = self._load_collection(group_id, col_id)
+        if isinstance(collections, tuple):
+            return collections
+
+        tree = {
+            **collections,
+            'items': items.get('items', []) if isinstance(items, dict) else [],
+        }
+        frontier = list(tree.get('collections', []))
+        expanded = 0    # Collections whose children and items were loaded.
+        depth = 1
+        with ThreadPoolExecutor(max_workers=CITESPHERE_MAX_WORKERS) as executor:
+            while frontier and (max_depth is None or depth <= max_depth):
+                remaining = CITESPHERE_MAX_COLLECTIONS - expanded
+                if remaining <= 0:
+                    break
+                frontier = frontier[:remaining]
+                results = executor.map(
+                    lambda collection: self._load_collection(
+                        group_id, collection['key'], threaded=True,
+                        has_children=collection.get('numberOfCollections', 1) > 0
+                    ),
+                    frontier
+                )
+                next_frontier = []
+                for collection, (children, items) in zip(frontier, results):
+                    collection['items'] = items.get('items', []) if isinstance(items, dict) else []
+                    if isinstance(children, dict):
+                        collection['children'] = children.get('collections', [])
+                        next_frontier += collection['children']
+                    else:
+                        collection['children'] = []
+                        collection['error'] = children[1]
+                expanded += len(frontier)
+                frontier = next_frontier
+                depth += 1
+        return tree
+
+    def _first_page(self, endpoint):
+        # No next-page prefetch; the tree is loaded in bulk already.
+        return self._get_response(endpoint, params={"page": 1}, cached=True)
+
+    def _load_collection(self, group_id, col_id, threaded=False, has_children=True):
+        try:
+            if has_children:
+                children = self.collection_collections(group_id, col_id)
+            else:
+                children = {'collections': []}
+            items = self._first_page(
+                f'{settings.CITESPHERE_ENDPOINT}/api/v1/groups/{group_id}/collections/{col_id}/items'
+            )
+            return children, items
+        finally:
+            if threaded:
+                connection.close()
+
+    def invalidate(self):
+        """
+        Discard all cached Citesphere responses for this user.
+        """
+        key = self._generation_key()
+        try:
+            cache.incr(key)
+        except ValueError:    # Not set yet (or evicted).
+            cache.set(key, time.time_ns(), None)
+
+    def _generation_key(self):
+        return f'citesphere-generation:{self.user.id}'
+
+    def _generation(self):
+        # A generation that was evicted starts again from the current time,
+        #  so that it is never lower than one that was used before.
+        key = self._generation_key()
+        generation = cache.get(key)
+        if generation is None:
+            generation = time.time_ns()
+            if not cache.add(key, generation, None):
+                generation = cache.get(key, generation)
+        return generation
+
+    def _cache_key(self, endpoint, params):
+        generation = self._generation()
+        request = json.dumps([endpoint, params], sort_keys=True, default=str)
+        digest = hashlib.md5(request.encode('utf-8')).hexdigest()
+        return f'citesphere:{self.user.id}:{generation}:{digest}'
+
+    def _get_page(self, endpoint, page):
+        """
+        Return a page of items, and start loading the next page in the
+        background so that it is cached when the user asks for it.
+        """
+        try:
+            page = int(page)
+        except (TypeError, ValueError):
+            page = 1
+        data = self._get_response(endpoint, params={"page": page}, cached=True)
+        if isinstance(data, dict) and data.get('items'):
+            next_params = {"page": page + 1}
+            entry = cache.get(self._cache_key(endpoint, next_params))
+            if entry is None or time.time() - entry['fetched'] > CITESPHERE_CACHE_TTL:
+                threading.Thread(target=self._prefetch, args=(endpoint, next_params),
+                                 daemon=True).start()
+        return data
+
+    def _prefetch(self, endpoint, params):
+        try:
+            self._get_response(endpoint, params=params, cached=True)
+        except Exception:
+            pass    # The page will be requested again if it is needed.
+        finally:
+            # Token refreshes use a database connection in this thread.
+            connection.close()
     
     def _get_auth_header(self):
         try:
@@ -63,24 +220,55 @@ class CitesphereAuthority:
         except CitesphereToken.DoesNotExist:
             return {}
 
-    def _get_response(self, endpoint, params = None):
+    def _get_response(self, endpoint, params = None, cached = False):
         """
         Return response from `endpoint`,
         get a new token and retry if unauthorized
+
+        If `cached`, successful responses are cached per user (see
+        `CITESPHERE_CACHE_TTL`).
         """
+        entry, key = None, None
+        if cached:
+            key = self._cache_key(endpoint, params)
+            entry = cache.get(key)
+            if entry is not None and time.time() - entry['fetched'] <= CITESPHERE_CACHE_TTL:
+                return entry['data']
+
         retries = 5
         for _ in range(retries):
-            response = requests.get(url=endpoint, headers=self.headers, params=params)
+            headers = dict(self.headers)
+            token = headers.get('Authorization')
+            if entry is not None and entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry is not None and entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+            response = http.get(url=endpoint, headers=headers, params=params)
             if response.status_code == status.HTTP_401_UNAUTHORIZED:
                 try:
-                    self._get_access_token() # Set new token
+                    with self._token_lock:
+                        # Another thread may have renewed the token while
+                        # this request was in flight.
+                        if self.headers.get('Authorization') == token:
+                            self._get_access_token() # Set new token
                 except requests.RequestException as e:
                     raise e
+            elif response.status_code == status.HTTP_304_NOT_MODIFIED and entry is not None:
+                entry['fetched'] = time.time()
+                cache.set(key, entry, CITESPHERE_CACHE_TIMEOUT)
+                return entry['data']
             elif response.status_code == status.HTTP_200_OK:
                 try:
                     data = json.loads(response.content)
                 except Exception as e:
                     data = response.content
+                if cached:
+                    cache.set(key, {
+                        'data': data,
+                        'fetched': time.time(),
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified'),
+                    }, CITESPHERE_CACHE_TIMEOUT)
                 return data
             elif response.status_code in [status.HTTP_404_NOT_FOUND, status.HTTP_403_FORBIDDEN, status.HTTP_500_INTERNAL_SERVER_ERROR]:
                 return "error", response.status_code
@@ -93,7 +281,7 @@ class CitesphereAuthority:
         and save it in `CitesphereToken` object
         """
         refresh_token = self.auth_token.refresh_token
-        response = requests.post(
+        response = http.post(
             url=f'{settings.CITESPHERE_ENDPOINT}/api/oauth/token',
             params={
                 "client_id": settings.CITESPHERE_CLIENT_ID,
@@ -122,7 +310,7 @@ class CitesphereAuthority:
         }
     
     def get_raw(self, target, **params):
-        return requests.get(
+        return http.get(
             url=target,
             headers=self.headers,
             params=params
@@ -27,8 +27,8 @@ class TestCitesphereAuthorityTestCase(TestCase):
             endpoint='https://diging-dev.asu.edu/citesphere-review/api/v1'
         )
 
-    @mock.patch("requests.post")
-    @mock.patch("requests.get")
+    @mock.patch("util.http.post")
+    @mock.patch("util.http.get")
     def test_token_expiry_single_retry(self, mock_get, mock_post):
         """
         Tests scenario of access_token expiry
@@ -61,8 +61,8 @@ class TestCitesphereAuthorityTestCase(TestCase):
         new_token = CitesphereToken.objects.get(user=self.user)
         self.assertEqual(new_token.access_token, "t2")
 
-    @mock.patch("requests.post")
-    @mock.patch("requests.get")
+    @mock.patch("util.http.post")
+    @mock.patch("util.http.get")
     def test_token_invalid_refresh_token(self, mock_get, mock_post):
         """
         Tests scenario of invalid refresh_token
@@ -86,8 +86,8 @@ class TestCitesphereAuthorityTestCase(TestCase):
         
         self.assertEqual("Error renewing access_token", context.exception.args[0])
 
-    @mock.patch("requests.post")
-    @mock.patch("requests.get")
+    @mock.patch("util.http.post")
+    @mock.patch("util.http.get")
     def test_token_max_retry(self, mock_get, mock_post):
         """
         Tests scenario of max retries of access_token
@@ -114,7 +114,7 @@ class TestCitesphereAuthorityTestCase(TestCase):
         
         self.assertEqual("Could not renew token", context.exception.args[0])
 
-    @mock.patch("requests.get")
+    @mock.patch("util.http.get")
     def test_user_info(self, mock_get):
         user_info_mock = {
             "username": "test",
@@ -126,13 +126,13 @@ class TestCitesphereAuthorityTestCase(TestCase):
         user_info = self.citesphere.user_info()
         self.assertEqual(user_info, user_info_mock)
 
-    @mock.patch("requests.get")
+    @mock.patch("util.http.get")
     def test_groups_empty(self, mock_get):
         mock_get.return_value = MockResponse(json.dumps([]))
         response = self.citesphere.groups()
         self.assertEqual(response, [])
 
-    @mock.patch("requests.get")
+    @mock.patch("util.http.get")
     def test_groups_multiple(self, mock_get):
         mock_get.return_value = MockResponse.from_file(
             'repository/managers/tests/mock_response_collections.json'
@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import mock
+from django.test import SimpleTestCase, override_settings
+
+from repository import content_cache
+
+
+class ContentCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.settings = override_settings(CONTENT_CACHE_DIR=self.cache_dir,
+                                          CONTENT_CACHE_MAX_SIZE=1000)
+        self.settings.enable()
+        content_cache._size = None
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.cache_dir)
+        content_cache._size = None
+
+    def _age(self, key, seconds):
+        """
+        Make the content for ``key`` look as if it was last used ``seconds``
+        ago.
+        """
+        digest = content_cache.get(key).digest
+        when = os.stat(content_cache._blob_path(digest)).st_mtime - seconds
+        for path in (content_cache._index_path(key), content_cache._blob_path(digest),
+                     content_cache._blob_path(digest, '.txt')):
+            os.utime(path, (when, when))
+
+    def test_put_get(self):
+        cached = content_cache.put('a', 'Zürich'.encode('utf-8'))
+        self.assertEqual(content_cache.get('a'), cached)
+        self.assertEqual(cached.text, 'Zürich')
+        self.assertIsNone(content_cache.get('b'))
+
+    def test_same_content_stored_once(self):
+        content_cache.put('a', b'content')
+        content_cache.put('b', b'content')
+        self.assertEqual(content_cache.get('a').digest, content_cache.get('b').digest)
+        blobs = [name for _, _, names in os.walk(os.path.join(self.cache_dir, 'blobs'))
+                 for name in names]
+        self.assertEqual(len(blobs), 2)
+
+    def test_evict_least_recently_used(self):
+        content_cache.put('old', b'o' * 200)
+        content_cache.put('new', b'n' * 200)
+        self._age('old', 100)
+        content_cache.put('newest', b'x' * 200)    # 1200 bytes in total.
+
+        self.assertIsNone(content_cache.get('old'))
+        self.assertFalse(os.path.exists(content_cache._index_path('old')))
+        self.assertIsNotNone(content_cache.get('new'))
+        self.assertIsNotNone(content_cache.get('newest'))
+
+    def test_put_does_not_scan_every_time(self):
+        content_cache.put('a', b'a' * 10)
+        with mock.patch('repository.content_cache.os.walk') as mock_walk:
+            for i in range(10):
+                content_cache.put('key %i' % i, b'%i' % i * 10)
+            self.assertEqual(mock_walk.call_count, 0)
+
+            content_cache.put('large', b'l' * 1000)
+            self.assertTrue(mock_walk.called)
+
+    def test_expired_content_is_fetched_again(self):
+        """
+        A file that is replaced upstream under the same key is picked up once
+        the cached content is older than ``CONTENT_CACHE_MAX_AGE``\.
+        """
+        fetch = mock.Mock(return_value=b'old')
+        with override_settings(CONTENT_CACHE_MAX_AGE=60):
+            self.assertEqual(content_cache.get_or_fetch('a', fetch).text, 'old')
+            fetch.return_value = b'new'
+            self.assertEqual(content_cache.get_or_fetch('a', fetch).text, 'old')
+            self.assertEqual(fetch.call_count, 1)
+
+            with mock.patch('repository.content_cache.time.time',
+                            return_value=content_cache.time.time() + 61):
+                self.assertEqual(content_cache.get_or_fetch('a', fetch).text, 'new')
+            self.assertEqual(fetch.call_count, 2)
+            self.assertEqual(content_cache.get_or_fetch('a', fetch).text, 'new')
@@ -0,0 +1,39 @@
+import codecs
+import mock
+from django.test import SimpleTestCase
+
+from repository import encoding
+
+
+class DecodeTestCase(SimpleTestCase):
+    def test_utf8(self):
+        raw = 'Zürich – Straße'.encode('utf-8')
+        self.assertEqual(encoding.decode(raw), ('utf-8', 'Zürich – Straße'))
+
+    def test_utf8_with_single_byte_hint(self):
+        """
+        A hint for a permissive single-byte encoding must not garble UTF-8.
+        """
+        raw = 'Zürich – Straße'.encode('utf-8')
+        for hint in ['ISO-8859-1', 'windows-1252']:
+            self.assertEqual(encoding.decode(raw, hint), ('utf-8', 'Zürich – Straße'))
+
+    def test_hint(self):
+        raw = 'Zürich'.encode('latin-1')
+        self.assertEqual(encoding.decode(raw, 'ISO-8859-1'), ('ISO-8859-1', 'Zürich'))
+
+    def test_bom(self):
+        raw = codecs.BOM_UTF8 + 'Zürich'.encode('utf-8')
+        self.assertEqual(encoding.decode(raw, 'ISO-8859-1'), ('utf-8-sig', 'Zürich'))
+
+    @mock.patch('repository.encoding.detect_encoding')
+    def test_detect_fallback(self, mock_detect):
+        mock_detect.return_value = 'windows-1251'
+        raw = 'Привет'.encode('windows-1251')
+        self.assertEqual(encoding.decode(raw), ('windows-1251', 'Привет'))
+        mock_detect.assert_called_once_with(raw)
+
+    def test_detect_prefix(self):
+        raw = ('Привет, мир. ' * 20000).encode('windows-1251')
+        self.assertGreater(len(raw), encoding.DETECTION_PREFIX_SIZE)
+        self.assertEqual(encoding.detect_encoding(raw).lower(), 'windows-1251')
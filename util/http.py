@@ -0,0 +1,179 @@
+"""
+Shared HTTP client for upstream services (Conceptpower, VIAF, Citesphere,
+Amphora, Giles, Quadriga).
+
+Calling ``requests.get`` or ``requests.post`` directly opens (and TLS
+handshakes) a new connection for every request. The functions in this module
+go through a single :class:`requests.Session` per process instead, so that
+connections to each host are kept alive and reused.
+
+The session is shared by every user's (authenticated) requests, so it never
+stores cookies; otherwise, e.g. a ``JSESSIONID`` set in response to one
+user's request would be sent with the next user's requests.
+
+Configured with the following (optional) settings:
+
+* ``HTTP_POOL_CONNECTIONS`` - Number of hosts to keep connection pools for.
+* ``HTTP_POOL_MAXSIZE`` - Connections kept open per host.
+* ``HTTP_RETRIES`` - Retries for connection errors, and for ``502``\,
+  ``503`` and ``504`` responses to idempotent requests.
+* ``HTTP_BACKOFF_FACTOR`` - See :class:`urllib3.util.retry.Retry`\.
+* ``HTTP_TIMEOUT`` - Default ``(connect, read)`` timeout in seconds. Can be
+  overridden per request with the ``timeout`` keyword argument.
+* ``HTTP_UPLOAD_TIMEOUT`` - ``(connect, read)`` timeout for :func:`.upload`\.
+  By default there is no read timeout, since the server may take a long time
+  to process a large upload that it has already accepted.
+"""
+from collections import defaultdict
+from http.cookiejar import DefaultCookiePolicy
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from django.conf import settings
+
+
+_session = None
+_lock = threading.Lock()
+_latency = defaultdict(lambda: {'requests': 0, 'errors': 0, 'total_time': 0.,
+                                'max_time': 0.})
+
+
+def _build_session():
+    # Settings are read here rather than at import time, since
+    #  vogon.settings imports this module.
+    retries = Retry(
+        total=getattr(settings, 'HTTP_RETRIES', 3),
+        backoff_factor=getattr(settings, 'HTTP_BACKOFF_FACTOR', 0.3),
+        status_forcelist=(502, 503, 504),
+        method_whitelist=frozenset(['GET', 'HEAD', 'OPTIONS']),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=getattr(settings, 'HTTP_POOL_CONNECTIONS', 10),
+        pool_maxsize=getattr(settings, 'HTTP_POOL_MAXSIZE', 10),
+        max_retries=retries,
+    )
+    session = requests.Session()
+    # No domain is allowed to set (or be sent) cookies.
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _timeout():
+    return getattr(settings, 'HTTP_TIMEOUT', (5, 60))
+
+
+def session():
+    """
+    The :class:`requests.Session` shared by this process.
+
+    Returns
+    -------
+    :class:`requests.Session`
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def request(method, url, **kwargs):
+    """
+    Send a request through the shared session.
+
+    Takes the same arguments as :func:`requests.request`\.
+
+    Returns
+    -------
+    :class:`requests.Response`
+    """
+    kwargs.setdefault('timeout', _timeout())
+    host = urlparse(url).netloc
+    start = time.monotonic()
+    failed = False
+    try:
+        return session().request(method, url, **kwargs)
+    except requests.RequestException:
+        failed = True
+        raise
+    finally:
+        elapsed = time.monotonic() - start
+        with _lock:
+            stats = _latency[host]
+            stats['requests'] += 1
+            stats['errors'] += int(failed)
+            stats['total_time'] += elapsed
+            stats['max_time'] = max(stats['max_time'], elapsed)
+
+
+def get(url, params=None, **kwargs):
+    """See :func:`requests.get`\."""
+    return request('GET', url, params=params, **kwargs)
+
+
+def post(url, data=None, json=None, **kwargs):
+    """See :func:`requests.post`\."""
+    return request('POST', url, data=data, json=json, **kwargs)
+
+
+def upload(url, data=None, json=None, **kwargs):
+    """
+    Like :func:`.post`\, but with the ``HTTP_UPLOAD_TIMEOUT``\, for requests
+    that send a large payload.
+    """
+    kwargs.setdefault('timeout', getattr(settings, 'HTTP_UPLOAD_TIMEOUT',
+                                         (_timeout()[0], None)))
+    return post(url, data=data, json=json, **kwargs)
+
+
+def metrics():
+    """
+    Per-host request latency and connection reuse in this process.
+
+    Returns
+    -------
+    dict
+        Keyed by host. ``connections`` is the number of connections that were
+        opened, and ``reuse`` the fraction of requests that were sent over an
+        existing connection.
+    """
+    connections = defaultdict(lambda: {'connections': 0, 'pooled_requests': 0})
+    if _session is not None:
+        for adapter in set(_session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:    # Evicted in the meantime.
+                    continue
+                host = pool.host if pool.port in (None, 80, 443) \
+                       else '%s:%s' % (pool.host, pool.port)
+                connections[host]['connections'] += pool.num_connections
+                connections[host]['pooled_requests'] += pool.num_requests
+
+    with _lock:
+        latency = {host: dict(stats) for host, stats in _latency.items()}
+
+    result = {}
+    for host in set(latency) | set(connections):
+        stats = latency.get(host, {'requests': 0, 'errors': 0, 'total_time': 0.,
+                                   'max_time': 0.})
+        pooled = connections[host]
+        requests_sent = pooled['pooled_requests']
+        result[host] = {
+            'requests': stats['requests'],
+            'errors': stats['errors'],
+            'mean_time': stats['total_time'] / stats['requests'] if stats['requests'] else 0.,
+            'max_time': stats['max_time'],
+            'connections': pooled['connections'],
+            'reuse': 1. - float(pooled['connections']) / requests_sent if requests_sent else 0.,
+        }
+    return result
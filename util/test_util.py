@@ -5,6 +5,7 @@ class MockResponse:
         self.content = content
         self.text = content
         self.status_code = status_code
+        self.headers = {}
 
     @staticmethod
     def from_file(file_name):
@@ -1,4 +1,4 @@
-import requests
+from util import http
 
 def unescape(s):
     return s.replace('&amp;', '&')\
@@ -28,7 +28,7 @@ def correctPosition(position):
     manager = text.repository.manager(user)
     try:
         content_data = manager.content(content_id=int(text.repository_source_id))
-        raw_content = requests.get(content_data['location']).content
+        raw_content = http.get(content_data['location']).content
     except IOError:
         print('nope', text)
         return
@@ -48,7 +48,7 @@ def correctTaggedPosition(position):
     manager = text.repository.manager(user)
     try:
         content_data = manager.content(content_id=int(text.repository_source_id))
-        raw_content = requests.get(content_data['location']).content
+        raw_content = http.get(content_data['location']).content
     except IOError:
         print('nope', text)
         return
@@ -11,12 +11,14 @@ https://docs.djangoproject.com/en/1.8/ref/settings/
 """
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
-import os, sys, requests
+import os, sys
 from urllib.parse import urlparse
 import socket
 import dj_database_url
 from datetime import timedelta
 
+from util import http as http_client
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 # Quick-start development settings - unsuitable for production
@@ -230,8 +232,9 @@ VERSION = "0.4"
 # Giles and HTTP.
 GILES = os.environ.get("GILES", "https://diging-dev.asu.edu/giles-review")
 IMAGE_AFFIXES = ["png", "jpg", "jpeg", "tiff", "tif"]
-GET = requests.get
-POST = requests.post
+# Pooled; see util.http.
+GET = http_client.get
+POST = http_client.upload
 GILES_APP_TOKEN = os.environ.get("GILES_APP_TOKEN", "nope")
 GILES_DEFAULT_PROVIDER = os.environ.get("GILES_DEFAULT_PROVIDER", "github")
 MAX_GILES_UPLOADS = 20